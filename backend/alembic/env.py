@@ -11,7 +11,11 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from app.db.database import Base
 from app.core.config import settings
-from app.models import User, UserProfile, EmailToken, PlatformData
+from app.models import (
+    User, UserProfile, EmailToken, PlatformData, Skill, UserSkill,
+    LeaderboardEntry, MetricSketch, PlatformMetric, AIAnalysis,
+    ChatConversation, ChatMessage, LLMUsage, LLMCall
+)
 
 # this is the Alembic Config object
 config = context.config
@@ -19,8 +23,9 @@ config = context.config
 # Set sqlalchemy.url from settings
 config.set_main_option('sqlalchemy.url', settings.DATABASE_URL)
 
-# Interpret the config file for Python logging.
-if config.config_file_name is not None:
+# Interpret the config file for Python logging (skipped when run in-process by
+# the app, which would otherwise disable the server's loggers)
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here for 'autogenerate' support
@@ -42,6 +47,14 @@ def run_migrations_offline() -> None:
 
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
+    # The app's migration preflight passes in its own connection
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
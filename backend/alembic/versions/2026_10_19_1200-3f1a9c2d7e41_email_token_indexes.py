@@ -0,0 +1,46 @@
+"""email token lookup and expiry indexes
+
+Revision ID: 3f1a9c2d7e41
+Revises: 
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2d7e41'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    "ix_email_tokens_lookup": ["user_id", "token_type", "used", "expires_at"],
+    "ix_email_tokens_expires_at": ["expires_at"],
+}
+
+
+def _existing_indexes():
+    inspector = sa.inspect(op.get_bind())
+    if "email_tokens" not in inspector.get_table_names():
+        return None
+    return {index["name"] for index in inspector.get_indexes("email_tokens")}
+
+
+def upgrade() -> None:
+    # Tables may already have been created (with these indexes) by create_all
+    existing = _existing_indexes()
+    if existing is None:
+        return
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "email_tokens", columns)
+
+
+def downgrade() -> None:
+    existing = _existing_indexes() or set()
+    for name in INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name="email_tokens")
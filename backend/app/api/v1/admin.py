@@ -0,0 +1,116 @@
+"""Admin endpoints (superusers only)"""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db
+from app.models.user import User
+from app.api.v1.auth import get_current_superuser
+from app.core.config import settings
+from app.core.metrics import metrics, startup_timings
+from app.models.ai_analysis import AIAnalysis
+from app.services.ai_analysis_service import AIAnalysisService
+from app.services.analysis_cache_service import AnalysisCacheService
+from app.services.chat_answer_cache import chat_answer_cache
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_quota_service import LLMQuotaService
+from app.services.llm_router import provider_health
+from app.services.llm_telemetry import LLMTelemetryService
+from app.services.percentile_service import percentile_service
+from app.services.prompt_registry import prompts
+from app.services.token_cleanup_service import TokenCleanupService
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics(current_user: User = Depends(get_current_superuser)):
+    """In-process counters, gauges and timers of the worker serving this request"""
+    return metrics.snapshot()
+
+@router.get("/startup")
+async def get_startup_timings(current_user: User = Depends(get_current_superuser)):
+    """Duration of each startup phase (migrations, index builds) of this worker"""
+    return startup_timings.snapshot()
+
+@router.get("/email-tokens/stats")
+async def get_email_token_stats(
+    current_user: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """Email token table size by state"""
+    return TokenCleanupService(db).stats()
+
+@router.post("/email-tokens/purge")
+async def purge_email_tokens(
+    current_user: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """Run the email token purge now"""
+    deleted = TokenCleanupService(db).purge()
+    return {"deleted": deleted, **TokenCleanupService(db).stats()}
+
+@router.get("/ai-analysis-cache")
+async def get_ai_analysis_cache_stats(
+    current_user: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """Stored analyses and this worker's cache hit rate"""
+    return {
+        "stored": db.query(AIAnalysis.id).count(),
+        "hits": metrics.counter_value("ai_analysis.cache_hits"),
+        "misses": metrics.counter_value("ai_analysis.cache_misses"),
+        "hitRate": AnalysisCacheService.hit_rate(),
+    }
+
+@router.get("/chat-answer-cache")
+async def get_chat_answer_cache_stats(current_user: User = Depends(get_current_superuser)):
+    """Cached opening chat answers and this worker's hit rate"""
+    return {
+        "entries": len(chat_answer_cache),
+        "hits": metrics.counter_value("ai_chat.answer_cache_hits"),
+        "misses": metrics.counter_value("ai_chat.answer_cache_misses"),
+        "rejected": metrics.counter_value("ai_chat.answer_cache_rejected"),
+        "hitRate": chat_answer_cache.hit_rate(),
+    }
+
+@router.get("/prompts")
+async def get_prompts(current_user: User = Depends(get_current_superuser)):
+    """Registered prompt templates with their versions and token budgets"""
+    return {
+        "analysisVersion": AIAnalysisService.ANALYSIS_VERSION,
+        "templates": prompts.snapshot(),
+    }
+
+@router.get("/llm-providers")
+async def get_llm_provider_health(current_user: User = Depends(get_current_superuser)):
+    """Circuit state, recent error rate and p95 latency per LLM provider"""
+    return provider_health.snapshot()
+
+@router.get("/llm-usage")
+async def get_llm_usage(
+    current_user: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """Today's heaviest users against the daily quota, and this worker's LLM queues"""
+    return {
+        "dailyTokenQuota": settings.LLM_DAILY_TOKEN_QUOTA,
+        "topUsers": LLMQuotaService(db).top_users(),
+        "queues": llm_gateway.queues(),
+    }
+
+@router.get("/llm-calls")
+async def get_llm_call_report(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """Slowest and most expensive prompts (per version and model) and endpoints over the last `hours`"""
+    return LLMTelemetryService(db).report(hours=hours, limit=limit)
+
+@router.post("/percentiles/reseed")
+async def reseed_percentiles(
+    current_user: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """Rebuild the percentile sketches from current platform data (one sample per user)"""
+    return {"observed": percentile_service.seed(db)}
@@ -1,14 +1,31 @@
 """AI Analysis API endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+import time
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel
 
-from app.db.database import get_db
+from app.db.database import SessionLocal, get_db
 from app.models.user import User
 from app.models.platform_data import PlatformData
 from app.api.v1.auth import get_current_user
-from app.services.ai_analysis_service import AIAnalysisService
+from app.services.ai_analysis_service import SUPPORTED_PLATFORMS, AIAnalysisService
+from app.services.analysis_cache_service import AnalysisCacheService, enrich_in_background
+from app.services.chat_answer_cache import chat_answer_cache, personalize, personalize_stream
+from app.services.chat_memory_service import ChatMemoryService, summarize_in_background
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_scheduler import (
+    PRIORITY_ANALYSIS,
+    PRIORITY_INTERACTIVE,
+    LLMRejectedError,
+    llm_request,
+)
+from app.services.percentile_service import percentile_service
+from app.core.metrics import metrics
 
 router = APIRouter()
 
@@ -19,6 +36,8 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     question: str
+    # Only used to seed a conversation the server has no messages for yet;
+    # history is kept server-side
     chatHistory: Optional[List[ChatMessage]] = None
 
 class ChatResponse(BaseModel):
@@ -28,7 +47,7 @@ class ChatResponse(BaseModel):
 class AnalysisResponse(BaseModel):
     platform: str
     username: str
-    percentileRank: float
+    percentileRank: Optional[float] = None
     globalRanking: str
     overallScore: float
     strengths: List[dict]
@@ -38,10 +57,17 @@ class AnalysisResponse(BaseModel):
     keyMetrics: List[dict]
     topicBreakdown: Optional[List[dict]] = None
     analyzedAt: str
+    source: Optional[str] = None
+
+class MultiAnalysisResponse(BaseModel):
+    analyses: Dict[str, AnalysisResponse]
+    skipped: Dict[str, str]
 
 @router.get("/analyze/{platform}", response_model=AnalysisResponse)
 async def analyze_platform(
     platform: str,
+    background_tasks: BackgroundTasks,
+    mode: Literal["fast", "full"] = "fast",
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -50,8 +76,15 @@ async def analyze_platform(
     
     This endpoint:
     1. Retrieves stored platform data
-    2. Performs comprehensive AI analysis
+    2. Returns the cached analysis for this data version, or analyzes it and
+       caches the result
     3. Returns percentile ranking, strengths, weaknesses, and improvement plan
+    
+    In `fast` mode (default) a cache miss is answered with a rule-based
+    analysis (`source: "rules"`) without waiting on the model; its
+    recommendations and weekly plan are personalized by the model in the
+    background and served from the cache on later requests. `full` waits
+    for a complete model analysis.
     """
     
     # Get platform data
@@ -75,17 +108,131 @@ async def analyze_platform(
     # Get username from data
     username = platform_data.data.get('username', 'unknown')
     
-    # Perform AI analysis
+    # Serve the stored analysis unless the data or prompts changed
     try:
-        ai_service = AIAnalysisService()
-        analysis = ai_service.analyze_platform_data(
-            platform=platform,
-            user_data=platform_data.data,
-            username=username
-        )
+        cache = AnalysisCacheService(db)
+        percentile_rank = percentile_service.platform_percentile(platform, platform_data.data)
+        if mode == "full":
+            with llm_request(PRIORITY_ANALYSIS, current_user.id):
+                analysis = await cache.get_or_analyze(
+                    user_id=current_user.id,
+                    platform=platform,
+                    data=platform_data.data,
+                    username=username,
+                    percentile_rank=percentile_rank
+                )
+        else:
+            analysis = cache.get_or_analyze_locally(
+                user_id=current_user.id,
+                platform=platform,
+                data=platform_data.data,
+                username=username,
+                percentile_rank=percentile_rank
+            )
+            if analysis.get("source") == "rules":
+                background_tasks.add_task(
+                    enrich_in_background, current_user.id, {platform: platform_data.data}
+                )
         
         return AnalysisResponse(**analysis)
     
+    except LLMRejectedError:
+        raise
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"AI Analysis Error: {error_details}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"AI analysis failed: {str(e)}"
+        )
+
+@router.get("/analyze-all", response_model=MultiAnalysisResponse)
+async def analyze_all_platforms(
+    background_tasks: BackgroundTasks,
+    platforms: Optional[List[str]] = Query(None),
+    mode: Literal["fast", "full"] = "fast",
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get AI analyses for all (or the given) fetched platforms at once
+    
+    Cached analyses are served as-is. In `fast` mode (default) the others
+    get rule-based analyses right away, and a single background model call
+    enriches all of them. In `full` mode every platform that needs a new
+    analysis is covered by a single combined model call. Either way results
+    are split into the same per-platform cache entries /analyze/{platform}
+    uses. Platforms without stored data are listed in `skipped`.
+    """
+    
+    query = db.query(PlatformData).filter(PlatformData.user_id == current_user.id)
+    if platforms:
+        query = query.filter(PlatformData.platform_name.in_(platforms))
+    rows = {row.platform_name: row for row in query.all()}
+    
+    skipped = {}
+    for platform in platforms or []:
+        if platform not in rows:
+            skipped[platform] = "No data found. Please fetch data first."
+    
+    platform_data = {}
+    for platform, row in rows.items():
+        if platform not in SUPPORTED_PLATFORMS:
+            skipped[platform] = "Unsupported platform"
+        elif row.data:
+            platform_data[platform] = row.data
+        else:
+            skipped[platform] = "Platform data is empty"
+    
+    usernames = {
+        platform: data.get('username', 'unknown')
+        for platform, data in platform_data.items()
+    }
+    percentile_ranks = {
+        platform: percentile_service.platform_percentile(platform, data)
+        for platform, data in platform_data.items()
+    }
+    
+    try:
+        cache = AnalysisCacheService(db)
+        if mode == "full":
+            with llm_request(PRIORITY_ANALYSIS, current_user.id):
+                analyses = await cache.get_or_analyze_many(
+                    user_id=current_user.id,
+                    platforms=platform_data,
+                    usernames=usernames,
+                    percentile_ranks=percentile_ranks
+                )
+        else:
+            analyses = {
+                platform: cache.get_or_analyze_locally(
+                    user_id=current_user.id,
+                    platform=platform,
+                    data=data,
+                    username=usernames[platform],
+                    percentile_rank=percentile_ranks[platform]
+                )
+                for platform, data in platform_data.items()
+            }
+            unenriched = {
+                platform: platform_data[platform]
+                for platform, analysis in analyses.items()
+                if analysis.get("source") == "rules"
+            }
+            if unenriched:
+                background_tasks.add_task(enrich_in_background, current_user.id, unenriched)
+        
+        return MultiAnalysisResponse(
+            analyses={
+                platform: AnalysisResponse(**analysis)
+                for platform, analysis in analyses.items()
+            },
+            skipped=skipped
+        )
+    
+    except LLMRejectedError:
+        raise
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -99,6 +246,7 @@ async def analyze_platform(
 async def chat_with_platform(
     platform: str,
     chat_request: ChatRequest,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -109,6 +257,9 @@ async def chat_with_platform(
     1. Only answers questions about the specific platform
     2. Uses user's actual data for context
     3. Provides personalized advice
+    4. Remembers the conversation server-side (summary + recent messages)
+    5. Answers opening questions from the profile's score bands, reusing
+       answers to similar questions from similar profiles
     """
     
     # Get platform data
@@ -123,44 +274,218 @@ async def chat_with_platform(
             detail=f"No data found for platform: {platform}"
         )
     
-    # Get username
-    username = platform_data.data.get('username', 'unknown')
-    
-    # Get or create analysis
+    # Reuse the stored analysis summary; the answer is the only model call
     try:
         ai_service = AIAnalysisService()
         
-        # First get analysis for context
-        analysis = ai_service.analyze_platform_data(
-            platform=platform,
-            user_data=platform_data.data,
-            username=username
-        )
+        memory = ChatMemoryService(db)
+        conversation = _load_conversation(memory, current_user.id, platform, chat_request)
+        conversation_summary, chat_history = memory.context(conversation)
         
-        # Convert chat history to proper format
-        chat_history = []
-        if chat_request.chatHistory:
-            chat_history = [
-                {"role": msg.role, "content": msg.content}
-                for msg in chat_request.chatHistory
-            ]
+        if _is_opening(platform, conversation_summary, chat_history):
+            answer = chat_answer_cache.lookup(platform, platform_data.data, chat_request.question)
+            if answer is None:
+                with llm_request(PRIORITY_INTERACTIVE, current_user.id):
+                    shared = await ai_service.answer_opening_question(
+                        platform, platform_data.data, chat_request.question
+                    )
+                chat_answer_cache.store(platform, platform_data.data, chat_request.question, shared)
+                answer = personalize(shared, platform, platform_data.data)
+        else:
+            analysis_summary = AnalysisCacheService(db).chat_summary(
+                user_id=current_user.id,
+                platform=platform,
+                data=platform_data.data,
+                percentile_rank=percentile_service.platform_percentile(platform, platform_data.data)
+            )
+            
+            # Get chat response
+            with llm_request(PRIORITY_INTERACTIVE, current_user.id):
+                answer = await ai_service.chat_with_platform_context(
+                    platform=platform,
+                    user_data=platform_data.data,
+                    analysis_summary=analysis_summary,
+                    question=chat_request.question,
+                    chat_history=chat_history,
+                    conversation_summary=conversation_summary
+                )
         
-        # Get chat response
-        answer = ai_service.chat_with_platform_context(
-            platform=platform,
-            user_data=platform_data.data,
-            analysis=analysis,
-            question=chat_request.question,
-            chat_history=chat_history
-        )
+        memory.append_turn(conversation.id, chat_request.question, answer)
+        if memory.needs_summary(conversation):
+            background_tasks.add_task(summarize_in_background, conversation.id)
         
         return ChatResponse(
             answer=answer,
             platform=platform
         )
     
+    except LLMRejectedError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Chat failed: {str(e)}"
         )
+
+def _load_conversation(memory: ChatMemoryService, user_id: int, platform: str, chat_request: ChatRequest):
+    """The user's conversation, seeded from client history when it is new"""
+    conversation = memory.conversation(user_id, platform)
+    if chat_request.chatHistory:
+        memory.seed(conversation, [
+            {"role": msg.role, "content": msg.content}
+            for msg in chat_request.chatHistory
+        ])
+    return conversation
+
+def _is_opening(platform: str, conversation_summary: Optional[str], chat_history: List[Dict[str, str]]) -> bool:
+    """Whether the question opens the conversation and gets the shareable answer"""
+    return platform in SUPPORTED_PLATFORMS and conversation_summary is None and not chat_history
+
+async def _replay(answer: str):
+    """A cached answer as a one-chunk token stream"""
+    yield answer
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat/{platform}/stream")
+async def stream_chat_with_platform(
+    platform: str,
+    chat_request: ChatRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Streaming variant of the platform chatbot (Server-Sent Events)
+    
+    Emits `token` events ({"text": ...}) as the answer is generated, then a
+    single `done` event, or an `error` event if generation fails. Generation
+    stops when the client disconnects; only completed answers are stored in
+    the conversation.
+    """
+    
+    # Get platform data
+    platform_data = db.query(PlatformData).filter(
+        PlatformData.user_id == current_user.id,
+        PlatformData.platform_name == platform
+    ).first()
+    
+    if not platform_data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No data found for platform: {platform}"
+        )
+    
+    # Resolve everything that needs the database before streaming starts
+    user_data = platform_data.data
+    memory = ChatMemoryService(db)
+    conversation = _load_conversation(memory, current_user.id, platform, chat_request)
+    conversation_id = conversation.id
+    conversation_summary, chat_history = memory.context(conversation)
+    opening = _is_opening(platform, conversation_summary, chat_history)
+    user_id = current_user.id
+    cached = chat_answer_cache.lookup(platform, user_data, chat_request.question) if opening else None
+    analysis_summary = None if opening else AnalysisCacheService(db).chat_summary(
+        user_id=current_user.id,
+        platform=platform,
+        data=user_data,
+        percentile_rank=percentile_service.platform_percentile(platform, user_data)
+    )
+    ai_service = AIAnalysisService()
+    if cached is None:
+        # Answer quota and overload refusals with a 429 while we still can
+        with llm_request(PRIORITY_INTERACTIVE, user_id):
+            await llm_gateway.admit("gemini")
+    
+    async def events():
+        with llm_request(PRIORITY_INTERACTIVE, user_id):
+            started = time.perf_counter()
+            first_token = True
+            answer = []
+            # The opening answer as generated, placeholders included
+            shared = []
+            if cached is not None:
+                tokens = _replay(cached)
+            elif opening:
+                tokens = personalize_stream(
+                    ai_service.stream_opening_answer(platform, user_data, chat_request.question),
+                    platform,
+                    user_data,
+                    template=shared
+                )
+            else:
+                tokens = ai_service.stream_chat_with_platform_context(
+                    platform=platform,
+                    user_data=user_data,
+                    analysis_summary=analysis_summary,
+                    question=chat_request.question,
+                    chat_history=chat_history,
+                    conversation_summary=conversation_summary
+                )
+            try:
+                async for text in tokens:
+                    if await request.is_disconnected():
+                        metrics.increment("ai_chat.stream_cancelled")
+                        break
+                    if first_token:
+                        metrics.observe("ai_chat.time_to_first_token", time.perf_counter() - started)
+                        first_token = False
+                    answer.append(text)
+                    yield _sse("token", {"text": text})
+                else:
+                    metrics.observe("ai_chat.stream_duration", time.perf_counter() - started)
+                    if opening and cached is None:
+                        chat_answer_cache.store(platform, user_data, chat_request.question, "".join(shared))
+                    # The request's session is closed once streaming starts
+                    memory_db = SessionLocal()
+                    try:
+                        ChatMemoryService(memory_db).append_turn(conversation_id, chat_request.question, "".join(answer))
+                    finally:
+                        memory_db.close()
+                    yield _sse("done", {"platform": platform})
+            except LLMRejectedError as e:
+                metrics.increment("ai_chat.stream_errors")
+                yield _sse("error", {"detail": str(e), "retryAfter": e.retry_after})
+            except Exception as e:
+                metrics.increment("ai_chat.stream_errors")
+                yield _sse("error", {"detail": f"Chat failed: {str(e)}"})
+            finally:
+                # Stops the upstream generation if we left the loop early
+                await tokens.aclose()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Runs after the stream; does nothing unless a summary is due
+        background=BackgroundTask(summarize_in_background, conversation_id)
+    )
+
+@router.get("/chat/{platform}/history")
+async def get_chat_history(
+    platform: str,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Stored messages of the user's conversation for a platform"""
+    memory = ChatMemoryService(db)
+    conversation = memory.conversation(current_user.id, platform, create=False)
+    if conversation is None:
+        return {"platform": platform, "messages": [], "summary": None}
+    return {
+        "platform": platform,
+        "messages": memory.history(conversation, limit),
+        "summary": conversation.summary,
+    }
+
+@router.delete("/chat/{platform}/history", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_chat_history(
+    platform: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Forget the user's conversation for a platform"""
+    ChatMemoryService(db).clear(current_user.id, platform)
@@ -4,6 +4,7 @@ from app.services.github_service import GitHubService
 from app.services.leetcode_service import LeetCodeService
 from app.services.resume_service import ResumeService
 from app.services.ai_service import AIService
+from app.services.llm_scheduler import LLMRejectedError
 from app.core.config import settings
 from typing import List, Dict, Any, Optional
 
@@ -12,8 +13,8 @@ router = APIRouter()
 # Initialize services
 github_service = GitHubService(settings.GITHUB_TOKEN)
 leetcode_service = LeetCodeService()
-resume_service = ResumeService(settings.GEMINI_API_KEY)
-ai_service = AIService(settings.GEMINI_API_KEY)
+resume_service = ResumeService()
+ai_service = AIService()
 
 @router.post("/complete")
 async def analyze_complete_profile(request: ProfileRequest):
@@ -52,10 +53,12 @@ async def analyze_complete_profile(request: ProfileRequest):
         
         # Generate AI recommendations
         try:
-            ai_analysis = ai_service.generate_recommendations(
+            ai_analysis = await ai_service.generate_recommendations(
                 platform_scores,
                 request.target_role or "Software Engineer"
             )
+        except LLMRejectedError:
+            raise
         except Exception as e:
             # Use fallback if AI fails
             ai_analysis = ai_service._generate_fallback_recommendations(
@@ -80,6 +83,8 @@ async def analyze_complete_profile(request: ProfileRequest):
     
     except HTTPException:
         raise
+    except LLMRejectedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
@@ -130,6 +135,8 @@ async def analyze_with_resume(
                     resume_file.filename
                 )
                 platform_scores.append(resume_result)
+            except LLMRejectedError:
+                raise
             except Exception as e:
                 errors.append(f"Resume: {str(e)}")
         
@@ -145,10 +152,12 @@ async def analyze_with_resume(
         
         # Generate AI recommendations
         try:
-            ai_analysis = ai_service.generate_recommendations(
+            ai_analysis = await ai_service.generate_recommendations(
                 platform_scores,
                 target_role or "Software Engineer"
             )
+        except LLMRejectedError:
+            raise
         except Exception as e:
             ai_analysis = ai_service._generate_fallback_recommendations(
                 platform_scores,
@@ -172,6 +181,8 @@ async def analyze_with_resume(
     
     except HTTPException:
         raise
+    except LLMRejectedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
@@ -212,6 +223,8 @@ async def analyze_resume_only(resume_file: UploadFile = File(...)):
         return result
     except HTTPException:
         raise
+    except LLMRejectedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -22,6 +22,7 @@ from app.core.security import (
 )
 from app.core.email import send_verification_email, send_password_reset_email
 from app.core.config import settings
+from app.services.autocomplete_index import autocomplete_index
 
 router = APIRouter()
 
@@ -55,6 +56,20 @@ async def get_current_user(
     
     return user
 
+# Dependency restricting an endpoint to superusers
+async def get_current_superuser(
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """Get current user and require superuser rights"""
+    
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    
+    return current_user
+
 @router.post("/signup", response_model=dict, status_code=status.HTTP_201_CREATED)
 async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
     """Register a new user"""
@@ -93,6 +108,9 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
     db.add(user_profile)
     db.commit()
     
+    # Make the new user visible to autocomplete in this worker
+    autocomplete_index.upsert(new_user.id, new_user.username, new_user.name)
+    
     # Generate verification token and code
     verification_token = generate_verification_token()
     verification_code = generate_verification_code()
@@ -0,0 +1,102 @@
+"""Leaderboard endpoints"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.db.database import get_read_db
+from app.models.user import User
+from app.api.v1.auth import get_current_user
+from app.services.leaderboard_service import LeaderboardService, LEADERBOARD_METRICS
+
+router = APIRouter()
+
+def validate_metric(platform: str, metric: str):
+    """Reject platform/metric pairs that are not ranked"""
+    if metric not in LEADERBOARD_METRICS.get(platform, []):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No leaderboard for {platform}/{metric}"
+        )
+
+@router.get("")
+async def list_leaderboards():
+    """List available platform metrics"""
+    return LEADERBOARD_METRICS
+
+@router.get("/{platform}/{metric}")
+async def get_leaderboard(
+    platform: str,
+    metric: str,
+    college: Optional[str] = None,
+    graduation_year: Optional[int] = None,
+    limit: int = 10,
+    offset: int = 0,
+    db: Session = Depends(get_read_db)
+):
+    """Top users for a metric, optionally filtered by college and graduation year"""
+    
+    validate_metric(platform, metric)
+    
+    offset = max(0, offset)
+    service = LeaderboardService(db)
+    rows = service.top(
+        platform, metric,
+        college_name=college,
+        graduation_year=graduation_year,
+        limit=max(1, min(limit, 100)),
+        offset=offset
+    )
+    
+    results = []
+    if not rows:
+        return results
+    
+    # The first row may tie with the end of the previous page
+    previous_value = rows[0][0].value
+    rank = service.count_above(platform, metric, previous_value, college, graduation_year) + 1
+    for position, (entry, user) in enumerate(rows, start=offset + 1):
+        if entry.value != previous_value:
+            rank = position
+            previous_value = entry.value
+        results.append({
+            "rank": rank,
+            "username": user.username,
+            "name": user.name,
+            "collegeName": entry.college_name,
+            "graduationYear": entry.graduation_year,
+            "value": entry.value,
+        })
+    
+    return results
+
+@router.get("/{platform}/{metric}/me")
+async def get_my_rank(
+    platform: str,
+    metric: str,
+    college: Optional[str] = None,
+    graduation_year: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Current user's rank for a metric within the (optionally filtered) cohort"""
+    
+    validate_metric(platform, metric)
+    
+    result = LeaderboardService(db).rank(
+        current_user.id, platform, metric,
+        college_name=college,
+        graduation_year=graduation_year
+    )
+    
+    if result is None and (college or graduation_year):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"You are not on the {platform} leaderboard for this college or graduation year."
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No {platform} data found. Please fetch data first."
+        )
+    
+    return {"platform": platform, "metric": metric, **result}
@@ -1,10 +1,9 @@
 """Platform data API endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from typing import Dict, List, Optional
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.models.user import User
 from app.models.user_profile import UserProfile
 from app.models.platform_data import PlatformData
@@ -18,6 +17,9 @@ from app.services.platform_service_updated import (
     CodeChefService, HackerRankService, DevPostService, DevToService,
     LinkedInService
 )
+from app.services.platform_metrics_service import PlatformMetricsService
+from app.services.platform_data_writer import PlatformDataWriter
+from app.services.analysis_cache_service import precompute_in_background
 from app.core.config import settings
 
 router = APIRouter()
@@ -34,9 +36,24 @@ PLATFORM_SERVICES = {
     "linkedin": lambda: LinkedInService(),
 }
 
+def _precompute_changed(
+    background_tasks: BackgroundTasks,
+    user_id: int,
+    writer: PlatformDataWriter,
+    written: Dict[str, PlatformData]
+) -> None:
+    """Queue AI analyses for the platforms whose data the fetch changed"""
+    if settings.ANALYSIS_PRECOMPUTE_ON_FETCH and writer.changed:
+        background_tasks.add_task(
+            precompute_in_background,
+            user_id,
+            {platform: written[platform].data for platform in writer.changed}
+        )
+
 @router.post("/fetch/{platform}", response_model=FetchResponse)
 async def fetch_platform_data(
     platform: str,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -81,27 +98,17 @@ async def fetch_platform_data(
         data = service.fetch_user_data(username)
         
         # Store in database
-        platform_data = db.query(PlatformData).filter(
-            PlatformData.user_id == current_user.id,
-            PlatformData.platform_name == platform
-        ).first()
-        
-        if platform_data:
-            platform_data.data = data
-            platform_data.last_updated = datetime.utcnow()
-            platform_data.update_status = "success"
-            platform_data.error_message = None
-        else:
-            platform_data = PlatformData(
-                user_id=current_user.id,
-                platform_name=platform,
-                data=data,
-                update_status="success"
+        writer = PlatformDataWriter(db, current_user.id, profile)
+        writer.add_success(platform, data)
+        written = writer.commit()
+        if platform in writer.failed:
+            return FetchResponse(
+                platform=platform,
+                status="error",
+                error=writer.failed[platform]
             )
-            db.add(platform_data)
-        
-        db.commit()
-        db.refresh(platform_data)
+        platform_data = written[platform]
+        _precompute_changed(background_tasks, current_user.id, writer, written)
         
         return FetchResponse(
             platform=platform,
@@ -112,16 +119,9 @@ async def fetch_platform_data(
     
     except ValueError as e:
         # Store error in database
-        platform_data = db.query(PlatformData).filter(
-            PlatformData.user_id == current_user.id,
-            PlatformData.platform_name == platform
-        ).first()
-        
-        if platform_data:
-            platform_data.update_status = "error"
-            platform_data.error_message = str(e)
-            platform_data.last_updated = datetime.utcnow()
-            db.commit()
+        writer = PlatformDataWriter(db, current_user.id, profile)
+        writer.add_error(platform, str(e))
+        writer.commit()
         
         return FetchResponse(
             platform=platform,
@@ -137,6 +137,7 @@ async def fetch_platform_data(
 
 @router.post("/fetch-all", response_model=FetchAllResponse)
 async def fetch_all_platforms(
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -157,6 +158,10 @@ async def fetch_all_platforms(
     successful = 0
     failed = 0
     
+    # Outcomes are collected here and written in one transaction at the end
+    writer = PlatformDataWriter(db, current_user.id, profile)
+    outcomes = []
+    
     # Fetch data for each platform
     for platform in PLATFORM_SERVICES.keys():
         if platform == "linkedin":
@@ -172,55 +177,32 @@ async def fetch_all_platforms(
         try:
             service = PLATFORM_SERVICES[platform]()
             data = service.fetch_user_data(username)
-            
-            # Store in database
-            platform_data = db.query(PlatformData).filter(
-                PlatformData.user_id == current_user.id,
-                PlatformData.platform_name == platform
-            ).first()
-            
-            if platform_data:
-                platform_data.data = data
-                platform_data.last_updated = datetime.utcnow()
-                platform_data.update_status = "success"
-                platform_data.error_message = None
-            else:
-                platform_data = PlatformData(
-                    user_id=current_user.id,
-                    platform_name=platform,
-                    data=data,
-                    update_status="success"
-                )
-                db.add(platform_data)
-            
-            db.commit()
-            db.refresh(platform_data)
-            
+            writer.add_success(platform, data)
+            outcomes.append((platform, data, None))
+        
+        except Exception as e:
+            writer.add_error(platform, str(e))
+            outcomes.append((platform, None, str(e)))
+    
+    written = writer.commit()
+    _precompute_changed(background_tasks, current_user.id, writer, written)
+    
+    for platform, data, error in outcomes:
+        # A fetched platform whose write failed is reported like a failed fetch
+        error = error or writer.failed.get(platform)
+        if error is None:
             results.append(FetchResponse(
                 platform=platform,
                 status="success",
                 data=convert_dict_keys_to_camel(data),
-                last_updated=platform_data.last_updated
+                last_updated=written[platform].last_updated
             ))
             successful += 1
-        
-        except Exception as e:
-            # Store error
-            platform_data = db.query(PlatformData).filter(
-                PlatformData.user_id == current_user.id,
-                PlatformData.platform_name == platform
-            ).first()
-            
-            if platform_data:
-                platform_data.update_status = "error"
-                platform_data.error_message = str(e)
-                platform_data.last_updated = datetime.utcnow()
-                db.commit()
-            
+        else:
             results.append(FetchResponse(
                 platform=platform,
                 status="error",
-                error=str(e)
+                error=error
             ))
             failed += 1
     
@@ -235,7 +217,7 @@ async def fetch_all_platforms(
 async def get_platform_data(
     platform: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get stored data for a single platform"""
     
@@ -261,7 +243,7 @@ async def get_platform_data(
 @router.get("/data", response_model=List[PlatformDataResponse])
 async def get_all_platform_data(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get stored data for all platforms"""
     
@@ -279,3 +261,27 @@ async def get_all_platform_data(
         )
         for pd in platform_data_list
     ]
+
+@router.get("/metrics/{platform}/{metric}/stats")
+async def get_metric_stats(
+    platform: str,
+    metric: str,
+    college: Optional[str] = None,
+    graduation_year: Optional[int] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Aggregate statistics for a platform metric, computed in the database"""
+    
+    if platform not in PLATFORM_SERVICES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid platform: {platform}"
+        )
+    
+    stats = PlatformMetricsService(db).stats(
+        platform, metric,
+        college_name=college,
+        graduation_year=graduation_year
+    )
+    
+    return {"platform": platform, "metric": metric, **stats}
@@ -1,15 +1,19 @@
 """User profile management endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.models.user import User
 from app.models.user_profile import UserProfile
 from app.api.v1.auth import get_current_user
 from app.schemas.profile import (
     ProfileUpdate, ProfileResponse, PublicProfileResponse
 )
+from app.services.user_search_service import UserSearchService
+from app.services.autocomplete_index import autocomplete_index
+from app.services.skill_service import SkillService
+from app.services.leaderboard_service import LeaderboardService
 
 router = APIRouter()
 
@@ -78,7 +82,8 @@ async def update_my_profile(
         UserProfile.user_id == current_user.id
     ).first()
     
-    if not profile:
+    created = profile is None
+    if created:
         profile = UserProfile(user_id=current_user.id)
         db.add(profile)
     
@@ -87,9 +92,23 @@ async def update_my_profile(
     for field, value in update_data.items():
         setattr(profile, field, value)
     
+    if "skills" in update_data:
+        SkillService(db).sync_user_skills(current_user.id, profile.skills)
+    
+    if "college_name" in update_data or "graduation_year" in update_data:
+        LeaderboardService(db).update_cohort(
+            current_user.id, profile.college_name, profile.graduation_year
+        )
+    
     db.commit()
     db.refresh(profile)
     
+    # Other workers pick the change up on their next sync
+    if created or "full_name" in update_data:
+        autocomplete_index.upsert(
+            current_user.id, current_user.username, current_user.name, profile.full_name
+        )
+    
     return build_profile_response(profile, current_user)
 
 @router.post("/upload-resume")
@@ -265,7 +284,7 @@ async def delete_resume(
 @router.get("/{username}", response_model=PublicProfileResponse)
 async def get_public_profile(
     username: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get public profile by username"""
     
@@ -314,29 +333,90 @@ async def get_public_profile(
         created_at=profile.created_at
     )
 
+@router.get("/search/autocomplete")
+async def autocomplete_users(q: str, limit: int = 8):
+    """
+    Typeahead suggestions by username or name prefix
+
+    Served from the in-process prefix index; never queries the database.
+    """
+    
+    if not q or not q.strip():
+        return []
+    
+    return autocomplete_index.lookup(q, limit=max(1, min(limit, 20)))
+
+@router.get("/search/skills")
+async def search_users_by_skills(
+    skills: str,
+    match: str = "all",
+    limit: int = 20,
+    offset: int = 0,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Find users by skills, e.g. ?skills=React,Docker&match=all
+
+    match=all requires every listed skill (AND); match=any requires at
+    least one (OR) and ranks users by how many they have.
+    """
+    
+    if match not in ("all", "any"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="match must be 'all' or 'any'"
+        )
+    
+    rows = SkillService(db).find_users(
+        skills.split(","),
+        match_all=match == "all",
+        limit=max(1, min(limit, 100)),
+        offset=max(0, offset)
+    )
+    
+    return [
+        {
+            "username": user.username,
+            "name": user.name,
+            "fullName": profile.full_name if profile else None,
+            "collegeName": profile.college_name if profile else None,
+            "skills": profile.skills if profile else None,
+            "matchedSkills": matched,
+        }
+        for user, profile, matched in rows
+    ]
+
 @router.get("/search/users")
 async def search_users(
     q: str,
+    response: Response,
     limit: int = 10,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Search users by username or name"""
+    """
+    Search users by username, name, full name, college or skills
+
+    Results are ranked by relevance. When more results exist, the cursor for
+    the next page is returned in the X-Next-Cursor header.
+    """
     
     if not q or len(q) < 2:
         return []
     
-    search_term = f"%{q.lower()}%"
+    try:
+        rows, next_cursor = UserSearchService(db).search(q, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    users = db.query(User).filter(
-        (User.username.like(search_term)) | (User.name.like(search_term))
-    ).limit(limit).all()
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     results = []
-    for user in users:
-        profile = db.query(UserProfile).filter(
-            UserProfile.user_id == user.id
-        ).first()
-        
+    for user, profile in rows:
         results.append({
             "username": user.username,
             "name": user.name,
@@ -346,4 +426,3 @@ async def search_users(
         })
     
     return results
-
@@ -15,6 +15,47 @@ class Settings(BaseSettings):
     PRIMARY_AI_SERVICE: str = "openai"  # openai or gemini
     SECONDARY_AI_SERVICE: str = "gemini"  # openai or gemini
     
+    # LLM gateway: in-flight calls per provider and per-call deadline
+    LLM_MAX_CONCURRENCY_GEMINI: int = 8
+    LLM_MAX_CONCURRENCY_OPENAI: int = 8
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    
+    # LLM provider circuit breaker: opens when this share of at least
+    # LLM_CIRCUIT_MIN_CALLS recent calls failed, probes again after the cooldown
+    LLM_CIRCUIT_ERROR_RATE: float = 0.5
+    LLM_CIRCUIT_MIN_CALLS: int = 5
+    LLM_CIRCUIT_COOLDOWN_SECONDS: float = 30.0
+    
+    # Hedged LLM calls start the next provider after the current one's p95
+    # latency (at least the minimum; the default until enough samples exist)
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 10.0
+    
+    # LLM admission control: calls beyond this many queued per provider are
+    # refused with 429, as are users past their daily token quota (0 = none)
+    LLM_MAX_QUEUED_PER_PROVIDER: int = 64
+    LLM_DAILY_TOKEN_QUOTA: int = 200000
+    
+    # LLM call telemetry: buffered records are written to the llm_calls
+    # table at this interval and kept for the retention period
+    LLM_TELEMETRY_FLUSH_SECONDS: int = 10
+    LLM_TELEMETRY_RETENTION_DAYS: int = 30
+    
+    # Full AI analyses are generated in the background after a fetch
+    # changed a platform's data, so the analysis view is usually a cache read
+    ANALYSIS_PRECOMPUTE_ON_FETCH: bool = True
+    
+    # Chat memory: recent messages sent verbatim; older ones are folded into
+    # the conversation summary once this many are waiting
+    CHAT_RECENT_MESSAGES: int = 6
+    CHAT_SUMMARY_BATCH: int = 6
+    
+    # Opening chat answers reused for similar questions from profiles in
+    # the same score bands (cosine similarity 0-1); a TTL of 0 disables it
+    CHAT_ANSWER_CACHE_TTL_SECONDS: int = 21600
+    CHAT_ANSWER_CACHE_SIMILARITY: float = 0.75
+    CHAT_ANSWER_CACHE_MAX_ENTRIES: int = 5000
+    
     # CORS - will be split from comma-separated string
     ALLOWED_ORIGINS: str = "http://localhost:5173,http://localhost:3000,http://localhost:3001"
     
@@ -24,6 +65,10 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./elevateai.db"  # Default to SQLite for development
+    DATABASE_REPLICA_URLS: str = ""  # Comma-separated read replicas (optional)
+    REPLICA_HEALTH_CHECK_INTERVAL_SECONDS: int = 30
+    # After a user writes, their reads stay on the primary this long (longer than replica lag)
+    REPLICA_READ_YOUR_WRITES_SECONDS: int = 15
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-this-in-production-use-openssl-rand-hex-32"
@@ -37,6 +82,26 @@ class Settings(BaseSettings):
     # Frontend URL (for email links)
     FRONTEND_URL: str = "http://localhost:3000"
     
+    # Percentiles: sketches are flushed to the database at this interval
+    PERCENTILE_PERSIST_INTERVAL_SECONDS: int = 60
+    PERCENTILE_MIN_SAMPLES: int = 20
+    # Sketches are rebuilt from current platform data at this interval, which
+    # drops the error of subtracting retracted values (0 = never)
+    PERCENTILE_RESEED_INTERVAL_SECONDS: int = 86400
+    
+    # Autocomplete: each worker rebuilds its index at this interval when
+    # users or profiles changed (0 = only at startup)
+    AUTOCOMPLETE_SYNC_INTERVAL_SECONDS: int = 30
+    
+    # Email token purge: used/expired tokens older than the retention are deleted
+    EMAIL_TOKEN_RETENTION_HOURS: int = 24
+    EMAIL_TOKEN_PURGE_INTERVAL_SECONDS: int = 3600
+    EMAIL_TOKEN_PURGE_BATCH_SIZE: int = 500
+    
+    # Startup migrations (file lock used when the database has no advisory locks)
+    MIGRATION_LOCK_FILE: str = ""  # Defaults to <tmpdir>/elevateai-migrations.lock
+    MIGRATION_LOCK_TIMEOUT_SECONDS: int = 300
+    
     # Cloudinary (for file uploads)
     CLOUDINARY_CLOUD_NAME: str = ""
     CLOUDINARY_API_KEY: str = ""
@@ -47,6 +112,11 @@ class Settings(BaseSettings):
         """Convert comma-separated string to list"""
         return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
     
+    @property
+    def database_replica_urls_list(self) -> List[str]:
+        """Convert comma-separated replica URLs to list"""
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
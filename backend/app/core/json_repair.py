@@ -0,0 +1,142 @@
+"""Tolerant JSON parsing for model output
+
+Models wrap JSON in markdown fences, add prose around it, or stop mid-object
+when they hit an output limit. `parse_json_response` recovers the JSON value
+in all of these cases where it can, so a slightly malformed response does not
+cost a second generation.
+"""
+import json
+import re
+from typing import Any, List, Optional
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+_STRING = r'"(?:[^"\\]|\\.)*"'
+_PARTIAL_LITERAL = re.compile(r"(?<=[:\[,\s])(?:t|tr|tru|f|fa|fal|fals|n|nu|nul|-|-?\d+\.|-?\d+(?:\.\d+)?[eE][+-]?)$")
+_DANGLING_KEY_COLON = re.compile(r"([{,])\s*" + _STRING + r"\s*:$")
+_DANGLING_KEY = re.compile(r"([{,])\s*" + _STRING + r"$")
+
+
+class JSONRepairError(ValueError):
+    """No JSON value could be recovered from the text"""
+
+
+def _strip_fences(text: str) -> str:
+    match = _FENCE.search(text)
+    return match.group(1) if match else text
+
+
+class _Scanner:
+    """
+    Bracket and string state of a JSON value, fed one chunk at a time
+
+    `end` is set to the index just past the top-level value once it closes;
+    until then `stack` holds the open brackets and `in_string` tells whether
+    the text stopped inside a string.
+    """
+
+    def __init__(self):
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self.stack: List[str] = []
+        self.in_string = False
+        self._escaped = False
+        self._position = 0
+
+    def feed(self, text: str) -> None:
+        """Scan `text[self._position:]`; `text` must extend what was fed before"""
+        for index in range(self._position, len(text)):
+            if self.end is not None:
+                break
+            char = text[index]
+            if self.start is None:
+                if char in _CLOSERS:
+                    self.start = index
+                    self.stack.append(char)
+                continue
+            if self.in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in _CLOSERS:
+                self.stack.append(char)
+            elif char in "}]":
+                if self.stack and _CLOSERS[self.stack[-1]] == char:
+                    self.stack.pop()
+                if not self.stack:
+                    self.end = index + 1
+        self._position = len(text)
+
+    def value(self, text: str, allow_partial: bool = True) -> Any:
+        if self.start is None:
+            raise JSONRepairError("No JSON object or array in response")
+        try:
+            if self.end is not None:
+                return _loads(text[self.start:self.end])
+            if allow_partial:
+                return _loads(_close_truncated(text[self.start:], self.stack, self.in_string))
+        except json.JSONDecodeError as e:
+            raise JSONRepairError(f"Unrecoverable JSON: {e}") from e
+        raise JSONRepairError("Truncated JSON")
+
+
+def _close_truncated(fragment: str, stack: List[str], in_string: bool) -> str:
+    """Terminate a value that was cut off mid-stream"""
+    if in_string:
+        # Drop a dangling escape so the closing quote is not escaped
+        if fragment.endswith("\\") and not fragment.endswith("\\\\"):
+            fragment = fragment[:-1]
+        fragment += '"'
+
+    in_object = bool(stack) and stack[-1] == "{"
+    while True:
+        trimmed = fragment.rstrip()
+        trimmed = _PARTIAL_LITERAL.sub("", trimmed)
+        trimmed = trimmed.rstrip().rstrip(",").rstrip()
+        # `"key":` with no value yet
+        trimmed = _DANGLING_KEY_COLON.sub(r"\1", trimmed)
+        # `"key"` inside an object, without its colon
+        if in_object:
+            trimmed = _DANGLING_KEY.sub(r"\1", trimmed)
+        if trimmed == fragment:
+            break
+        fragment = trimmed
+
+    return fragment + "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def _loads(candidate: str) -> Any:
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        return json.loads(_TRAILING_COMMA.sub(r"\1", candidate))
+
+
+def parse_json_response(text: str, allow_partial: bool = True) -> Any:
+    """
+    Parse the JSON value in a model response
+
+    Handles markdown fences, prose before or after the value, trailing
+    commas and (with `allow_partial`) output truncated mid-value.
+
+    Raises:
+        JSONRepairError: if nothing parseable is found
+    """
+    if not text or not text.strip():
+        raise JSONRepairError("Empty response")
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    body = _strip_fences(text)
+    scanner = _Scanner()
+    scanner.feed(body)
+    return scanner.value(body, allow_partial)
@@ -0,0 +1,123 @@
+"""Lightweight in-process metrics registry
+
+Counters, gauges and timers kept per worker process and exposed through the
+admin API. Timers keep a bounded window of recent samples for percentiles.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict
+
+# Recent samples kept per timer for percentile estimates
+TIMER_WINDOW = 1000
+
+
+class _Timer:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=TIMER_WINDOW)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 2),
+            "p95_ms": round(self.percentile(0.95) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe named counters, gauges and timers"""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._timers: Dict[str, _Timer] = defaultdict(_Timer)
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record a duration in seconds"""
+        with self._lock:
+            self._timers[name].observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time the enclosed block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def counter_value(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def timer_percentile(self, name: str, q: float) -> float:
+        """Recent q-quantile of a timer in seconds (0 if never observed)"""
+        with self._lock:
+            timer = self._timers.get(name)
+            return timer.percentile(q) if timer else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timers": {name: timer.snapshot() for name, timer in self._timers.items()},
+            }
+
+
+class StartupTimings:
+    """Wall-clock duration of each startup phase of this process"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            metrics.observe(f"startup.{name}", elapsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()}
+        # Dotted names ("migrations.alembic") are sub-phases of their prefix
+        top_level = [ms for name, ms in phases.items() if "." not in name] or phases.values()
+        return {"phases_ms": phases, "total_ms": round(sum(top_level), 2)}
+
+
+# Create singleton instances
+metrics = MetricsRegistry()
+startup_timings = StartupTimings()
@@ -0,0 +1,115 @@
+"""Mergeable KLL quantile sketch
+
+A compact, pure-Python implementation of the KLL sketch (Karnin, Lang,
+Liberty 2016). It keeps O(k log(n/k)) items and answers rank queries with
+error roughly proportional to 1/k. Two sketches of the same metric merge
+losslessly (up to that error), which lets every worker keep a local sketch
+and fold it into the shared, persisted one.
+"""
+import random
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Any, Dict, List, Optional
+
+DEFAULT_K = 200
+_DECAY = 2.0 / 3.0
+
+
+class KLLSketch:
+    """Streaming quantile sketch over floats"""
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.n = 0
+        # compactors[h] holds items that each stand for 2**h original values
+        self.compactors: List[List[float]] = [[]]
+        self._sorted_view = None
+
+    def _capacity(self, height: int) -> int:
+        depth = len(self.compactors) - height - 1
+        return max(2, int(self.k * (_DECAY ** depth)) + 1)
+
+    def _size(self) -> int:
+        return sum(len(c) for c in self.compactors)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def update(self, value: float) -> None:
+        """Add one observation"""
+        self.compactors[0].append(float(value))
+        self.n += 1
+        self._sorted_view = None
+        if self._size() >= self._max_size():
+            self._compress()
+
+    def _compress(self) -> None:
+        for height in range(len(self.compactors)):
+            if len(self.compactors[height]) >= self._capacity(height):
+                if height + 1 >= len(self.compactors):
+                    self.compactors.append([])
+                items = sorted(self.compactors[height])
+                # Only pairs compact; an odd item waits here for the next
+                # compaction so its weight is not lost
+                leftover = items[-1:] if len(items) % 2 else []
+                items = items[:len(items) - len(leftover)]
+                # Keep every other item (random offset), promoting it one level
+                offset = random.randint(0, 1)
+                self.compactors[height + 1].extend(items[offset::2])
+                self.compactors[height] = leftover
+                # One compaction per pass keeps the sketch within bounds
+                if self._size() < self._max_size():
+                    break
+
+    def merge(self, other: "KLLSketch") -> None:
+        """Fold another sketch into this one"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for height, items in enumerate(other.compactors):
+            self.compactors[height].extend(items)
+        self.n += other.n
+        self._sorted_view = None
+        while self._size() >= self._max_size():
+            self._compress()
+
+    def _view(self):
+        """Sorted items with cumulative weights, cached until the next update"""
+        if self._sorted_view is None:
+            weighted = sorted(
+                (value, 1 << height)
+                for height, items in enumerate(self.compactors)
+                for value in items
+            )
+            values = [value for value, _ in weighted]
+            cumulative = list(accumulate(weight for _, weight in weighted))
+            self._sorted_view = (values, cumulative)
+        return self._sorted_view
+
+    def rank(self, value: float) -> float:
+        """Fraction of observations <= value, in [0, 1]"""
+        values, cumulative = self._view()
+        if not values:
+            return 0.0
+        position = bisect_right(values, value)
+        if position == 0:
+            return 0.0
+        return cumulative[position - 1] / cumulative[-1]
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile q in [0, 1]"""
+        values, cumulative = self._view()
+        if not values:
+            return None
+        target = q * cumulative[-1]
+        position = min(bisect_right(cumulative, target), len(values) - 1)
+        return values[position]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "n": self.n, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=state.get("k", DEFAULT_K))
+        sketch.n = state.get("n", 0)
+        sketch.compactors = [list(items) for items in state.get("compactors", [[]])] or [[]]
+        return sketch
@@ -1,8 +1,20 @@
 """Database connection and session management"""
-from sqlalchemy import create_engine
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from http.cookies import CookieError, SimpleCookie
+from typing import List, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.security import decode_access_token
 
 # Create database engine
 engine = create_engine(
@@ -12,8 +24,248 @@ engine = create_engine(
     max_overflow=20
 )
 
-# Create session factory
+
+class ReplicaPool:
+    """
+    Read replicas with periodic health checks
+
+    Replicas are used round-robin; one that fails its check is skipped
+    until a later check succeeds. With no healthy replica, reads go to the
+    primary.
+    """
+
+    def __init__(self, urls: List[str], check_interval: int):
+        self.engines = [
+            create_engine(url, pool_pre_ping=True, pool_size=10, max_overflow=20)
+            for url in urls
+        ]
+        self.check_interval = check_interval
+        self._healthy = {id(replica): True for replica in self.engines}
+        self._checked_at = {id(replica): 0.0 for replica in self.engines}
+        self._cycle = itertools.cycle(self.engines) if self.engines else None
+        self._lock = threading.Lock()
+
+        for replica in self.engines:
+            event.listen(replica, "handle_error", self._on_error(replica))
+
+    def _on_error(self, replica: Engine):
+        def handle_error(context):
+            # Lost connections take the replica out until its next check passes
+            if context.is_disconnect:
+                self.mark_unhealthy(replica)
+        return handle_error
+
+    def _check(self, replica: Engine) -> bool:
+        try:
+            with replica.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            print(f"Read replica {replica.url.render_as_string()} unavailable: {e}")
+            return False
+
+    def _is_healthy(self, replica: Engine) -> bool:
+        key = id(replica)
+        now = time.monotonic()
+        with self._lock:
+            due = now - self._checked_at[key] >= self.check_interval
+            if due:
+                # Claim the check so concurrent callers don't repeat it
+                self._checked_at[key] = now
+        if due:
+            self._healthy[key] = self._check(replica)
+        return self._healthy[key]
+
+    def mark_unhealthy(self, replica: Engine) -> None:
+        self._healthy[id(replica)] = False
+        self._checked_at[id(replica)] = time.monotonic()
+
+    def choose(self) -> Optional[Engine]:
+        """Next healthy replica, or None to use the primary"""
+        if self._cycle is None:
+            return None
+        for _ in range(len(self.engines)):
+            with self._lock:
+                replica = next(self._cycle)
+            if self._is_healthy(replica):
+                return replica
+        return None
+
+
+replicas = ReplicaPool(
+    settings.database_replica_urls_list,
+    settings.REPLICA_HEALTH_CHECK_INTERVAL_SECONDS
+)
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from a replica until it writes
+
+    The first flush, bulk UPDATE/DELETE/INSERT or SELECT ... FOR UPDATE pins
+    the session to the primary for the rest of its life, so a request always
+    reads its own writes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._replica: Optional[Engine] = None
+        self._pinned_to_primary = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not self._pinned_to_primary and (
+            self._flushing
+            or isinstance(clause, UpdateBase)
+            or getattr(clause, "_for_update_arg", None) is not None
+        ):
+            self._pinned_to_primary = True
+
+        if self._pinned_to_primary:
+            return engine
+
+        if self._replica is None:
+            self._replica = replicas.choose() or engine
+        if self._replica is not engine:
+            metrics.increment("db.replica_queries")
+        return self._replica
+
+
+class ReadYourWrites:
+    """
+    Sends a user's reads to the primary for a short while after they wrote
+
+    Replicas lag the primary, so the request after a save (e.g. the GET that
+    follows a fetch) could otherwise read the old rows. A request writes
+    when one of its sessions commits changes; its user is then remembered
+    in this worker and, for the other workers, in a cookie that same-origin
+    browsers send back.
+    """
+
+    COOKIE = "primary_until"
+
+    def __init__(self, window: int, max_users: int = 10000):
+        self.window = window
+        self.max_users = max_users
+        self._until: "OrderedDict[int, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: int) -> float:
+        until = time.time() + self.window
+        with self._lock:
+            self._until[user_id] = until
+            self._until.move_to_end(user_id)
+            while len(self._until) > self.max_users:
+                self._until.popitem(last=False)
+        return until
+
+    def active(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        with self._lock:
+            until = self._until.get(user_id)
+            if until is not None and until <= time.time():
+                del self._until[user_id]
+                until = None
+        return until is not None
+
+
+read_your_writes = ReadYourWrites(settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+
+# Per request: the caller's user id, the cookie deadline and whether it wrote
+_request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_write(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_writes(session):
+    session.info.pop("wrote", None)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_writes(session):
+    if not session.info.pop("wrote", False):
+        return
+    state = _request_writes.get()
+    if state is None or state["user_id"] is None or not read_your_writes.window:
+        return
+    state["until"] = read_your_writes.mark(state["user_id"])
+    state["wrote"] = True
+
+
+def _prefers_primary() -> bool:
+    state = _request_writes.get()
+    if state is None:
+        return False
+    return state["until"] > time.time() or read_your_writes.active(state["user_id"])
+
+
+class ReadYourWritesMiddleware:
+    """Track the caller and their recent writes for `get_read_db`"""
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _user_id(headers: dict) -> Optional[int]:
+        scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        payload = decode_access_token(token)
+        try:
+            return int(payload["sub"]) if payload else None
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _cookie_until(headers: dict) -> float:
+        cookie = SimpleCookie()
+        try:
+            cookie.load(headers.get(b"cookie", b"").decode("latin-1"))
+            return float(cookie[ReadYourWrites.COOKIE].value)
+        except (CookieError, KeyError, ValueError):
+            return 0.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas.engines:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        state = {
+            "user_id": self._user_id(headers),
+            "until": self._cookie_until(headers),
+            "wrote": False,
+        }
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and state["wrote"]:
+                cookie = (
+                    f"{ReadYourWrites.COOKIE}={state['until']:.0f}; "
+                    f"Max-Age={read_your_writes.window}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        token = _request_writes.set(state)
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_writes.reset(token)
+
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession)
 
 # Create base class for models
 Base = declarative_base()
@@ -26,3 +278,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency for read-mostly endpoints
+def get_read_db():
+    """
+    Get a session that reads from a replica (if configured) until it writes
+
+    Callers who wrote in the last REPLICA_READ_YOUR_WRITES_SECONDS read from
+    the primary instead, so they see their own changes.
+    """
+    if not replicas.engines:
+        yield from get_db()
+        return
+    if _prefers_primary():
+        metrics.increment("db.read_your_writes_primary")
+        yield from get_db()
+        return
+
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,180 @@
+"""Startup migration preflight
+
+Every worker checks in-process whether the schema is current; only when it
+is not does one process (guarded by a PostgreSQL advisory lock or a file
+lock) create tables, build the search index, run Alembic and backfill the
+derived tables. The others wait for the lock, see a current schema and skip.
+
+Can also be run once before starting the workers:
+
+    python -m app.db.migrations
+"""
+import os
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Callable, Optional, Set
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import startup_timings
+from app.db.database import Base, SessionLocal, engine as default_engine
+from app.db.search_index import detect_user_search_index, ensure_user_search_index
+from app.services.skill_service import SkillService
+from app.services.leaderboard_service import LeaderboardService
+from app.services.platform_metrics_service import PlatformMetricsService
+from app.services.percentile_service import percentile_service
+from app.models.metric_sketch import MetricSketch
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process file locks, single dev server
+    fcntl = None
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+# Arbitrary constant identifying this app's migration lock
+ADVISORY_LOCK_KEY = 7_304_215_061
+
+
+def _alembic_config(engine: Engine) -> Config:
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def _head_revisions(config: Config) -> Set[str]:
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def _current_revisions(engine: Engine) -> Set[str]:
+    with engine.connect() as conn:
+        return set(MigrationContext.configure(conn).get_current_heads())
+
+
+def schema_is_current(engine: Engine, config: Optional[Config] = None) -> bool:
+    """True if every model table exists and Alembic is at head"""
+    config = config or _alembic_config(engine)
+    existing = set(inspect(engine).get_table_names())
+    if not set(Base.metadata.tables).issubset(existing):
+        return False
+    return _current_revisions(engine) == _head_revisions(config)
+
+
+@contextmanager
+def _file_lock(timeout: int):
+    path = settings.MIGRATION_LOCK_FILE or os.path.join(tempfile.gettempdir(), "elevateai-migrations.lock")
+    with open(path, "w") as handle:
+        if fcntl is not None:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"Timed out waiting for migration lock {path}")
+                    time.sleep(0.2)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _advisory_lock(engine: Engine, timeout: int):
+    with engine.connect() as conn:
+        # Transaction-scoped timeout for the wait; the lock itself is session-level
+        conn.execute(text(f"SET LOCAL lock_timeout = {int(timeout) * 1000}"))
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            conn.commit()
+
+
+def migration_lock(engine: Engine, timeout: Optional[int] = None):
+    """Cross-process lock held while the schema is being changed"""
+    timeout = timeout or settings.MIGRATION_LOCK_TIMEOUT_SECONDS
+    if engine.dialect.name == "postgresql":
+        return _advisory_lock(engine, timeout)
+    return _file_lock(timeout)
+
+
+def _seed_percentiles(db) -> int:
+    if db.query(MetricSketch.id).first():
+        return 0
+    return percentile_service.seed(db)
+
+
+def _run_backfills() -> None:
+    backfills = [
+        ("skills", lambda db: SkillService(db).backfill()),
+        ("leaderboards", lambda db: LeaderboardService(db).backfill()),
+        ("platform_metrics", lambda db: PlatformMetricsService(db).backfill()),
+        ("percentile_sketches", _seed_percentiles),
+    ]
+    for name, backfill in backfills:
+        db = SessionLocal()
+        try:
+            with startup_timings.phase(f"backfill.{name}"):
+                processed = backfill(db)
+            if processed:
+                print(f"Backfilled {name} for {processed} records.")
+        finally:
+            db.close()
+
+
+def run_migrations(engine: Engine = default_engine, backfill: Callable[[], None] = _run_backfills) -> bool:
+    """
+    Bring the schema to head if needed
+
+    Returns:
+        True if this process applied changes, False if the schema was current
+    """
+    config = _alembic_config(engine)
+
+    with startup_timings.phase("migrations.check"):
+        current = schema_is_current(engine, config)
+    if current:
+        detect_user_search_index(engine)
+        return False
+
+    with ExitStack() as stack:
+        with startup_timings.phase("migrations.lock_wait"):
+            stack.enter_context(migration_lock(engine))
+
+        # Another process may have finished while we waited
+        if schema_is_current(engine, config):
+            detect_user_search_index(engine)
+            return False
+
+        with startup_timings.phase("migrations.create_all"):
+            Base.metadata.create_all(bind=engine)
+        with startup_timings.phase("migrations.search_index"):
+            ensure_user_search_index(engine)
+        with startup_timings.phase("migrations.alembic"):
+            with engine.begin() as conn:
+                config.attributes["connection"] = conn
+                command.upgrade(config, "head")
+        backfill()
+
+    return True
+
+
+if __name__ == "__main__":
+    applied = run_migrations()
+    print("Migrations applied." if applied else "Schema already at head.")
+    print(startup_timings.snapshot())
@@ -0,0 +1,194 @@
+"""Full-text search index over users and their profiles
+
+The index is kept in sync by database triggers so every write path
+(signup, profile updates, admin scripts) is covered without application hooks.
+
+- SQLite: an FTS5 virtual table ``user_search`` whose rowid is the user id
+- PostgreSQL: a ``user_search`` table with a weighted ``tsvector`` (GIN) and a
+  pg_trgm index on the raw document for fuzzy matches
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+# Columns that feed the search document, in weight order
+SEARCH_COLUMNS = ("username", "name", "full_name", "college_name", "skills")
+
+# Set once the index has been created for the active dialect
+_enabled_dialect = None
+
+
+def search_index_dialect():
+    """Return the dialect name the index was built for, or None if unavailable"""
+    return _enabled_dialect
+
+
+_SQLITE_REFRESH = """
+    DELETE FROM user_search WHERE rowid = {uid};
+    INSERT INTO user_search (rowid, username, name, full_name, college_name, skills)
+    SELECT u.id, u.username, u.name, p.full_name, p.college_name, p.skills
+    FROM users u LEFT JOIN user_profiles p ON p.user_id = u.id
+    WHERE u.id = {uid};
+"""
+
+_SQLITE_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS user_search_users_ai AFTER INSERT ON users BEGIN
+    """ + _SQLITE_REFRESH.format(uid="NEW.id") + " END",
+    """
+    CREATE TRIGGER IF NOT EXISTS user_search_users_au AFTER UPDATE OF username, name ON users BEGIN
+    """ + _SQLITE_REFRESH.format(uid="NEW.id") + " END",
+    """
+    CREATE TRIGGER IF NOT EXISTS user_search_users_ad AFTER DELETE ON users BEGIN
+        DELETE FROM user_search WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_search_profiles_ai AFTER INSERT ON user_profiles BEGIN
+    """ + _SQLITE_REFRESH.format(uid="NEW.user_id") + " END",
+    """
+    CREATE TRIGGER IF NOT EXISTS user_search_profiles_au
+    AFTER UPDATE OF full_name, college_name, skills ON user_profiles BEGIN
+    """ + _SQLITE_REFRESH.format(uid="NEW.user_id") + " END",
+    """
+    CREATE TRIGGER IF NOT EXISTS user_search_profiles_ad AFTER DELETE ON user_profiles BEGIN
+    """ + _SQLITE_REFRESH.format(uid="OLD.user_id") + " END",
+]
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE TABLE IF NOT EXISTS user_search (
+        user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+        document TEXT NOT NULL,
+        tsv TSVECTOR NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_user_search_tsv ON user_search USING GIN (tsv)",
+    "CREATE INDEX IF NOT EXISTS ix_user_search_trgm ON user_search USING GIN (document gin_trgm_ops)",
+    """
+    CREATE OR REPLACE FUNCTION user_search_refresh(uid INTEGER) RETURNS void AS $$
+    BEGIN
+        DELETE FROM user_search WHERE user_id = uid;
+        INSERT INTO user_search (user_id, document, tsv)
+        SELECT u.id,
+               lower(concat_ws(' ', u.username, u.name, p.full_name, p.college_name, p.skills)),
+               setweight(to_tsvector('simple', coalesce(u.username, '')), 'A') ||
+               setweight(to_tsvector('simple', coalesce(u.name, '') || ' ' || coalesce(p.full_name, '')), 'B') ||
+               setweight(to_tsvector('simple', coalesce(p.college_name, '')), 'C') ||
+               setweight(to_tsvector('simple', coalesce(p.skills, '')), 'D')
+        FROM users u LEFT JOIN user_profiles p ON p.user_id = u.id
+        WHERE u.id = uid;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION user_search_users_trigger() RETURNS trigger AS $$
+    BEGIN
+        PERFORM user_search_refresh(NEW.id);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION user_search_profiles_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM user_search_refresh(OLD.user_id);
+            RETURN OLD;
+        END IF;
+        PERFORM user_search_refresh(NEW.user_id);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS user_search_users ON users",
+    """
+    CREATE TRIGGER user_search_users AFTER INSERT OR UPDATE OF username, name ON users
+    FOR EACH ROW EXECUTE FUNCTION user_search_users_trigger()
+    """,
+    "DROP TRIGGER IF EXISTS user_search_profiles ON user_profiles",
+    """
+    CREATE TRIGGER user_search_profiles
+    AFTER INSERT OR DELETE OR UPDATE OF full_name, college_name, skills ON user_profiles
+    FOR EACH ROW EXECUTE FUNCTION user_search_profiles_trigger()
+    """,
+]
+
+
+def _ensure_sqlite(conn) -> None:
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_search'"
+    )).first()
+
+    if not exists:
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE user_search USING fts5("
+            "username, name, full_name, college_name, skills, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+        ))
+        # Backfill existing users once; triggers keep it current afterwards
+        conn.execute(text(
+            "INSERT INTO user_search (rowid, username, name, full_name, college_name, skills) "
+            "SELECT u.id, u.username, u.name, p.full_name, p.college_name, p.skills "
+            "FROM users u LEFT JOIN user_profiles p ON p.user_id = u.id"
+        ))
+
+    for statement in _SQLITE_DDL:
+        conn.execute(text(statement))
+
+
+def _ensure_postgres(conn) -> None:
+    for statement in _POSTGRES_DDL:
+        conn.execute(text(statement))
+
+    # Backfill users that predate the triggers
+    conn.execute(text(
+        "SELECT user_search_refresh(u.id) FROM users u "
+        "WHERE NOT EXISTS (SELECT 1 FROM user_search s WHERE s.user_id = u.id)"
+    ))
+
+
+def ensure_user_search_index(engine: Engine) -> bool:
+    """
+    Create the search index and its triggers if missing (idempotent)
+
+    Returns:
+        True if an indexed search backend is available for this database
+    """
+    global _enabled_dialect
+
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                _ensure_sqlite(conn)
+            elif dialect == "postgresql":
+                _ensure_postgres(conn)
+            else:
+                return False
+    except Exception as e:
+        # e.g. SQLite built without FTS5 or missing pg_trgm privileges
+        print(f"User search index unavailable, falling back to LIKE search: {e}")
+        return False
+
+    _enabled_dialect = dialect
+    return True
+
+
+def detect_user_search_index(engine: Engine) -> bool:
+    """
+    Enable indexed search if the index already exists, without running DDL
+
+    Used by processes that did not run the migration preflight themselves.
+    """
+    global _enabled_dialect
+
+    dialect = engine.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return False
+
+    if not inspect(engine).has_table("user_search"):
+        return False
+
+    _enabled_dialect = dialect
+    return True
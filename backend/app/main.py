@@ -4,7 +4,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.api.v1 import analysis, auth, profiles, platforms
-from app.api.v1 import ai_analysis
+from app.api.v1 import ai_analysis, leaderboards, admin
 from app.core.config import settings
 from app.db.database import engine, Base
 import os
@@ -96,22 +96,28 @@ if __name__ == "__main__":
     )
 '''
 
+import asyncio
 import os
-import subprocess
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.api.v1 import analysis, auth, profiles, platforms
-from app.api.v1 import ai_analysis
+from app.api.v1 import ai_analysis, leaderboards, admin
 from app.core.config import settings
-from app.db.database import engine, Base
+from app.core.metrics import startup_timings
+from app.db.database import ReadYourWritesMiddleware, SessionLocal
+from app.db.migrations import run_migrations
+from app.services.autocomplete_index import autocomplete_index
+from app.services.llm_providers import providers
+from app.services.llm_scheduler import LLMRejectedError
+from app.services.llm_telemetry import EndpointTelemetryMiddleware, LLMTelemetryService, telemetry_buffer
+from app.services.percentile_service import percentile_service
+from app.services.token_cleanup_service import TokenCleanupService
 
 
-# Create database tables (fallback safety)
-Base.metadata.create_all(bind=engine)
-
 # Create uploads directory if it doesn't exist
 os.makedirs("uploads/resumes", exist_ok=True)
 
@@ -124,16 +130,181 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# ---------- AUTO DB MIGRATIONS (Render Free Tier Compatible) ----------
+
+@app.exception_handler(LLMRejectedError)
+async def llm_rejected(request: Request, exc: LLMRejectedError):
+    """Quota and overload refusals: tell the client when to come back"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+# ---------- DB MIGRATIONS (registered first: later hooks need the schema) ----------
+@app.on_event("startup")
+def prepare_database():
+    # Skips unless the schema is behind; only one worker migrates at a time
+    with startup_timings.phase("migrations"):
+        applied = run_migrations()
+    print("Migrations completed." if applied else "Database schema is current.")
+# ------------------------------------------------------------------------------------
+
+
+def _persist_percentiles():
+    db = SessionLocal()
+    try:
+        # Nothing to merge: still pick up other workers' updates and reseeds
+        if not percentile_service.persist(db):
+            percentile_service.load(db)
+    finally:
+        db.close()
+
+
+async def _persist_percentiles_periodically():
+    while True:
+        await asyncio.sleep(settings.PERCENTILE_PERSIST_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(_persist_percentiles)
+        except Exception as e:
+            print("Percentile sketch persist failed:", e)
+
+
 @app.on_event("startup")
-def run_migrations():
+async def start_percentile_sketches():
+    db = SessionLocal()
     try:
-        print("Running Alembic migrations...")
-        subprocess.run(["alembic", "upgrade", "head"], check=True)
-        print("Migrations completed.")
+        with startup_timings.phase("percentile_sketches"):
+            percentile_service.load(db)
+    finally:
+        db.close()
+    asyncio.create_task(_persist_percentiles_periodically())
+
+
+@app.on_event("shutdown")
+def flush_percentile_sketches():
+    _persist_percentiles()
+
+
+def _reseed_percentiles():
+    db = SessionLocal()
+    try:
+        observed = percentile_service.seed(db)
+        print(f"Percentile sketches rebuilt from {observed} records.")
+    finally:
+        db.close()
+
+
+async def _reseed_percentiles_periodically():
+    while True:
+        await asyncio.sleep(settings.PERCENTILE_RESEED_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(_reseed_percentiles)
+        except Exception as e:
+            print("Percentile sketch reseed failed:", e)
+
+
+@app.on_event("startup")
+async def start_percentile_reseed():
+    if settings.PERCENTILE_RESEED_INTERVAL_SECONDS:
+        asyncio.create_task(_reseed_percentiles_periodically())
+
+
+def _flush_llm_telemetry(purge: bool = False):
+    db = SessionLocal()
+    try:
+        telemetry_buffer.flush(db)
+        if purge:
+            LLMTelemetryService(db).purge()
+    finally:
+        db.close()
+
+
+async def _flush_llm_telemetry_periodically():
+    flushes_per_purge = max(3600 // settings.LLM_TELEMETRY_FLUSH_SECONDS, 1)
+    flushes = 0
+    while True:
+        await asyncio.sleep(settings.LLM_TELEMETRY_FLUSH_SECONDS)
+        try:
+            # Expired calls are purged about once an hour
+            await asyncio.to_thread(_flush_llm_telemetry, flushes % flushes_per_purge == 0)
+        except Exception as e:
+            print("LLM telemetry flush failed:", e)
+        flushes += 1
+
+
+@app.on_event("startup")
+async def start_llm_telemetry():
+    asyncio.create_task(_flush_llm_telemetry_periodically())
+
+
+@app.on_event("shutdown")
+def flush_llm_telemetry():
+    _flush_llm_telemetry()
+
+
+def _purge_email_tokens():
+    db = SessionLocal()
+    try:
+        deleted = TokenCleanupService(db).purge()
+        if deleted:
+            print(f"Purged {deleted} stale email tokens.")
+    finally:
+        db.close()
+
+
+async def _purge_email_tokens_periodically():
+    while True:
+        try:
+            await asyncio.to_thread(_purge_email_tokens)
+        except Exception as e:
+            print("Email token purge failed:", e)
+        await asyncio.sleep(settings.EMAIL_TOKEN_PURGE_INTERVAL_SECONDS)
+
+
+@app.on_event("startup")
+async def start_email_token_purge():
+    asyncio.create_task(_purge_email_tokens_periodically())
+
+
+@app.on_event("startup")
+def warm_up_llm_providers():
+    try:
+        with startup_timings.phase("llm_providers"):
+            providers.warm_up()
     except Exception as e:
-        print("Migration failed:", e)
-# ----------------------------------------------------------------------
+        print("LLM provider warm-up failed:", e)
+
+
+def _sync_autocomplete_index():
+    db = SessionLocal()
+    try:
+        autocomplete_index.sync(db)
+    finally:
+        db.close()
+
+
+async def _sync_autocomplete_index_periodically():
+    while True:
+        await asyncio.sleep(settings.AUTOCOMPLETE_SYNC_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(_sync_autocomplete_index)
+        except Exception as e:
+            print("Autocomplete index sync failed:", e)
+
+
+@app.on_event("startup")
+async def build_autocomplete_index():
+    db = SessionLocal()
+    try:
+        with startup_timings.phase("autocomplete_index"):
+            autocomplete_index.build(db)
+        print(f"Autocomplete index built for {len(autocomplete_index)} users.")
+    finally:
+        db.close()
+    # Picks up writes handled by other workers
+    if settings.AUTOCOMPLETE_SYNC_INTERVAL_SECONDS:
+        asyncio.create_task(_sync_autocomplete_index_periodically())
 
 
 # Mount static files for uploads
@@ -148,6 +319,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Labels LLM call telemetry with the route being served
+app.add_middleware(EndpointTelemetryMiddleware)
+
+# Keeps a user's reads on the primary right after they write
+app.add_middleware(ReadYourWritesMiddleware)
+
 # Include routers
 app.include_router(
     auth.router,
@@ -179,6 +356,18 @@ app.include_router(
     tags=["AI Analysis"]
 )
 
+app.include_router(
+    leaderboards.router,
+    prefix="/api/v1/leaderboards",
+    tags=["Leaderboards"]
+)
+
+app.include_router(
+    admin.router,
+    prefix="/api/v1/admin",
+    tags=["Admin"]
+)
+
 # Root endpoint
 @app.get("/")
 async def root():
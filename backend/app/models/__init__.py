@@ -3,5 +3,17 @@ from app.models.user import User
 from app.models.user_profile import UserProfile
 from app.models.email_token import EmailToken
 from app.models.platform_data import PlatformData
+from app.models.skill import Skill, UserSkill
+from app.models.leaderboard import LeaderboardEntry
+from app.models.metric_sketch import MetricSketch
+from app.models.platform_metric import PlatformMetric
+from app.models.ai_analysis import AIAnalysis
+from app.models.chat import ChatConversation, ChatMessage
+from app.models.llm_usage import LLMUsage
+from app.models.llm_call import LLMCall
 
-__all__ = ["User", "UserProfile", "EmailToken", "PlatformData"]
+__all__ = [
+    "User", "UserProfile", "EmailToken", "PlatformData", "Skill", "UserSkill",
+    "LeaderboardEntry", "MetricSketch", "PlatformMetric", "AIAnalysis",
+    "ChatConversation", "ChatMessage", "LLMUsage", "LLMCall",
+]
@@ -0,0 +1,29 @@
+"""Cached AI analyses"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class AIAnalysis(Base):
+    """Parsed analysis of one version of a user's platform data"""
+    __tablename__ = "ai_analyses"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    platform = Column(String(50), nullable=False)
+    
+    # SHA-256 of the canonical JSON of PlatformData.data
+    data_hash = Column(String(64), nullable=False)
+    # Model and prompt version that produced the analysis
+    prompt_version = Column(String(100), nullable=False)
+    
+    analysis = Column(JSON, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "platform", "data_hash", "prompt_version", name="uq_ai_analysis_version"),
+        Index("ix_ai_analyses_user_platform", "user_id", "platform"),
+    )
+    
+    def __repr__(self):
+        return f"<AIAnalysis {self.platform} user_id={self.user_id} {self.data_hash[:8]}>"
@@ -0,0 +1,56 @@
+"""Server-side chat conversations"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class ChatConversation(Base):
+    """A user's running conversation with one platform's assistant"""
+    __tablename__ = "chat_conversations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    platform = Column(String(50), nullable=False)
+    
+    # Rolling summary of every message up to and including summarized_through
+    summary = Column(Text, nullable=True)
+    summarized_through = Column(Integer, nullable=True)  # ChatMessage.id
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    messages = relationship(
+        "ChatMessage",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="ChatMessage.id"
+    )
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "platform", name="uq_chat_conversation_user_platform"),
+    )
+    
+    def __repr__(self):
+        return f"<ChatConversation {self.platform} user_id={self.user_id}>"
+
+
+class ChatMessage(Base):
+    """One message of a conversation; messages are only ever appended"""
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("chat_conversations.id", ondelete="CASCADE"), nullable=False)
+    role = Column(String(20), nullable=False)  # user or assistant
+    content = Column(Text, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    conversation = relationship("ChatConversation", back_populates="messages")
+    
+    __table_args__ = (
+        Index("ix_chat_messages_conversation_id", "conversation_id", "id"),
+    )
+    
+    def __repr__(self):
+        return f"<ChatMessage {self.role} conversation_id={self.conversation_id}>"
@@ -1,5 +1,5 @@
 """Email verification token model"""
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -26,5 +26,12 @@ class EmailToken(Base):
     # Relationships
     user = relationship("User", back_populates="email_tokens")
     
+    __table_args__ = (
+        # Verification / reset lookups filter on all four columns
+        Index("ix_email_tokens_lookup", "user_id", "token_type", "used", "expires_at"),
+        # Purge job scans by expiry
+        Index("ix_email_tokens_expires_at", "expires_at"),
+    )
+    
     def __repr__(self):
         return f"<EmailToken {self.token_type} user_id={self.user_id}>"
@@ -0,0 +1,35 @@
+"""Materialized leaderboard entries"""
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class LeaderboardEntry(Base):
+    """One ranked metric value per user, platform and metric"""
+    __tablename__ = "leaderboard_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    platform = Column(String(50), nullable=False)
+    metric = Column(String(50), nullable=False)  # key in PlatformData.data, e.g. total_solved
+    value = Column(Float, nullable=False)
+    
+    # Cohort columns denormalized from UserProfile for filtered leaderboards
+    college_name = Column(String(200))
+    graduation_year = Column(Integer)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="leaderboard_entries")
+    
+    # Each index serves top-N scans and "count above me" ranks for one cohort type
+    __table_args__ = (
+        UniqueConstraint("user_id", "platform", "metric", name="uq_leaderboard_user_metric"),
+        Index("ix_leaderboard_global", "platform", "metric", "value"),
+        Index("ix_leaderboard_college", "platform", "metric", "college_name", "value"),
+        Index("ix_leaderboard_graduation", "platform", "metric", "graduation_year", "value"),
+    )
+    
+    def __repr__(self):
+        return f"<LeaderboardEntry {self.platform}.{self.metric}={self.value} user_id={self.user_id}>"
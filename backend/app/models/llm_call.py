@@ -0,0 +1,43 @@
+"""Telemetry of individual LLM provider calls"""
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class LLMCall(Base):
+    """One provider call: prompt, model, tokens, latency and outcome"""
+    __tablename__ = "llm_calls"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    # Where the call came from ("METHOD /path" of the request, or "background")
+    endpoint = Column(String(200), nullable=True)
+    priority = Column(String(20), nullable=True)
+    # No foreign key: telemetry outlives deleted users
+    user_id = Column(Integer, nullable=True, index=True)
+    
+    provider = Column(String(20), nullable=False)
+    model = Column(String(100), nullable=True)
+    prompt_name = Column(String(100), nullable=False)
+    prompt_version = Column(String(50), nullable=True)
+    attempt = Column(Integer, nullable=False, default=1)
+    
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+    latency_ms = Column(Float, nullable=False)
+    ttft_ms = Column(Float, nullable=True)  # streamed calls only
+    
+    # ok, error, timeout or cancelled
+    outcome = Column(String(20), nullable=False)
+    # ok or failed for calls whose output is parsed as JSON
+    parse_outcome = Column(String(20), nullable=True)
+    error = Column(String(300), nullable=True)
+    
+    __table_args__ = (
+        Index("ix_llm_calls_prompt_created", "prompt_name", "created_at"),
+        Index("ix_llm_calls_created", "created_at"),
+    )
+    
+    def __repr__(self):
+        return f"<LLMCall {self.prompt_name} {self.provider}/{self.model} {self.outcome} {self.latency_ms}ms>"
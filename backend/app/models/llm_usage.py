@@ -0,0 +1,24 @@
+"""Daily LLM token usage per user"""
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class LLMUsage(Base):
+    """Tokens a user's requests consumed on one (UTC) day"""
+    __tablename__ = "llm_usage"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    
+    tokens = Column(Integer, nullable=False, default=0)
+    requests = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", name="uq_llm_usage_user_day"),
+    )
+    
+    def __repr__(self):
+        return f"<LLMUsage user_id={self.user_id} {self.day} tokens={self.tokens}>"
@@ -0,0 +1,25 @@
+"""Persisted quantile sketches for population percentiles"""
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class MetricSketch(Base):
+    """Serialized KLL sketch of one platform metric across all users"""
+    __tablename__ = "metric_sketches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    platform = Column(String(50), nullable=False)
+    metric = Column(String(50), nullable=False)
+    
+    # KLLSketch.to_dict() state
+    state = Column(JSON, nullable=False)
+    sample_count = Column(Integer, default=0)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("platform", "metric", name="uq_metric_sketch"),
+    )
+    
+    def __repr__(self):
+        return f"<MetricSketch {self.platform}.{self.metric} n={self.sample_count}>"
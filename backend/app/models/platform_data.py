@@ -12,7 +12,7 @@ class PlatformData(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     platform_name = Column(String(50), nullable=False)
     
-    # Cached data
+    # Cached data (raw payload for display; numeric values are also in platform_metrics)
     data = Column(JSON, nullable=False)
     
     # Update tracking
@@ -23,6 +23,7 @@ class PlatformData(Base):
     
     # Relationships
     user = relationship("User", back_populates="platform_data")
+    metrics = relationship("PlatformMetric", back_populates="platform_data", cascade="all, delete-orphan")
     
     # Unique constraint on user_id and platform_name
     __table_args__ = (
@@ -0,0 +1,30 @@
+"""Typed, indexable platform metrics"""
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from app.db.database import Base
+
+class PlatformMetric(Base):
+    """One numeric metric extracted from a PlatformData JSON payload"""
+    __tablename__ = "platform_metrics"
+
+    id = Column(Integer, primary_key=True, index=True)
+    platform_data_id = Column(Integer, ForeignKey("platform_data.id", ondelete="CASCADE"), nullable=False)
+    
+    # Denormalized from PlatformData so filters don't need the join
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    platform = Column(String(50), nullable=False)
+    
+    metric = Column(String(100), nullable=False)  # data key; nested keys are dotted
+    value = Column(Float, nullable=False)  # integers up to 2**53 are exact
+    
+    # Relationships
+    platform_data = relationship("PlatformData", back_populates="metrics")
+    
+    __table_args__ = (
+        UniqueConstraint("platform_data_id", "metric", name="uq_platform_metric"),
+        Index("ix_platform_metrics_value", "platform", "metric", "value"),
+        Index("ix_platform_metrics_user", "user_id", "platform"),
+    )
+    
+    def __repr__(self):
+        return f"<PlatformMetric {self.platform}.{self.metric}={self.value}>"
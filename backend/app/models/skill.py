@@ -0,0 +1,35 @@
+"""Normalized skills dictionary and user-skill associations"""
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.db.database import Base
+
+class Skill(Base):
+    """A distinct skill, keyed by its normalized (lowercased) name"""
+    __tablename__ = "skills"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, index=True, nullable=False)  # normalized key
+    display_name = Column(String(100), nullable=False)  # first spelling seen
+    
+    def __repr__(self):
+        return f"<Skill {self.name}>"
+
+
+class UserSkill(Base):
+    """Join table between users and skills"""
+    __tablename__ = "user_skills"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    skill_id = Column(Integer, ForeignKey("skills.id", ondelete="CASCADE"), primary_key=True)
+    
+    # Relationships
+    user = relationship("User", back_populates="user_skills")
+    skill = relationship("Skill")
+    
+    # Primary key covers user -> skills; this covers skill -> users
+    __table_args__ = (
+        Index("ix_user_skills_skill_user", "skill_id", "user_id"),
+    )
+    
+    def __repr__(self):
+        return f"<UserSkill user_id={self.user_id} skill_id={self.skill_id}>"
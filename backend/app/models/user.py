@@ -32,6 +32,8 @@ class User(Base):
     profile = relationship("UserProfile", back_populates="user", uselist=False, cascade="all, delete-orphan")
     email_tokens = relationship("EmailToken", back_populates="user", cascade="all, delete-orphan")
     platform_data = relationship("PlatformData", back_populates="user", cascade="all, delete-orphan")
+    user_skills = relationship("UserSkill", back_populates="user", cascade="all, delete-orphan")
+    leaderboard_entries = relationship("LeaderboardEntry", back_populates="user", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<User {self.username}>"
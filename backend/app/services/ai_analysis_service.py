@@ -1,24 +1,201 @@
 """AI Analysis Service for Platform Data"""
+import math
 import google.generativeai as genai
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
-import json
-from app.core.config import settings
+from app.core.json_repair import JSONRepairError, parse_json_response
+from app.core.metrics import metrics
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_providers import providers
+from app.services.llm_telemetry import begin_call, llm_call
+from app.services.local_analysis import (
+    PLATFORM_NAMES,
+    PLATFORM_RULES,
+    profile_bands,
+    profile_numbers,
+    rule_based_analysis,
+)
+from app.services.prompt_registry import CHARS_PER_TOKEN, PromptTemplate, estimate_tokens, prompts, truncate_text
+from app.services.prompt_templates import (
+    ANALYSIS_COMBINED,
+    ANALYSIS_COMBINED_SECTION,
+    ANALYSIS_ENRICH,
+    ANALYSIS_ENRICH_SECTION,
+    ANALYSIS_PLATFORM,
+    ANALYSIS_PROMPTS,
+    CHAT_PLATFORM,
+    CHAT_PLATFORM_OPENING,
+    CHAT_SUMMARY,
+    CHAT_SUMMARY_TOKENS,
+)
+
+# Use gemini-flash-latest which is the stable latest flash model
+MODEL_NAME = "gemini-flash-latest"
+
+# Bump when the analysis output changes in a way the prompt templates and
+# local rules do not capture; cached analyses from other versions are then
+# regenerated
+PROMPT_VERSION = "4"
+
+# Generations per analysis when the output cannot be parsed even after repair
+MAX_GENERATION_ATTEMPTS = 2
+
+_SCORED_TOPIC = {
+    "type": "object",
+    "properties": {
+        "topic": {"type": "string"},
+        "score": {"type": "number"},
+        "description": {"type": "string"},
+    },
+    "required": ["topic", "score", "description"],
+}
+
+# Response schema for analyses (Gemini structured output)
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "percentileRank": {"type": "number"},
+        "globalRanking": {"type": "string"},
+        "overallScore": {"type": "number"},
+        "strengths": {"type": "array", "items": _SCORED_TOPIC},
+        "weaknesses": {"type": "array", "items": _SCORED_TOPIC},
+        "recommendations": {"type": "array", "items": {"type": "string"}},
+        "weeklyPlan": {
+            "type": "object",
+            "properties": {f"day{day}": {"type": "string"} for day in range(1, 8)},
+            "required": [f"day{day}" for day in range(1, 8)],
+        },
+        "keyMetrics": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "value": {"type": "string"},
+                    "benchmark": {"type": "string"},
+                    "status": {"type": "string"},
+                },
+                "required": ["name", "value", "status"],
+            },
+        },
+        "topicBreakdown": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "topic": {"type": "string"},
+                    "solved": {"type": "integer"},
+                    "total": {"type": "integer"},
+                    "proficiency": {"type": "number"},
+                },
+                "required": ["topic", "proficiency"],
+            },
+        },
+    },
+    "required": [
+        "globalRanking", "overallScore", "strengths", "weaknesses",
+        "recommendations", "weeklyPlan", "keyMetrics",
+    ],
+}
+
+# Python types of the fields every analysis must have (ANALYSIS_SCHEMA's
+# "required"); a repaired response lacking one is treated as unparseable
+REQUIRED_FIELD_TYPES = {
+    "globalRanking": str,
+    "overallScore": (int, float),
+    "strengths": list,
+    "weaknesses": list,
+    "recommendations": list,
+    "weeklyPlan": dict,
+    "keyMetrics": list,
+}
+
+
+def incomplete_fields(analysis: Dict[str, Any]) -> List[str]:
+    """Required fields missing from, or mistyped in, a parsed analysis"""
+    return [
+        key for key, types in REQUIRED_FIELD_TYPES.items()
+        if not isinstance(analysis.get(key), types) or isinstance(analysis.get(key), bool)
+    ]
+
+
+def analysis_schema(percentile_rank: Optional[float] = None) -> Dict[str, Any]:
+    """Response schema, asking for percentileRank only when not precomputed"""
+    if percentile_rank is not None:
+        return ANALYSIS_SCHEMA
+    return {**ANALYSIS_SCHEMA, "required": ["percentileRank"] + ANALYSIS_SCHEMA["required"]}
+
+
+def combined_analysis_schema(percentile_ranks: Dict[str, Optional[float]]) -> Dict[str, Any]:
+    """Response schema with one analysis section per platform"""
+    return {
+        "type": "object",
+        "properties": {
+            platform: analysis_schema(rank) for platform, rank in percentile_ranks.items()
+        },
+        "required": list(percentile_ranks),
+    }
+
+
+# Response schema for enriching a rule-based analysis
+ENRICHMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendations": ANALYSIS_SCHEMA["properties"]["recommendations"],
+        "weeklyPlan": ANALYSIS_SCHEMA["properties"]["weeklyPlan"],
+    },
+    "required": ["recommendations", "weeklyPlan"],
+}
+
+
+# What an analysis should weigh for each platform
+PLATFORM_FOCUS = {
+    "github": "contribution consistency, repository quality (stars, forks), community engagement, language diversity",
+    "leetcode": "problem volume and difficulty mix, acceptance rate, contest performance",
+    "geeksforgeeks": "problems solved by difficulty, coding score, streak",
+    "codechef": "rating and stars, contest participation, problems solved",
+    "hackerrank": "badges, certifications, domain coverage",
+    "devpost": "hackathons, projects, prizes, technology range",
+    "devto": "articles, reactions, followers, posting consistency",
+    "linkedin": "experience, skills, endorsements, network size",
+}
+
+# Extra output fields asked for per platform
+PLATFORM_EXTRA_FIELDS = {
+    "leetcode": '- topicBreakdown: {"topic" (algorithm/data structure), "solved", "total", "proficiency" (0-100)}\n',
+}
+
+SUPPORTED_PLATFORMS = tuple(PLATFORM_RULES)
+
+# What the platform chat advises on, per platform
+PLATFORM_CHAT_CONTEXTS = {
+    "github": "GitHub profile optimization, repository management, contribution strategies, open source collaboration, and code quality",
+    "leetcode": "LeetCode problem-solving strategies, algorithm patterns, data structures, contest preparation, and coding interview techniques",
+    "geeksforgeeks": "GeeksforGeeks practice problems, competitive programming, DSA concepts, and technical interview preparation",
+    "codechef": "CodeChef contest strategies, competitive programming techniques, rating improvement, and problem-solving approaches",
+    "hackerrank": "HackerRank skill development, certification preparation, domain-specific challenges, and technical assessments",
+    "devpost": "Hackathon participation, project showcasing, team collaboration, and innovation strategies",
+    "devto": "Technical blogging, community engagement, content creation, and developer networking",
+    "linkedin": "Professional networking, profile optimization, career development, and industry connections"
+}
+
 
 class AIAnalysisService:
     """Service for AI-powered analysis of platform data"""
     
+    # Identifies the model + prompts behind a stored analysis
+    ANALYSIS_VERSION = f"{MODEL_NAME}:{PROMPT_VERSION}:{prompts.version(ANALYSIS_PROMPTS)}"
+    
     def __init__(self):
-        """Initialize AI Analysis Service with Gemini"""
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        # Use gemini-flash-latest which is the stable latest flash model
-        self.model = genai.GenerativeModel('gemini-flash-latest')
+        """Initialize AI Analysis Service with the shared Gemini model"""
+        self.model = providers.gemini_model(MODEL_NAME)
     
-    def analyze_platform_data(
+    async def analyze_platform_data(
         self,
         platform: str,
         user_data: Dict[str, Any],
-        username: str
+        username: str,
+        percentile_rank: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Comprehensive AI analysis of platform data
@@ -27,311 +204,304 @@ class AIAnalysisService:
             platform: Platform name (github, leetcode, etc.)
             user_data: User's platform data
             username: User's username on the platform
+            percentile_rank: Population percentile computed from real data;
+                when given the model is not asked to estimate one
             
         Returns:
             Complete analysis with ranking, strengths, weaknesses, and plan
         """
         
-        # Generate analysis based on platform
-        if platform == "github":
-            return self._analyze_github(user_data, username)
-        elif platform == "leetcode":
-            return self._analyze_leetcode(user_data, username)
-        elif platform == "geeksforgeeks":
-            return self._analyze_geeksforgeeks(user_data, username)
-        elif platform == "codechef":
-            return self._analyze_codechef(user_data, username)
-        elif platform == "hackerrank":
-            return self._analyze_hackerrank(user_data, username)
-        elif platform == "devpost":
-            return self._analyze_devpost(user_data, username)
-        elif platform == "devto":
-            return self._analyze_devto(user_data, username)
-        elif platform == "linkedin":
-            return self._analyze_linkedin(user_data, username)
-        else:
+        if platform not in SUPPORTED_PLATFORMS:
             raise ValueError(f"Unsupported platform: {platform}")
-    
-    def _analyze_github(self, data: Dict[str, Any], username: str) -> Dict[str, Any]:
-        """Analyze GitHub profile data"""
         
-        prompt = f"""
-Analyze this GitHub profile data and provide a comprehensive assessment:
-
-Username: {username}
-Public Repos: {data.get('publicRepos', 0)}
-Followers: {data.get('followers', 0)}
-Following: {data.get('following', 0)}
-Total Stars: {data.get('totalStars', 0)}
-Total Forks: {data.get('totalForks', 0)}
-Contributions (Last Year): {data.get('contributionsLastYear', 0)}
-Top Languages: {', '.join(data.get('topLanguages', [])[:5])}
-
-Provide analysis in this exact JSON format:
-{{
-    "percentileRank": <number 0-100>,
-    "globalRanking": "<description of where user stands>",
-    "overallScore": <number 0-100>,
-    "strengths": [
-        {{"topic": "<strength area>", "score": <0-100>, "description": "<why it's strong>"}}
-    ],
-    "weaknesses": [
-        {{"topic": "<weakness area>", "score": <0-100>, "description": "<why it needs improvement>"}}
-    ],
-    "recommendations": [
-        "<specific actionable recommendation>"
-    ],
-    "weeklyPlan": {{
-        "day1": "<specific task>",
-        "day2": "<specific task>",
-        "day3": "<specific task>",
-        "day4": "<specific task>",
-        "day5": "<specific task>",
-        "day6": "<specific task>",
-        "day7": "<specific task>"
-    }},
-    "keyMetrics": [
-        {{"name": "<metric name>", "value": "<value>", "benchmark": "<industry benchmark>", "status": "good|average|needs_improvement"}}
-    ]
-}}
-
-Base percentile ranking on:
-- Contribution frequency and consistency
-- Repository quality (stars, forks)
-- Community engagement (followers)
-- Language diversity
-- Project impact
-
-Provide 3-5 strengths and weaknesses each. Make recommendations specific and actionable.
-"""
-        
-        response = self.model.generate_content(prompt)
-        
-        # Parse JSON from response
-        response_text = response.text
-        # Remove markdown code blocks if present
-        if '```json' in response_text:
-            response_text = response_text.split('```json')[1].split('```')[0].strip()
-        elif '```' in response_text:
-            response_text = response_text.split('```')[1].split('```')[0].strip()
-        
-        analysis = json.loads(response_text)
-        analysis["platform"] = "github"
-        analysis["username"] = username
-        analysis["analyzedAt"] = datetime.utcnow().isoformat()
-        
-        return analysis
+        prompt = ANALYSIS_PLATFORM.render(
+            platform_name=PLATFORM_NAMES[platform],
+            username=username,
+            percentile_context=self._percentile_context(percentile_rank),
+            data=user_data,
+            fields=self._analysis_fields(percentile_rank),
+            extra_fields=PLATFORM_EXTRA_FIELDS.get(platform, ""),
+            focus=PLATFORM_FOCUS[platform]
+        )
+        return await self._get_ai_analysis(prompt, platform, username, percentile_rank)
     
-    def _analyze_leetcode(self, data: Dict[str, Any], username: str) -> Dict[str, Any]:
-        """Analyze LeetCode profile data"""
-        
-        prompt = f"""
-Analyze this LeetCode profile data and provide a comprehensive assessment:
-
-Username: {username}
-Total Solved: {data.get('totalSolved', 0)}
-Easy Solved: {data.get('easySolved', 0)}
-Medium Solved: {data.get('mediumSolved', 0)}
-Hard Solved: {data.get('hardSolved', 0)}
-Acceptance Rate: {data.get('acceptanceRate', 0)}%
-Ranking: {data.get('ranking', 'N/A')}
-Reputation: {data.get('reputation', 0)}
-Contest Rating: {data.get('contestRating', 'N/A')}
-Contest Attended: {data.get('contestsAttended', 0)}
-
-Provide analysis in this exact JSON format:
-{{
-    "percentileRank": <number 0-100>,
-    "globalRanking": "<description of where user stands>",
-    "overallScore": <number 0-100>,
-    "strengths": [
-        {{"topic": "<strength area>", "score": <0-100>, "description": "<why it's strong>"}}
-    ],
-    "weaknesses": [
-        {{"topic": "<weakness area>", "score": <0-100>, "description": "<why it needs improvement>"}}
-    ],
-    "recommendations": [
-        "<specific actionable recommendation>"
-    ],
-    "weeklyPlan": {{
-        "day1": "<specific task with problem types>",
-        "day2": "<specific task with problem types>",
-        "day3": "<specific task with problem types>",
-        "day4": "<specific task with problem types>",
-        "day5": "<specific task with problem types>",
-        "day6": "<specific task with problem types>",
-        "day7": "<specific task with problem types>"
-    }},
-    "keyMetrics": [
-        {{"name": "<metric name>", "value": "<value>", "benchmark": "<industry benchmark>", "status": "good|average|needs_improvement"}}
-    ],
-    "topicBreakdown": [
-        {{"topic": "<algorithm/data structure>", "solved": <number>, "total": <number>, "proficiency": <0-100>}}
-    ]
-}}
-
-Base percentile ranking on:
-- Total problems solved
-- Difficulty distribution (hard problems weighted more)
-- Contest performance
-- Acceptance rate
-- Consistency
-
-Provide specific problem-solving strategies and focus areas.
-"""
-        
-        response = self.model.generate_content(prompt)
-        
-        # Parse JSON from response
-        response_text = response.text
-        # Remove markdown code blocks if present
-        if '```json' in response_text:
-            response_text = response_text.split('```json')[1].split('```')[0].strip()
-        elif '```' in response_text:
-            response_text = response_text.split('```')[1].split('```')[0].strip()
-        
-        analysis = json.loads(response_text)
-        analysis["platform"] = "leetcode"
-        analysis["username"] = username
-        analysis["analyzedAt"] = datetime.utcnow().isoformat()
+    def analyze_locally(
+        self,
+        platform: str,
+        user_data: Dict[str, Any],
+        username: str,
+        percentile_rank: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Rule-based analysis, without a model call
         
-        return analysis
+        Scores, strengths, weaknesses and key metrics come from fixed rules
+        per platform (see local_analysis.PLATFORM_RULES), so the result is
+        available immediately. Its recommendations and weekly plan are
+        generic until enrich_analyses replaces them.
+        """
+        analysis = rule_based_analysis(platform, user_data, percentile_rank)
+        return self._finalize_analysis(analysis, platform, username, percentile_rank, source="rules")
     
-    def _analyze_geeksforgeeks(self, data: Dict[str, Any], username: str) -> Dict[str, Any]:
-        """Analyze GeeksforGeeks profile data"""
+    async def enrich_analyses(
+        self,
+        entries: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Personalize recommendations and weekly plans of rule-based analyses
         
-        prompt = f"""
-Analyze this GeeksforGeeks profile data:
-
-Username: {username}
-Score: {data.get('score', 0)}
-Problems Solved: {data.get('problemsSolved', 0)}
-Coding Score: {data.get('codingScore', 0)}
-Monthly Rank: {data.get('monthlyRank', 'N/A')}
-Articles Published: {data.get('articlesPublished', 0)}
-
-Provide comprehensive analysis in JSON format with percentileRank, globalRanking, overallScore, strengths, weaknesses, recommendations, weeklyPlan, and keyMetrics.
-"""
+        One model call covers all platforms; it only writes the narrative
+        parts, the scores stay as the rules computed them.
         
-        return self._get_ai_analysis(prompt, "geeksforgeeks", username)
+        Args:
+            entries: Platform name -> (platform data, rule-based analysis)
+            
+        Returns:
+            Platform name -> enriched copy of the analysis, for every
+            section the model returned
+        """
+        sections = [
+            ANALYSIS_ENRICH_SECTION.render(
+                platform=platform,
+                overall_score=analysis.get("overallScore"),
+                percentile_rank=analysis["percentileRank"] if analysis.get("percentileRank") is not None else "unknown",
+                weaknesses=", ".join(item["topic"] for item in analysis.get("weaknesses", [])) or "none",
+                data=data
+            )
+            for platform, (data, analysis) in entries.items()
+        ]
+        prompt = ANALYSIS_ENRICH.render(
+            sections="\n\n".join(sections),
+            platform_keys=", ".join(entries)
+        )
+        config = genai.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema={
+                "type": "object",
+                "properties": {platform: ENRICHMENT_SCHEMA for platform in entries},
+                "required": list(entries),
+            }
+        )
+        with llm_call(ANALYSIS_ENRICH) as call:
+            response = await llm_gateway.generate_content(self.model, prompt, generation_config=config)
+            try:
+                result = parse_json_response(response.text)
+                call.parsed(True)
+            except ValueError:
+                call.parsed(False)
+                metrics.increment("ai_analysis.parse_failures")
+                raise
+        
+        enriched = {}
+        for platform, (_, analysis) in entries.items():
+            section = result.get(platform) if isinstance(result, dict) else None
+            if not isinstance(section, dict):
+                continue
+            recommendations = section.get("recommendations")
+            weekly_plan = section.get("weeklyPlan")
+            if not isinstance(recommendations, list) or not recommendations:
+                continue
+            enriched[platform] = {
+                **analysis,
+                "recommendations": [str(item) for item in recommendations],
+                # Keep the rule-based days the (possibly truncated) plan lacks
+                "weeklyPlan": {**analysis.get("weeklyPlan", {}), **(weekly_plan if isinstance(weekly_plan, dict) else {})},
+                "source": "rules+ai",
+            }
+        return enriched
     
-    def _analyze_codechef(self, data: Dict[str, Any], username: str) -> Dict[str, Any]:
-        """Analyze CodeChef profile data"""
-        
-        prompt = f"""
-Analyze this CodeChef profile data:
-
-Username: {username}
-Rating: {data.get('rating', 0)}
-Stars: {data.get('stars', 'N/A')}
-Global Rank: {data.get('globalRank', 'N/A')}
-Country Rank: {data.get('countryRank', 'N/A')}
-Problems Solved: {data.get('problemsSolved', 0)}
-Contests: {data.get('contests', 0)}
-
-Provide comprehensive analysis in JSON format with percentileRank, globalRanking, overallScore, strengths, weaknesses, recommendations, weeklyPlan, and keyMetrics.
-"""
+    async def analyze_multiple_platforms(
+        self,
+        platforms: Dict[str, Dict[str, Any]],
+        usernames: Dict[str, str],
+        percentile_ranks: Optional[Dict[str, Optional[float]]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze several platforms with a single model call
         
-        return self._get_ai_analysis(prompt, "codechef", username)
-    
-    def _analyze_hackerrank(self, data: Dict[str, Any], username: str) -> Dict[str, Any]:
-        """Analyze HackerRank profile data"""
+        The shared instructions are sent once and each platform's data is
+        compacted, so this costs far fewer prompt tokens and round trips than
+        one analyze_platform_data call per platform.
         
-        prompt = f"""
-Analyze this HackerRank profile data:
-
-Username: {username}
-Badges: {', '.join(data.get('badges', []))}
-Challenges Solved: {data.get('challengesSolved', 0)}
-Rank: {data.get('rank', 'N/A')}
-Skills: {', '.join(data.get('skills', []))}
-
-Provide comprehensive analysis in JSON format with percentileRank, globalRanking, overallScore, strengths, weaknesses, recommendations, weeklyPlan, and keyMetrics.
-"""
+        Args:
+            platforms: Platform name -> user's platform data
+            usernames: Platform name -> username on that platform
+            percentile_ranks: Platform name -> precomputed percentile (or None)
+            
+        Returns:
+            Platform name -> analysis, for every section the model returned.
+            Sections missing from a truncated response, or lacking required
+            fields, are left out so the caller can fall back to
+            analyze_platform_data for them.
+        """
+        unsupported = set(platforms) - set(SUPPORTED_PLATFORMS)
+        if unsupported:
+            raise ValueError(f"Unsupported platform: {', '.join(sorted(unsupported))}")
         
-        return self._get_ai_analysis(prompt, "hackerrank", username)
+        percentile_ranks = {
+            platform: (percentile_ranks or {}).get(platform) for platform in platforms
+        }
+        prompt = self._build_combined_prompt(platforms, usernames, percentile_ranks)
+        config = genai.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=combined_analysis_schema(percentile_ranks)
+        )
+        
+        for attempt in range(1, MAX_GENERATION_ATTEMPTS + 1):
+            with llm_call(ANALYSIS_COMBINED, attempt) as call:
+                response = await llm_gateway.generate_content(self.model, prompt, generation_config=config)
+                try:
+                    sections = parse_json_response(response.text)
+                    if not isinstance(sections, dict):
+                        raise JSONRepairError("Expected a JSON object")
+                    call.parsed(True)
+                    break
+                except ValueError as e:
+                    call.parsed(False)
+                    metrics.increment("ai_analysis.parse_failures")
+                    if attempt == MAX_GENERATION_ATTEMPTS:
+                        raise ValueError(f"Unparseable analysis from model: {e}")
+                    metrics.increment("ai_analysis.parse_retries")
+        
+        analyses = {}
+        for platform in platforms:
+            section = sections.get(platform)
+            # A truncated response can end inside a section; only keep
+            # complete ones
+            if not isinstance(section, dict) or incomplete_fields(section):
+                metrics.increment("ai_analysis.incomplete_sections")
+                continue
+            analyses[platform] = self._finalize_analysis(
+                self._normalize_analysis(section),
+                platform,
+                usernames.get(platform, "unknown"),
+                percentile_ranks[platform]
+            )
+        return analyses
     
-    def _analyze_devpost(self, data: Dict[str, Any], username: str) -> Dict[str, Any]:
-        """Analyze DevPost profile data"""
-        
-        prompt = f"""
-Analyze this DevPost profile data:
-
-Username: {username}
-Projects: {data.get('projects', 0)}
-Hackathons: {data.get('hackathons', 0)}
-Wins: {data.get('wins', 0)}
-Likes: {data.get('likes', 0)}
-Skills: {', '.join(data.get('skills', []))}
-
-Provide comprehensive analysis in JSON format with percentileRank, globalRanking, overallScore, strengths, weaknesses, recommendations, weeklyPlan, and keyMetrics.
-"""
-        
-        return self._get_ai_analysis(prompt, "devpost", username)
+    def _build_combined_prompt(
+        self,
+        platforms: Dict[str, Dict[str, Any]],
+        usernames: Dict[str, str],
+        percentile_ranks: Dict[str, Optional[float]]
+    ) -> str:
+        """One prompt carrying every platform's compacted data"""
+        sections = [
+            ANALYSIS_COMBINED_SECTION.render(
+                platform=platform,
+                username=usernames.get(platform, "unknown"),
+                percentile_context=self._percentile_context(percentile_ranks[platform]),
+                focus=PLATFORM_FOCUS[platform],
+                data=data
+            )
+            for platform, data in platforms.items()
+        ]
+        return ANALYSIS_COMBINED.render(
+            platform_count=len(platforms),
+            sections="\n\n".join(sections),
+            platform_keys=", ".join(platforms)
+        )
     
-    def _analyze_devto(self, data: Dict[str, Any], username: str) -> Dict[str, Any]:
-        """Analyze Dev.to profile data"""
-        
-        prompt = f"""
-Analyze this Dev.to profile data:
-
-Username: {username}
-Posts: {data.get('posts', 0)}
-Followers: {data.get('followers', 0)}
-Post Reactions: {data.get('postReactions', 0)}
-Comments: {data.get('comments', 0)}
-Tags: {', '.join(data.get('tags', []))}
-
-Provide comprehensive analysis in JSON format with percentileRank, globalRanking, overallScore, strengths, weaknesses, recommendations, weeklyPlan, and keyMetrics.
-"""
-        
-        return self._get_ai_analysis(prompt, "devto", username)
+    def _percentile_context(self, percentile_rank: Optional[float]) -> str:
+        """Prompt line carrying a precomputed percentile, if any"""
+        if percentile_rank is None:
+            return ""
+        return f"Percentile among all users (computed from real data): {percentile_rank}\n"
     
-    def _analyze_linkedin(self, data: Dict[str, Any], username: str) -> Dict[str, Any]:
-        """Analyze LinkedIn profile data"""
-        
-        prompt = f"""
-Analyze this LinkedIn profile data:
-
-Name: {data.get('name', 'N/A')}
-Headline: {data.get('headline', 'N/A')}
-Connections: {data.get('connections', 0)}
-Experience: {data.get('experienceYears', 0)} years
-Skills: {', '.join(data.get('skills', [])[:10])}
-Endorsements: {data.get('endorsements', 0)}
-
-Provide comprehensive analysis in JSON format with percentileRank, globalRanking, overallScore, strengths, weaknesses, recommendations, weeklyPlan, and keyMetrics.
-"""
-        
-        return self._get_ai_analysis(prompt, "linkedin", username)
+    def _analysis_fields(self, percentile_rank: Optional[float]) -> str:
+        """Field list for the compact JSON instruction"""
+        fields = "globalRanking, overallScore, strengths, weaknesses, recommendations, weeklyPlan, and keyMetrics"
+        if percentile_rank is None:
+            return "percentileRank, " + fields
+        return fields
     
-    def _get_ai_analysis(self, prompt: str, platform: str, username: str) -> Dict[str, Any]:
-        """Generic AI analysis helper"""
-        
-        response = self.model.generate_content(prompt)
-        
-        # Parse JSON from response
-        response_text = response.text
-        # Remove markdown code blocks if present
-        if '```json' in response_text:
-            response_text = response_text.split('```json')[1].split('```')[0].strip()
-        elif '```' in response_text:
-            response_text = response_text.split('```')[1].split('```')[0].strip()
-        
-        analysis = json.loads(response_text)
+    def _normalize_analysis(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop a percentileRank that is not a number (required fields are checked on parse)"""
+        rank = analysis.get("percentileRank")
+        if not isinstance(rank, (int, float)) or isinstance(rank, bool):
+            analysis["percentileRank"] = None
+        return analysis
+    
+    def _finalize_analysis(
+        self,
+        analysis: Dict[str, Any],
+        platform: str,
+        username: str,
+        percentile_rank: Optional[float],
+        source: str = "ai"
+    ) -> Dict[str, Any]:
+        """Attach metadata and the deterministic percentile to a parsed analysis"""
+        if percentile_rank is not None:
+            analysis["percentileRank"] = percentile_rank
         analysis["platform"] = platform
         analysis["username"] = username
         analysis["analyzedAt"] = datetime.utcnow().isoformat()
-        
+        # "ai" (model), "rules" (local rules) or "rules+ai" (enriched)
+        analysis["source"] = source
         return analysis
     
-    def chat_with_platform_context(
+    async def _get_ai_analysis(self, prompt: str, platform: str, username: str, percentile_rank: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Generic AI analysis helper
+        
+        Requests schema-constrained JSON and parses it tolerantly (fences,
+        surrounding prose, truncation). Only output that cannot be repaired
+        triggers another generation.
+        """
+        
+        config = genai.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=analysis_schema(percentile_rank)
+        )
+        
+        for attempt in range(1, MAX_GENERATION_ATTEMPTS + 1):
+            with llm_call(ANALYSIS_PLATFORM, attempt) as call:
+                response = await llm_gateway.generate_content(self.model, prompt, generation_config=config)
+                try:
+                    analysis = parse_json_response(response.text)
+                    if not isinstance(analysis, dict):
+                        raise JSONRepairError("Expected a JSON object")
+                    # Cut off too early to be worth showing (or caching)
+                    missing = incomplete_fields(analysis)
+                    if missing:
+                        raise JSONRepairError(f"Incomplete analysis, missing {', '.join(missing)}")
+                    call.parsed(True)
+                    break
+                except ValueError as e:
+                    # JSONRepairError, or response.text on a blocked/empty candidate
+                    call.parsed(False)
+                    metrics.increment("ai_analysis.parse_failures")
+                    if attempt == MAX_GENERATION_ATTEMPTS:
+                        raise ValueError(f"Unparseable analysis from model: {e}")
+                    metrics.increment("ai_analysis.parse_retries")
+        
+        return self._finalize_analysis(self._normalize_analysis(analysis), platform, username, percentile_rank)
+    
+    def _summary_context(self, summary: Dict[str, Any]) -> str:
+        """Chat prompt lines for an analysis summary"""
+        def value(key: str, suffix: str = "") -> str:
+            return "N/A" if summary.get(key) is None else f"{summary[key]}{suffix}"
+        
+        lines = [
+            f"- Overall Score: {value('overallScore', '/100')}",
+            f"- Percentile Rank: {value('percentileRank', '%')}",
+            f"- Top Strength: {value('topStrength')}",
+            f"- Main Weakness: {value('mainWeakness')}",
+        ]
+        for name, metric in summary.get("headlineMetrics", {}).items():
+            lines.append(f"- {name.replace('_', ' ').title()}: {metric}")
+        if summary.get("source") == "local":
+            lines.append("- (No full analysis yet; summary computed from the raw data)")
+        return "\n".join(lines)
+    
+    async def chat_with_platform_context(
         self,
         platform: str,
         user_data: Dict[str, Any],
-        analysis: Dict[str, Any],
+        analysis_summary: Dict[str, Any],
         question: str,
-        chat_history: List[Dict[str, str]] = None
+        chat_history: List[Dict[str, str]] = None,
+        conversation_summary: Optional[str] = None
     ) -> str:
         """
         Platform-specific Q&A chatbot with enhanced context awareness
@@ -339,64 +509,141 @@ Provide comprehensive analysis in JSON format with percentileRank, globalRanking
         Args:
             platform: Platform name
             user_data: User's platform data
-            analysis: Previous analysis results
+            analysis_summary: Summary of the stored analysis, or a locally
+                computed one (see analysis_cache_service.AnalysisCacheService.chat_summary)
             question: User's question
-            chat_history: Previous chat messages
+            chat_history: Recent chat messages
+            conversation_summary: Summary of older messages (see
+                chat_memory_service), if any
             
         Returns:
             AI response specific to the platform
         """
         
-        if chat_history is None:
-            chat_history = []
+        prompt = self._build_chat_prompt(
+            platform, user_data, analysis_summary, question, chat_history, conversation_summary
+        )
+        with llm_call(CHAT_PLATFORM):
+            response = await llm_gateway.generate_content(self.model, prompt)
+        return response.text
+    
+    def stream_chat_with_platform_context(
+        self,
+        platform: str,
+        user_data: Dict[str, Any],
+        analysis_summary: Dict[str, Any],
+        question: str,
+        chat_history: List[Dict[str, str]] = None,
+        conversation_summary: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of chat_with_platform_context
         
-        # Get platform-specific context
-        platform_contexts = {
-            "github": "GitHub profile optimization, repository management, contribution strategies, open source collaboration, and code quality",
-            "leetcode": "LeetCode problem-solving strategies, algorithm patterns, data structures, contest preparation, and coding interview techniques",
-            "geeksforgeeks": "GeeksforGeeks practice problems, competitive programming, DSA concepts, and technical interview preparation",
-            "codechef": "CodeChef contest strategies, competitive programming techniques, rating improvement, and problem-solving approaches",
-            "hackerrank": "HackerRank skill development, certification preparation, domain-specific challenges, and technical assessments",
-            "devpost": "Hackathon participation, project showcasing, team collaboration, and innovation strategies",
-            "devto": "Technical blogging, community engagement, content creation, and developer networking",
-            "linkedin": "Professional networking, profile optimization, career development, and industry connections"
-        }
+        Yields answer text as the model produces it. Closing the generator
+        early (e.g. the client disconnected) abandons the generation.
+        """
+        prompt = self._build_chat_prompt(
+            platform, user_data, analysis_summary, question, chat_history, conversation_summary
+        )
+        return self._stream(prompt, CHAT_PLATFORM)
+    
+    async def answer_opening_question(self, platform: str, user_data: Dict[str, Any], question: str) -> str:
+        """
+        Answer to an opening question that fits every profile in the user's bucket
         
-        platform_context = platform_contexts.get(platform, f"{platform} performance optimization")
+        The model sees only the profile's score bands; the user's numbers
+        appear as [[key]] placeholders (see chat_answer_cache.personalize).
+        """
+        prompt = self._build_opening_prompt(platform, user_data, question)
+        with llm_call(CHAT_PLATFORM_OPENING):
+            response = await llm_gateway.generate_content(self.model, prompt)
+        return response.text
+    
+    def stream_opening_answer(
+        self,
+        platform: str,
+        user_data: Dict[str, Any],
+        question: str
+    ) -> AsyncIterator[str]:
+        """Streaming variant of answer_opening_question, placeholders included"""
+        prompt = self._build_opening_prompt(platform, user_data, question)
+        return self._stream(prompt, CHAT_PLATFORM_OPENING)
+    
+    async def _stream(self, prompt: str, template: PromptTemplate) -> AsyncIterator[str]:
+        """Text of a streamed model call, recorded against `template`"""
+        # The slot is held for the whole stream
+        async with llm_gateway.slot("gemini"):
+            record = begin_call("gemini", MODEL_NAME, prompt=template)
+            streamed = 0
+            outcome = "cancelled"
+            error = None
+            try:
+                response = await self.model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    if chunk.parts:
+                        record.first_token()
+                        streamed += len(chunk.text)
+                        yield chunk.text
+                outcome = "ok"
+            except Exception as e:
+                outcome, error = "error", e
+                raise
+            finally:
+                # Abandoned streams were still paid for up to here
+                prompt_tokens = estimate_tokens(prompt)
+                completion_tokens = math.ceil(streamed / CHARS_PER_TOKEN)
+                record.finish(outcome, prompt_tokens, completion_tokens, error=error)
+                llm_gateway.charge(prompt_tokens + completion_tokens)
+    
+    async def summarize_conversation(
+        self,
+        platform: str,
+        summary: Optional[str],
+        messages: List[Dict[str, str]]
+    ) -> str:
+        """Running conversation summary updated with `messages`"""
+        prompt = CHAT_SUMMARY.render(
+            platform_label=platform.upper(),
+            summary=summary or "None yet",
+            messages=messages
+        )
+        with llm_call(CHAT_SUMMARY):
+            response = await llm_gateway.generate_content(self.model, prompt)
+        return truncate_text(response.text.strip(), CHAT_SUMMARY_TOKENS)
+    
+    def _build_chat_prompt(
+        self,
+        platform: str,
+        user_data: Dict[str, Any],
+        analysis_summary: Dict[str, Any],
+        question: str,
+        chat_history: Optional[List[Dict[str, str]]],
+        conversation_summary: Optional[str] = None
+    ) -> str:
+        """Chat prompt with platform rules, user data and the analysis summary"""
         
-        # Build enhanced context
-        context = f"""
-You are an expert {platform.upper()} advisor specializing in {platform_context}.
-
-CRITICAL RULES:
-1. You MUST ONLY discuss {platform.upper()} topics
-2. If the user asks about other platforms or unrelated topics, politely say: "I'm specialized in {platform.upper()} only. For that topic, please use the relevant platform's AI assistant."
-3. Always reference the user's actual data when giving advice
-4. Provide specific, actionable steps (not generic advice)
-5. Be encouraging and supportive
-6. Use numbers and metrics from their data
-7. Keep responses concise (2-4 paragraphs max)
-
-USER'S {platform.upper()} DATA:
-{json.dumps(user_data, indent=2)}
-
-ANALYSIS SUMMARY:
-- Overall Score: {analysis.get('overallScore', 'N/A')}/100
-- Percentile Rank: {analysis.get('percentileRank', 'N/A')}%
-- Top Strength: {analysis.get('strengths', [{}])[0].get('topic', 'N/A') if analysis.get('strengths') else 'N/A'}
-- Main Weakness: {analysis.get('weaknesses', [{}])[0].get('topic', 'N/A') if analysis.get('weaknesses') else 'N/A'}
-
-RECENT CONVERSATION:
-{json.dumps(chat_history[-3:], indent=2) if chat_history else 'No previous messages'}
-
-USER'S QUESTION: {question}
-
-Provide a helpful, specific answer that:
-- Directly addresses their question
-- References their actual {platform.upper()} data
-- Gives actionable next steps
-- Stays focused on {platform.upper()} only
-"""
+        if chat_history is None:
+            chat_history = []
         
-        response = self.model.generate_content(context)
-        return response.text
+        return CHAT_PLATFORM.render(
+            platform_label=platform.upper(),
+            platform_context=PLATFORM_CHAT_CONTEXTS.get(platform, f"{platform} performance optimization"),
+            user_data=user_data,
+            analysis_summary=self._summary_context(analysis_summary),
+            conversation_summary=conversation_summary or "None yet",
+            chat_history=chat_history,
+            question=question
+        )
+    
+    def _build_opening_prompt(self, platform: str, user_data: Dict[str, Any], question: str) -> str:
+        """Chat prompt with only the profile's score bands and number placeholders"""
+        labels = {rule["key"]: rule["label"] for rule in PLATFORM_RULES.get(platform, [])}
+        return CHAT_PLATFORM_OPENING.render(
+            platform_label=platform.upper(),
+            platform_context=PLATFORM_CHAT_CONTEXTS.get(platform, f"{platform} performance optimization"),
+            profile="\n".join(f"- {line}" for line in profile_bands(platform, user_data)) or "- No scored areas",
+            placeholders="\n".join(
+                f"- [[{key}]]: {labels[key]}" for key in profile_numbers(platform, user_data)
+            ) or "- None",
+            question=question
+        )
@@ -1,13 +1,82 @@
-import google.generativeai as genai
 from typing import Dict, Any, List
-import json
+import google.generativeai as genai
+from app.core.json_repair import JSONRepairError, parse_json_response
+from app.core.metrics import metrics
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_providers import providers
+from app.services.llm_scheduler import LLMRejectedError
+from app.services.llm_telemetry import llm_call
+from app.services.prompt_templates import CAREER_RECOMMENDATIONS
+
+# Needs JSON mode and response schemas, which gemini-pro (1.0) rejects
+MODEL_NAME = "gemini-flash-latest"
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+# Response schema for career recommendations (Gemini structured output)
+RECOMMENDATIONS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "market_analysis": {
+            "type": "object",
+            "properties": {
+                "demand_score": {"type": "number"},
+                "trending_skills": _STRING_LIST,
+                "salary_estimate": {"type": "string"},
+                "top_companies": _STRING_LIST,
+            },
+            "required": ["demand_score", "trending_skills", "salary_estimate", "top_companies"],
+        },
+        "recommendations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "description": {"type": "string"},
+                    "priority": {"type": "string"},
+                    "category": {"type": "string"},
+                },
+                "required": ["title", "description", "priority", "category"],
+            },
+        },
+        "roadmap": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "phase": {"type": "string"},
+                    "tasks": _STRING_LIST,
+                    "resources": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {"name": {"type": "string"}, "url": {"type": "string"}},
+                            "required": ["name", "url"],
+                        },
+                    },
+                },
+                "required": ["phase", "tasks", "resources"],
+            },
+        },
+        "job_match": {
+            "type": "object",
+            "properties": {
+                "role": {"type": "string"},
+                "fit_percent": {"type": "number"},
+                "gaps": _STRING_LIST,
+            },
+            "required": ["role", "fit_percent", "gaps"],
+        },
+    },
+    "required": ["market_analysis", "recommendations", "roadmap", "job_match"],
+}
 
 class AIService:
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+    def __init__(self):
+        self.model = providers.gemini_model(MODEL_NAME)
     
-    def generate_recommendations(
+    async def generate_recommendations(
         self, 
         platform_scores: List[Dict[str, Any]], 
         target_role: str
@@ -17,77 +86,35 @@ class AIService:
         # Prepare context for AI
         context = self._prepare_context(platform_scores, target_role)
         
-        prompt = f"""
-        Analyze this developer profile and provide career enhancement recommendations.
-        
-        Target Role: {target_role}
-        
-        Profile Analysis:
-        {json.dumps(context, indent=2)}
-        
-        Please provide:
-        1. Market analysis for the target role (trending skills, salary estimate, top companies)
-        2. 3-5 specific recommendations with priority levels
-        3. A 3-phase learning roadmap with specific tasks and resources
-        4. Job match analysis (fit percentage and skill gaps)
-        
-        Format your response as JSON with this structure:
-        {{
-            "market_analysis": {{
-                "demand_score": <number 0-100>,
-                "trending_skills": [<list of 5-8 skills>],
-                "salary_estimate": "<salary range>",
-                "top_companies": [<list of 5-8 companies>]
-            }},
-            "recommendations": [
-                {{
-                    "title": "<recommendation title>",
-                    "description": "<detailed description>",
-                    "priority": "<High|Medium|Low>",
-                    "category": "<Skill|Project|Certification|Networking>"
-                }}
-            ],
-            "roadmap": [
-                {{
-                    "phase": "<phase name>",
-                    "tasks": [<list of specific tasks>],
-                    "resources": [
-                        {{"name": "<resource name>", "url": "<url or placeholder>"}}
-                    ]
-                }}
-            ],
-            "job_match": {{
-                "role": "{target_role}",
-                "fit_percent": <number 0-100>,
-                "gaps": [<list of missing skills/experience>]
-            }}
-        }}
-        """
+        prompt = CAREER_RECOMMENDATIONS.render(target_role=target_role, context=context)
         
         try:
-            response = self.model.generate_content(prompt)
-            
-            # Extract JSON from response
-            response_text = response.text.strip()
-            
-            # Remove markdown code blocks if present
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.startswith("```"):
-                response_text = response_text[3:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
-            
-            # Parse JSON
-            ai_analysis = json.loads(response_text)
+            with llm_call(CAREER_RECOMMENDATIONS) as call:
+                response = await llm_gateway.generate_content(
+                    self.model,
+                    prompt,
+                    generation_config=genai.GenerationConfig(
+                        response_mime_type="application/json",
+                        response_schema=RECOMMENDATIONS_SCHEMA
+                    )
+                )
+                
+                # Tolerates fences, surrounding prose and truncation
+                try:
+                    ai_analysis = parse_json_response(response.text)
+                except JSONRepairError:
+                    call.parsed(False)
+                    raise
+                call.parsed(True)
             
             return ai_analysis
             
-        except json.JSONDecodeError as e:
+        except JSONRepairError as e:
             # Fallback to structured response if JSON parsing fails
+            metrics.increment("ai_recommendations.parse_failures")
             return self._generate_fallback_recommendations(platform_scores, target_role)
+        except LLMRejectedError:
+            raise
         except Exception as e:
             raise Exception(f"AI recommendation generation failed: {str(e)}")
     
@@ -0,0 +1,458 @@
+"""Persistent cache of AI analyses keyed by platform data fingerprint"""
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.db.database import SessionLocal
+from app.models.ai_analysis import AIAnalysis
+from app.services.ai_analysis_service import SUPPORTED_PLATFORMS, AIAnalysisService
+from app.services.llm_scheduler import PRIORITY_BACKGROUND, LLMRejectedError, llm_request
+from app.services.llm_telemetry import background_telemetry
+from app.services.percentile_service import PERCENTILE_METRICS, percentile_service
+
+
+def data_fingerprint(data: Dict[str, Any]) -> str:
+    """SHA-256 of the canonical JSON form of platform data (key order independent)"""
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+GenerationKey = Tuple[int, str, str]
+
+# (user_id, platform, data_hash) -> future resolved when the model call
+# generating or enriching that data version's analysis in this process is
+# done; one model call per data version at a time
+_generating: Dict[GenerationKey, asyncio.Future] = {}
+
+
+def _generation_key(user_id: int, platform: str, data: Dict[str, Any]) -> GenerationKey:
+    return user_id, platform, data_fingerprint(data)
+
+
+def _claim(keys: Iterable[GenerationKey]) -> Set[GenerationKey]:
+    """Mark data versions as being generated; returns the ones nobody else was"""
+    loop = asyncio.get_running_loop()
+    claimed = set()
+    for key in keys:
+        if key not in _generating:
+            _generating[key] = loop.create_future()
+            claimed.add(key)
+    return claimed
+
+
+def _release(keys: Iterable[GenerationKey]) -> None:
+    """Wake everyone waiting on these data versions (see _join)"""
+    for key in keys:
+        future = _generating.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+
+async def _join(keys: Iterable[GenerationKey]) -> bool:
+    """
+    Wait for the generations of these data versions already in flight
+
+    Returns whether there were any; the caller then re-reads the cache,
+    which holds their result unless they failed.
+    """
+    futures = [_generating[key] for key in keys if key in _generating]
+    if not futures:
+        return False
+    metrics.increment("ai_analysis.generation_joins", len(futures))
+    # Unlike wait_for, cancelling the waiter leaves the shared futures alone
+    await asyncio.wait(futures)
+    return True
+
+
+def _first_topic(items: Any) -> Optional[str]:
+    if isinstance(items, list) and items and isinstance(items[0], dict):
+        return items[0].get("topic")
+    return None
+
+
+def summarize_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """The few analysis fields chat prompts need"""
+    return {
+        "source": "analysis",
+        "overallScore": analysis.get("overallScore"),
+        "percentileRank": analysis.get("percentileRank"),
+        "topStrength": _first_topic(analysis.get("strengths")),
+        "mainWeakness": _first_topic(analysis.get("weaknesses")),
+    }
+
+
+def local_summary(platform: str, data: Dict[str, Any], percentile_rank: Optional[float] = None) -> Dict[str, Any]:
+    """Summary computed from the raw data when no analysis is stored yet"""
+    return {
+        "source": "local",
+        "overallScore": None,
+        "percentileRank": percentile_rank,
+        "topStrength": None,
+        "mainWeakness": None,
+        "headlineMetrics": {
+            metric: data[metric]
+            for metric in PERCENTILE_METRICS.get(platform, [])
+            if data.get(metric) is not None
+        },
+    }
+
+
+class AnalysisCacheService:
+    """
+    Serve analyses from `ai_analyses` and only call the model on a miss
+
+    A changed payload hashes differently and a changed prompt or model has a
+    different ANALYSIS_VERSION, so either one misses and regenerates; the
+    superseded rows for that user and platform are dropped on store.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(
+        self,
+        user_id: int,
+        platform: str,
+        data: Dict[str, Any],
+        require_model: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Stored analysis for this exact data and prompt version, if any
+
+        With `require_model`, a rule-based analysis that has not been
+        enriched yet does not count.
+        """
+        row = self.db.query(AIAnalysis.analysis).filter(
+            AIAnalysis.user_id == user_id,
+            AIAnalysis.platform == platform,
+            AIAnalysis.data_hash == data_fingerprint(data),
+            AIAnalysis.prompt_version == AIAnalysisService.ANALYSIS_VERSION
+        ).first()
+        if row is None or (require_model and row.analysis.get("source") == "rules"):
+            return None
+        return dict(row.analysis)
+
+    def _stage(self, user_id: int, platform: str, data: Dict[str, Any], analysis: Dict[str, Any]) -> None:
+        self.db.query(AIAnalysis).filter(
+            AIAnalysis.user_id == user_id,
+            AIAnalysis.platform == platform
+        ).delete(synchronize_session=False)
+        self.db.add(AIAnalysis(
+            user_id=user_id,
+            platform=platform,
+            data_hash=data_fingerprint(data),
+            prompt_version=AIAnalysisService.ANALYSIS_VERSION,
+            analysis=analysis
+        ))
+
+    def store(self, user_id: int, platform: str, data: Dict[str, Any], analysis: Dict[str, Any]) -> None:
+        """Save an analysis and drop older versions for the user and platform"""
+        try:
+            self._stage(user_id, platform, data, analysis)
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent request stored the same analysis first
+            self.db.rollback()
+
+    def store_many(self, user_id: int, entries: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+        """Save analyses for several platforms ({platform: (data, analysis)}) in one commit"""
+        try:
+            for platform, (data, analysis) in entries.items():
+                self._stage(user_id, platform, data, analysis)
+            self.db.commit()
+        except IntegrityError:
+            # Some were stored concurrently; keep the rest one by one
+            self.db.rollback()
+            for platform, (data, analysis) in entries.items():
+                self.store(user_id, platform, data, analysis)
+
+    async def get_or_analyze(
+        self,
+        user_id: int,
+        platform: str,
+        data: Dict[str, Any],
+        username: str,
+        percentile_rank: Optional[float] = None,
+        ai_service: Optional[AIAnalysisService] = None
+    ) -> Dict[str, Any]:
+        """
+        Cached analysis, generating and storing it with the model on a miss
+
+        If this data version is already being generated (e.g. precomputed
+        after the fetch), waits for that rather than calling the model again.
+        """
+        key = _generation_key(user_id, platform, data)
+        while True:
+            analysis = self.get(user_id, platform, data, require_model=True)
+            if analysis is not None or not await _join([key]):
+                break
+
+        if analysis is not None:
+            metrics.increment("ai_analysis.cache_hits")
+            # Percentiles move as the population grows; always serve the current one
+            if percentile_rank is not None:
+                analysis["percentileRank"] = percentile_rank
+            return analysis
+
+        metrics.increment("ai_analysis.cache_misses")
+        ai_service = ai_service or AIAnalysisService()
+        claimed = _claim([key])
+        try:
+            with metrics.timer("ai_analysis.generate"):
+                analysis = await ai_service.analyze_platform_data(
+                    platform=platform,
+                    user_data=data,
+                    username=username,
+                    percentile_rank=percentile_rank
+                )
+            self.store(user_id, platform, data, analysis)
+        finally:
+            _release(claimed)
+        return analysis
+
+    async def get_or_analyze_many(
+        self,
+        user_id: int,
+        platforms: Dict[str, Dict[str, Any]],
+        usernames: Dict[str, str],
+        percentile_ranks: Optional[Dict[str, Optional[float]]] = None,
+        ai_service: Optional[AIAnalysisService] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Cached analyses for several platforms
+
+        All misses are generated together with one combined model call and
+        split back into per-platform cache entries. A platform the combined
+        response left out (e.g. it was truncated) is analyzed on its own.
+        Data versions already being generated are waited for, not requested
+        again.
+        """
+        percentile_ranks = percentile_ranks or {}
+        keys = {platform: _generation_key(user_id, platform, data) for platform, data in platforms.items()}
+        while True:
+            analyses: Dict[str, Dict[str, Any]] = {}
+            missing: Dict[str, Dict[str, Any]] = {}
+            for platform, data in platforms.items():
+                analysis = self.get(user_id, platform, data, require_model=True)
+                if analysis is None:
+                    missing[platform] = data
+                else:
+                    analyses[platform] = analysis
+            if not missing or not await _join(keys[platform] for platform in missing):
+                break
+
+        metrics.increment("ai_analysis.cache_hits", len(analyses))
+        for platform, analysis in analyses.items():
+            if percentile_ranks.get(platform) is not None:
+                analysis["percentileRank"] = percentile_ranks[platform]
+
+        if not missing:
+            return analyses
+
+        metrics.increment("ai_analysis.cache_misses", len(missing))
+        ai_service = ai_service or AIAnalysisService()
+        claimed = _claim(keys[platform] for platform in missing)
+        try:
+            generated = await self._generate_many(user_id, missing, usernames, percentile_ranks, ai_service)
+        finally:
+            _release(claimed)
+        analyses.update(generated)
+        return {platform: analyses[platform] for platform in platforms}
+
+    async def _generate_many(
+        self,
+        user_id: int,
+        missing: Dict[str, Dict[str, Any]],
+        usernames: Dict[str, str],
+        percentile_ranks: Dict[str, Optional[float]],
+        ai_service: AIAnalysisService
+    ) -> Dict[str, Dict[str, Any]]:
+        """Generate and store analyses for `missing` (platform -> data)"""
+        if len(missing) == 1:
+            generated = {}
+        else:
+            metrics.increment("ai_analysis.combined_calls")
+            with metrics.timer("ai_analysis.generate_combined"):
+                generated = await ai_service.analyze_multiple_platforms(
+                    platforms=missing,
+                    usernames=usernames,
+                    percentile_ranks=percentile_ranks
+                )
+
+        for platform in missing.keys() - generated.keys():
+            if len(missing) > 1:
+                metrics.increment("ai_analysis.combined_fallbacks")
+            with metrics.timer("ai_analysis.generate"):
+                generated[platform] = await ai_service.analyze_platform_data(
+                    platform=platform,
+                    user_data=missing[platform],
+                    username=usernames.get(platform, "unknown"),
+                    percentile_rank=percentile_ranks.get(platform)
+                )
+
+        self.store_many(user_id, {
+            platform: (missing[platform], analysis) for platform, analysis in generated.items()
+        })
+        return generated
+
+    def get_or_analyze_locally(
+        self,
+        user_id: int,
+        platform: str,
+        data: Dict[str, Any],
+        username: str,
+        percentile_rank: Optional[float] = None,
+        ai_service: Optional[AIAnalysisService] = None
+    ) -> Dict[str, Any]:
+        """
+        Cached analysis, or a rule-based one stored on a miss
+
+        Never calls the model. A result whose `source` is "rules" can be
+        upgraded afterwards with `enrich_in_background`.
+        """
+        analysis = self.get(user_id, platform, data)
+        if analysis is not None:
+            metrics.increment("ai_analysis.cache_hits")
+            if percentile_rank is not None:
+                analysis["percentileRank"] = percentile_rank
+            return analysis
+
+        metrics.increment("ai_analysis.cache_misses")
+        ai_service = ai_service or AIAnalysisService()
+        with metrics.timer("ai_analysis.local"):
+            analysis = ai_service.analyze_locally(
+                platform=platform,
+                user_data=data,
+                username=username,
+                percentile_rank=percentile_rank
+            )
+        self.store(user_id, platform, data, analysis)
+        return analysis
+
+    def chat_summary(
+        self,
+        user_id: int,
+        platform: str,
+        data: Dict[str, Any],
+        percentile_rank: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Summary of the stored analysis for chat context, without calling the model"""
+        analysis = self.get(user_id, platform, data)
+        if analysis is None:
+            metrics.increment("ai_chat.summary_local")
+            return local_summary(platform, data, percentile_rank)
+
+        metrics.increment("ai_chat.summary_stored")
+        summary = summarize_analysis(analysis)
+        if percentile_rank is not None:
+            summary["percentileRank"] = percentile_rank
+        return summary
+
+    @staticmethod
+    def hit_rate() -> Optional[float]:
+        """Share of analysis requests served from the cache by this worker"""
+        hits = metrics.counter_value("ai_analysis.cache_hits")
+        total = hits + metrics.counter_value("ai_analysis.cache_misses")
+        return round(hits / total, 4) if total else None
+
+
+async def enrich_in_background(user_id: int, platforms: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Replace stored rule-based analyses with model-enriched ones
+
+    Meant to run after the response was sent (FastAPI BackgroundTasks), so
+    it uses its own session. Platforms whose analysis was enriched,
+    regenerated or superseded by newer data in the meantime are skipped, as
+    are ones another request is already generating. Failures are only
+    counted; the rule-based analysis stays in place.
+    """
+    keys = {platform: _generation_key(user_id, platform, data) for platform, data in platforms.items()}
+    claimed = _claim(keys.values())
+
+    db = SessionLocal()
+    try:
+        cache = AnalysisCacheService(db)
+        entries = {}
+        for platform in (platform for platform, key in keys.items() if key in claimed):
+            analysis = cache.get(user_id, platform, platforms[platform])
+            if analysis is not None and analysis.get("source") == "rules":
+                entries[platform] = (platforms[platform], analysis)
+        if not entries:
+            return
+
+        with metrics.timer("ai_analysis.enrich"), llm_request(PRIORITY_BACKGROUND, user_id), background_telemetry():
+            enriched = await AIAnalysisService().enrich_analyses(entries)
+        metrics.increment("ai_analysis.enrichments", len(enriched))
+
+        # The data may have been refetched, or a full analysis stored, while
+        # the model was working
+        current = {
+            platform: (platforms[platform], analysis)
+            for platform, analysis in enriched.items()
+            if (cache.get(user_id, platform, platforms[platform]) or {}).get("source") == "rules"
+        }
+        if current:
+            cache.store_many(user_id, current)
+    except Exception as e:
+        metrics.increment("ai_analysis.enrichment_failures")
+        print(f"AI analysis enrichment failed for user {user_id}: {e}")
+    finally:
+        db.close()
+        _release(claimed)
+
+
+async def precompute_in_background(user_id: int, platforms: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Generate and store full analyses for freshly fetched platform data
+
+    Meant to run after a fetch response was sent, so opening the analysis
+    view right after a fetch is a cache read instead of a model call. Runs
+    at background priority with its own session. Platforms that already have
+    a model analysis for this data, or that are already being generated, are
+    skipped; a request for the analysis meanwhile waits for this one
+    instead of calling the model too. Refusals (quota, overload) and failures are only
+    counted; the analysis is then generated on demand as before.
+    """
+    platforms = {
+        platform: data for platform, data in platforms.items()
+        if platform in SUPPORTED_PLATFORMS and data
+    }
+    keys = {platform: _generation_key(user_id, platform, data) for platform, data in platforms.items()}
+    claimed = _claim(keys.values())
+
+    db = SessionLocal()
+    try:
+        cache = AnalysisCacheService(db)
+        missing = {
+            platform: platforms[platform]
+            for platform, key in keys.items()
+            if key in claimed and cache.get(user_id, platform, platforms[platform], require_model=True) is None
+        }
+        if not missing:
+            return
+
+        with metrics.timer("ai_analysis.precompute"), llm_request(PRIORITY_BACKGROUND, user_id), background_telemetry():
+            await cache._generate_many(
+                user_id=user_id,
+                missing=missing,
+                usernames={platform: data.get("username", "unknown") for platform, data in missing.items()},
+                percentile_ranks={
+                    platform: percentile_service.platform_percentile(platform, data)
+                    for platform, data in missing.items()
+                },
+                ai_service=AIAnalysisService()
+            )
+        metrics.increment("ai_analysis.precomputed", len(missing))
+    except LLMRejectedError:
+        metrics.increment("ai_analysis.precompute_rejected")
+    except Exception as e:
+        metrics.increment("ai_analysis.precompute_failures")
+        print(f"AI analysis precompute failed for user {user_id}: {e}")
+    finally:
+        db.close()
+        _release(claimed)
@@ -0,0 +1,169 @@
+"""In-process prefix index for username and name autocomplete"""
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.user_profile import UserProfile
+
+# Terms are truncated to keep memory bounded; prefixes longer than this
+# still match because lookups are truncated the same way
+MAX_TERM_LENGTH = 32
+
+
+def _terms_for(username: str, name: Optional[str], full_name: Optional[str]) -> List[str]:
+    """Lowercased index terms: username plus every word suffix of each name"""
+    terms = {username.lower()}
+    for value in (name, full_name):
+        if not value:
+            continue
+        words = value.lower().split()
+        terms.update(" ".join(words[i:]) for i in range(len(words)))
+    return sorted(sys.intern(term[:MAX_TERM_LENGTH]) for term in terms if term)
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index: parallel arrays of terms and user ids
+
+    Lookups are a binary search plus a short forward scan, so per-keystroke
+    queries never touch the database. Each worker process holds its own copy,
+    built at startup. Signup and profile update hooks update the copy of the
+    worker that handled the write right away. Every worker also calls `sync`
+    periodically, which rebuilds its copy when the tables' version stamp
+    changed, so writes through other workers or other code paths (new or
+    deleted users and profiles) show up within one sync interval.
+    """
+
+    def __init__(self):
+        self._terms: List[str] = []
+        self._ids = array("i")
+        # user_id -> (username, name, full_name) used to render results
+        self._entries: Dict[int, Tuple[str, Optional[str], Optional[str]]] = {}
+        self._lock = threading.RLock()
+        # Version stamp of the tables the index was last built from
+        self._stamp: Optional[Tuple] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def version_stamp(db: Session) -> Tuple:
+        """
+        Row counts and latest write times of the indexed tables
+
+        Changes whenever a user or profile is created, updated or deleted.
+        """
+        users = db.query(func.count(User.id), func.max(User.created_at), func.max(User.updated_at)).one()
+        profiles = db.query(
+            func.count(UserProfile.id), func.max(UserProfile.created_at), func.max(UserProfile.updated_at)
+        ).one()
+        return tuple(users) + tuple(profiles)
+
+    def sync(self, db: Session) -> bool:
+        """Rebuild the index if the tables changed since it was built; returns whether it did"""
+        if self.version_stamp(db) == self._stamp:
+            return False
+        self.build(db)
+        return True
+
+    def build(self, db: Session) -> None:
+        """(Re)build the whole index from the users and user_profiles tables"""
+        # Taken first, so writes during the build change the stamp again
+        stamp = self.version_stamp(db)
+        rows = db.query(
+            User.id, User.username, User.name, UserProfile.full_name
+        ).outerjoin(UserProfile, UserProfile.user_id == User.id).all()
+
+        pairs = []
+        entries = {}
+        for user_id, username, name, full_name in rows:
+            entries[user_id] = (username, name, full_name)
+            pairs.extend((term, user_id) for term in _terms_for(username, name, full_name))
+        pairs.sort()
+
+        with self._lock:
+            self._terms = [term for term, _ in pairs]
+            self._ids = array("i", (user_id for _, user_id in pairs))
+            self._entries = entries
+            self._stamp = stamp
+
+    def upsert(
+        self,
+        user_id: int,
+        username: str,
+        name: Optional[str] = None,
+        full_name: Optional[str] = None
+    ) -> None:
+        """Add or refresh a single user's terms"""
+        with self._lock:
+            self._remove_terms(user_id)
+            self._entries[user_id] = (username, name, full_name)
+            for term in _terms_for(username, name, full_name):
+                position = bisect_right(self._terms, term)
+                self._terms.insert(position, term)
+                self._ids.insert(position, user_id)
+
+    def remove(self, user_id: int) -> None:
+        """Drop a user from the index"""
+        with self._lock:
+            self._remove_terms(user_id)
+            self._entries.pop(user_id, None)
+
+    def _remove_terms(self, user_id: int) -> None:
+        entry = self._entries.get(user_id)
+        if not entry:
+            return
+        for term in _terms_for(*entry):
+            position = bisect_left(self._terms, term)
+            while position < len(self._terms) and self._terms[position] == term:
+                if self._ids[position] == user_id:
+                    del self._terms[position]
+                    del self._ids[position]
+                    break
+                position += 1
+
+    def lookup(self, prefix: str, limit: int = 8) -> List[Dict[str, Optional[str]]]:
+        """
+        Return up to `limit` users with a term starting with `prefix`
+
+        Matches on the username itself are listed before name matches.
+        """
+        prefix = " ".join(prefix.lower().split())[:MAX_TERM_LENGTH]
+        if not prefix:
+            return []
+
+        username_hits: List[int] = []
+        name_hits: List[int] = []
+        seen = set()
+
+        with self._lock:
+            position = bisect_left(self._terms, prefix)
+            while position < len(self._terms) and self._terms[position].startswith(prefix):
+                user_id = self._ids[position]
+                if user_id not in seen:
+                    seen.add(user_id)
+                    username = self._entries[user_id][0]
+                    if username.startswith(prefix):
+                        username_hits.append(user_id)
+                    else:
+                        name_hits.append(user_id)
+                    if len(username_hits) >= limit or len(seen) >= limit * 4:
+                        break
+                position += 1
+
+            results = []
+            for user_id in (username_hits + name_hits)[:limit]:
+                username, name, full_name = self._entries[user_id]
+                results.append({"username": username, "name": name, "fullName": full_name})
+
+        return results
+
+
+# Create singleton instance
+autocomplete_index = PrefixIndex()
@@ -0,0 +1,263 @@
+"""Similarity cache for first-turn chat answers
+
+Many users open a platform chat with nearly the same question ("how do I
+improve my LeetCode ranking?"). Opening questions are answered from a
+prompt that sees only the profile's score bands (`profile_bucket`), with
+the user's numbers written as [[key]] placeholders, so the answer fits
+every profile in the bucket and holds nothing of the asker's. Answers are
+cached per platform and bucket and filled in with each reader's own
+numbers (`personalize`), so a near-duplicate question from a similar
+profile is answered without a model call. Follow-up turns depend on the
+conversation and are never cached.
+
+Questions are compared by cosine similarity of TF-IDF vectors over words
+and word pairs, computed locally; an inverted index limits each lookup to
+cached questions that share a term. Each worker process keeps its own
+cache.
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.local_analysis import PLATFORM_RULES, profile_bucket, profile_numbers
+from app.services.prompt_templates import CHAT_PLATFORM_OPENING
+
+# Weight of word pairs relative to single words
+BIGRAM_WEIGHT = 0.5
+
+_WORD = re.compile(r"[a-z0-9+#]+")
+
+PLACEHOLDER = re.compile(r"\[\[([a-z0-9_]+)\]\]")
+
+# Longest text held back while waiting for a placeholder to close
+MAX_PLACEHOLDER_CHARS = 40
+
+# Shown for a placeholder the reader's data has no number for
+MISSING_NUMBER = "N/A"
+
+STOPWORDS = frozenset("""
+a about am an and any are as at be can could do does for from get give how i
+in is it me my of on or please should so some that the there this to what
+when which why will with would you your
+""".split())
+
+CacheKey = Tuple[str, str]
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping so "problems"/"problem" and "improving"/"improve" match"""
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def question_terms(question: str) -> Counter:
+    """Term counts of a question: stemmed non-stopwords plus adjacent pairs"""
+    words = [_stem(word) for word in _WORD.findall(question.lower()) if word not in STOPWORDS]
+    terms = Counter(words)
+    terms.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+    return terms
+
+
+def personalize(answer: str, platform: str, data: Dict[str, Any], strict: bool = False) -> Optional[str]:
+    """
+    `answer` with its [[key]] placeholders replaced by the user's numbers
+
+    A placeholder the data has no number for becomes "N/A", or makes the
+    result None when `strict`.
+    """
+    numbers = profile_numbers(platform, data)
+    if strict and any(key not in numbers for key in PLACEHOLDER.findall(answer)):
+        return None
+    return PLACEHOLDER.sub(lambda match: numbers.get(match.group(1), MISSING_NUMBER), answer)
+
+
+async def personalize_stream(
+    tokens: AsyncIterator[str],
+    platform: str,
+    data: Dict[str, Any],
+    template: Optional[List[str]] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming `personalize`
+
+    Text from an unclosed "[" on is held back until the placeholder is
+    complete, so one split across chunks is still replaced. The text as
+    received is appended to `template`, if given.
+    """
+    pending = ""
+    try:
+        async for text in tokens:
+            if template is not None:
+                template.append(text)
+            pending += text
+            cut = pending.rfind("[")
+            if cut == -1 or "]]" in pending[cut:] or len(pending) - cut > MAX_PLACEHOLDER_CHARS:
+                cut = len(pending)
+            elif cut > 0 and pending[cut - 1] == "[":
+                cut -= 1
+            if cut:
+                yield personalize(pending[:cut], platform, data)
+                pending = pending[cut:]
+        if pending:
+            yield personalize(pending, platform, data)
+    finally:
+        await tokens.aclose()
+
+
+class _Entry:
+    __slots__ = ("key", "terms", "answer", "created_at")
+
+    def __init__(self, key: CacheKey, terms: Counter, answer: str):
+        self.key = key
+        self.terms = terms
+        self.answer = answer
+        self.created_at = time.monotonic()
+
+
+class ChatAnswerCache:
+    """
+    Answers by platform, profile bucket and question similarity
+
+    Args:
+        max_entries: Least recently used entries are evicted beyond this
+        ttl: Seconds an answer is served for; 0 disables the cache
+        threshold: Minimum cosine similarity (0-1) for a hit
+    """
+
+    def __init__(self, max_entries: int, ttl: float, threshold: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        # key -> term -> entry ids
+        self._index: Dict[CacheKey, Dict[str, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        # Document frequencies per platform, for IDF
+        self._df: Dict[str, Counter] = defaultdict(Counter)
+        self._docs: Counter = Counter()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(platform: str, data: Dict[str, Any]) -> CacheKey:
+        """Platform plus the opening prompt version and profile bucket"""
+        return platform, f"{CHAT_PLATFORM_OPENING.version}:{profile_bucket(platform, data)}"
+
+    @staticmethod
+    def hit_rate() -> Optional[float]:
+        """Share of opening questions answered from the cache by this worker"""
+        hits = metrics.counter_value("ai_chat.answer_cache_hits")
+        total = hits + metrics.counter_value("ai_chat.answer_cache_misses")
+        return round(hits / total, 4) if total else None
+
+    def _weight(self, platform: str, term: str, count: int) -> float:
+        # Smoothed IDF, so a term in every cached question still counts
+        idf = math.log((1 + self._docs[platform]) / (1 + self._df[platform][term])) + 1
+        return count * idf * (BIGRAM_WEIGHT if " " in term else 1.0)
+
+    def _vector(self, platform: str, terms: Counter) -> Tuple[Dict[str, float], float]:
+        """TF-IDF weights of `terms` and their norm"""
+        weights = {term: self._weight(platform, term, count) for term, count in terms.items()}
+        return weights, math.sqrt(sum(weight * weight for weight in weights.values()))
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        platform = entry.key[0]
+        index = self._index[entry.key]
+        for term in entry.terms:
+            index[term].discard(entry_id)
+            if not index[term]:
+                del index[term]
+            self._df[platform][term] -= 1
+        if not index:
+            del self._index[entry.key]
+        self._docs[platform] -= 1
+
+    def lookup(self, platform: str, data: Dict[str, Any], question: str) -> Optional[str]:
+        """
+        The cached answer to a question like this one from a profile like
+        this one, personalized with `data`, or None
+        """
+        if not self.ttl or platform not in PLATFORM_RULES:
+            return None
+        terms = question_terms(question)
+        if not terms:
+            return None
+
+        key = self.key(platform, data)
+        now = time.monotonic()
+        best_id, best_score = None, 0.0
+        with self._lock:
+            index = self._index.get(key, {})
+            candidates = set().union(*(index.get(term, ()) for term in terms))
+            query, query_norm = self._vector(platform, terms)
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if now - entry.created_at > self.ttl:
+                    self._remove(entry_id)
+                    continue
+                cached, cached_norm = self._vector(platform, entry.terms)
+                dot = sum(weight * cached.get(term, 0.0) for term, weight in query.items())
+                score = dot / (query_norm * cached_norm) if query_norm and cached_norm else 0.0
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            # Same bucket, but e.g. a number this profile lacks
+            answer = None if best_id is None or best_score < self.threshold else personalize(
+                self._entries[best_id].answer, platform, data, strict=True
+            )
+            if answer is None:
+                metrics.increment("ai_chat.answer_cache_misses")
+                return None
+            self._entries.move_to_end(best_id)
+            metrics.increment("ai_chat.answer_cache_hits")
+            return answer
+
+    def store(self, platform: str, data: Dict[str, Any], question: str, answer: str) -> None:
+        """
+        Remember the answer to an opening question
+
+        `answer` is the model's text with its placeholders still in
+        (see AIAnalysisService.answer_opening_question).
+        """
+        if not self.ttl or not answer or platform not in PLATFORM_RULES:
+            return
+        terms = question_terms(question)
+        if not terms:
+            return
+        keys = {rule["key"] for rule in PLATFORM_RULES[platform]}
+        if any(key not in keys for key in PLACEHOLDER.findall(answer)):
+            # Made-up placeholders would show as N/A to everyone
+            metrics.increment("ai_chat.answer_cache_rejected")
+            return
+
+        key = self.key(platform, data)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(key, terms, answer)
+            for term in terms:
+                self._index[key][term].add(entry_id)
+                self._df[platform][term] += 1
+            self._docs[platform] += 1
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            metrics.set_gauge("ai_chat.answer_cache_entries", len(self._entries))
+
+
+# Create singleton instance
+chat_answer_cache = ChatAnswerCache(
+    max_entries=settings.CHAT_ANSWER_CACHE_MAX_ENTRIES,
+    ttl=settings.CHAT_ANSWER_CACHE_TTL_SECONDS,
+    threshold=settings.CHAT_ANSWER_CACHE_SIMILARITY
+)
@@ -0,0 +1,176 @@
+"""Server-side chat memory with a rolling summary"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.database import SessionLocal
+from app.models.chat import ChatConversation, ChatMessage
+from app.services.ai_analysis_service import AIAnalysisService
+from app.services.llm_scheduler import PRIORITY_BACKGROUND, llm_request
+from app.services.llm_telemetry import background_telemetry
+
+# Conversations being summarized by this process
+_summarizing: Set[int] = set()
+
+
+def _as_dict(message: ChatMessage) -> Dict[str, str]:
+    return {"role": message.role, "content": message.content}
+
+
+class ChatMemoryService:
+    """
+    Conversations per (user, platform), stored append-only
+
+    A chat prompt carries the conversation summary plus the messages not
+    folded into it yet. Once CHAT_SUMMARY_BATCH messages are waiting beyond
+    the CHAT_RECENT_MESSAGES most recent ones, `summarize_in_background`
+    folds them into the summary, so the prompt stays the same size however
+    long the conversation gets.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def conversation(self, user_id: int, platform: str, create: bool = True) -> Optional[ChatConversation]:
+        """The user's conversation for a platform, created on first use"""
+        conversation = self.db.query(ChatConversation).filter(
+            ChatConversation.user_id == user_id,
+            ChatConversation.platform == platform
+        ).first()
+        if conversation is not None or not create:
+            return conversation
+
+        try:
+            conversation = ChatConversation(user_id=user_id, platform=platform)
+            self.db.add(conversation)
+            self.db.commit()
+            return conversation
+        except IntegrityError:
+            # A concurrent request created it first
+            self.db.rollback()
+            return self.conversation(user_id, platform, create=False)
+
+    def _unsummarized(self, conversation_id: int, summarized_through: Optional[int]):
+        query = self.db.query(ChatMessage).filter(ChatMessage.conversation_id == conversation_id)
+        if summarized_through is not None:
+            query = query.filter(ChatMessage.id > summarized_through)
+        return query
+
+    def context(self, conversation: ChatConversation) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        """Summary and the messages after it, oldest first"""
+        # Bounded even while a summary is pending or has failed
+        limit = settings.CHAT_RECENT_MESSAGES + settings.CHAT_SUMMARY_BATCH
+        messages = self._unsummarized(conversation.id, conversation.summarized_through).order_by(
+            ChatMessage.id.desc()
+        ).limit(limit).all()
+        return conversation.summary, [_as_dict(message) for message in reversed(messages)]
+
+    def needs_summary(self, conversation: ChatConversation) -> bool:
+        waiting = self._unsummarized(conversation.id, conversation.summarized_through).with_entities(
+            func.count(ChatMessage.id)
+        ).scalar()
+        return waiting >= settings.CHAT_RECENT_MESSAGES + settings.CHAT_SUMMARY_BATCH
+
+    def seed(self, conversation: ChatConversation, messages: List[Dict[str, str]]) -> None:
+        """Import client-side history into a conversation that has no messages yet"""
+        if not messages or self.db.query(ChatMessage.id).filter(
+            ChatMessage.conversation_id == conversation.id
+        ).first() is not None:
+            return
+        limit = settings.CHAT_RECENT_MESSAGES + settings.CHAT_SUMMARY_BATCH
+        for message in messages[-limit:]:
+            self.db.add(ChatMessage(conversation_id=conversation.id, role=message["role"], content=message["content"]))
+        self.db.commit()
+
+    def append_turn(self, conversation_id: int, question: str, answer: str) -> None:
+        """Store a question and its answer"""
+        self.db.add(ChatMessage(conversation_id=conversation_id, role="user", content=question))
+        self.db.add(ChatMessage(conversation_id=conversation_id, role="assistant", content=answer))
+        self.db.query(ChatConversation).filter(ChatConversation.id == conversation_id).update(
+            {ChatConversation.updated_at: func.now()}, synchronize_session=False
+        )
+        self.db.commit()
+
+    def history(self, conversation: ChatConversation, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent messages for display, oldest first"""
+        messages = self.db.query(ChatMessage).filter(
+            ChatMessage.conversation_id == conversation.id
+        ).order_by(ChatMessage.id.desc()).limit(limit).all()
+        return [
+            {**_as_dict(message), "createdAt": message.created_at.isoformat() if message.created_at else None}
+            for message in reversed(messages)
+        ]
+
+    def clear(self, user_id: int, platform: str) -> bool:
+        """Delete the conversation and its messages; returns whether one existed"""
+        conversation = self.conversation(user_id, platform, create=False)
+        if conversation is None:
+            return False
+        # Explicit: SQLite does not enforce the foreign key cascade, and a
+        # new conversation may get the same id
+        self.db.query(ChatMessage).filter(
+            ChatMessage.conversation_id == conversation.id
+        ).delete(synchronize_session=False)
+        self.db.delete(conversation)
+        self.db.commit()
+        return True
+
+
+async def summarize_in_background(conversation_id: int) -> None:
+    """
+    Fold older messages of a conversation into its summary
+
+    Meant to run after the response was sent, so it uses its own session.
+    Does nothing unless enough messages are waiting; failures are only
+    counted and retried with the next turn.
+    """
+    if conversation_id in _summarizing:
+        return
+    _summarizing.add(conversation_id)
+
+    db = SessionLocal()
+    try:
+        memory = ChatMemoryService(db)
+        conversation = db.get(ChatConversation, conversation_id)
+        if conversation is None or not memory.needs_summary(conversation):
+            return
+
+        messages = memory._unsummarized(conversation.id, conversation.summarized_through).order_by(
+            ChatMessage.id
+        ).all()
+        folded = messages[:len(messages) - settings.CHAT_RECENT_MESSAGES]
+        previous = conversation.summarized_through
+
+        with metrics.timer("ai_chat.summarize"), llm_request(PRIORITY_BACKGROUND, conversation.user_id), background_telemetry():
+            summary = await AIAnalysisService().summarize_conversation(
+                platform=conversation.platform,
+                summary=conversation.summary,
+                messages=[_as_dict(message) for message in folded]
+            )
+
+        # Another worker may have summarized in the meantime
+        condition = (
+            ChatConversation.summarized_through.is_(None)
+            if previous is None else ChatConversation.summarized_through == previous
+        )
+        updated = db.query(ChatConversation).filter(
+            ChatConversation.id == conversation_id,
+            condition
+        ).update(
+            {ChatConversation.summary: summary, ChatConversation.summarized_through: folded[-1].id},
+            synchronize_session=False
+        )
+        db.commit()
+        if updated:
+            metrics.increment("ai_chat.summaries")
+    except Exception as e:
+        db.rollback()
+        metrics.increment("ai_chat.summary_failures")
+        print(f"Chat summary failed for conversation {conversation_id}: {e}")
+    finally:
+        db.close()
+        _summarizing.discard(conversation_id)
@@ -0,0 +1,194 @@
+"""Incrementally maintained per-platform leaderboards"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.leaderboard import LeaderboardEntry
+from app.models.platform_data import PlatformData
+from app.models.user import User
+from app.models.user_profile import UserProfile
+
+# Ranked metrics per platform (keys in PlatformData.data)
+LEADERBOARD_METRICS = {
+    "leetcode": ["total_solved"],
+    "codechef": ["current_rating"],
+    "github": ["stars"],
+    "geeksforgeeks": ["coding_score"],
+}
+
+
+def _numeric(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+class LeaderboardService:
+    """
+    Keeps one indexed row per (user, platform, metric)
+
+    Rows are written in the same transaction as the platform data, so top-N
+    reads are an index range scan and ranks are an index count instead of
+    sorting every user's JSON blob per request.
+
+    A rank counts the cohort's entries with a higher value. Each cohort has
+    an index ending in `value` (see LeaderboardEntry), and the count reads
+    no column outside it, so it is an index-only range scan: O(log n) to
+    find the start plus one index entry per user ranked higher, without
+    touching table rows. That is O(rank) rather than O(log n), but index
+    entries are small and densely packed (a million of them fit in a few
+    thousand pages), so even the bottom of a large board counts in
+    milliseconds. An order-statistic tree would be O(log n) but would have
+    to live in, and be kept in sync by, every worker process.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _cohort_filters(self, platform: str, metric: str, college_name: Optional[str], graduation_year: Optional[int]):
+        filters = [LeaderboardEntry.platform == platform, LeaderboardEntry.metric == metric]
+        if college_name:
+            filters.append(LeaderboardEntry.college_name == college_name)
+        if graduation_year:
+            filters.append(LeaderboardEntry.graduation_year == graduation_year)
+        return filters
+
+    def record(
+        self,
+        user_id: int,
+        platform: str,
+        data: Dict[str, Any],
+        profile: Optional[UserProfile] = None
+    ) -> None:
+        """Upsert ranked metrics from freshly fetched platform data (caller commits)"""
+        self.record_many(user_id, {platform: data}, profile)
+
+    def record_many(
+        self,
+        user_id: int,
+        datasets: Dict[str, Dict[str, Any]],
+        profile: Optional[UserProfile] = None
+    ) -> None:
+        """Upsert ranked metrics for several platforms with one lookup (caller commits)"""
+        platforms = [platform for platform in datasets if platform in LEADERBOARD_METRICS]
+        if not platforms:
+            return
+
+        existing = {
+            (entry.platform, entry.metric): entry
+            for entry in self.db.query(LeaderboardEntry).filter(
+                LeaderboardEntry.user_id == user_id,
+                LeaderboardEntry.platform.in_(platforms)
+            )
+        }
+
+        for platform in platforms:
+            data = datasets[platform]
+            for metric in LEADERBOARD_METRICS[platform]:
+                value = _numeric(data.get(metric))
+                if value is None:
+                    continue
+
+                entry = existing.get((platform, metric))
+                if entry is None:
+                    entry = LeaderboardEntry(user_id=user_id, platform=platform, metric=metric)
+                    self.db.add(entry)
+                entry.value = value
+                if profile is not None:
+                    entry.college_name = profile.college_name
+                    entry.graduation_year = profile.graduation_year
+
+    def update_cohort(self, user_id: int, college_name: Optional[str], graduation_year: Optional[int]) -> None:
+        """Propagate profile cohort changes to the user's entries (caller commits)"""
+        self.db.query(LeaderboardEntry).filter(
+            LeaderboardEntry.user_id == user_id
+        ).update(
+            {"college_name": college_name, "graduation_year": graduation_year},
+            synchronize_session=False
+        )
+
+    def top(
+        self,
+        platform: str,
+        metric: str,
+        college_name: Optional[str] = None,
+        graduation_year: Optional[int] = None,
+        limit: int = 10,
+        offset: int = 0
+    ) -> List[Tuple[LeaderboardEntry, User]]:
+        """Highest values first; ties broken by earliest user id"""
+        return (
+            self.db.query(LeaderboardEntry, User)
+            .join(User, User.id == LeaderboardEntry.user_id)
+            .filter(*self._cohort_filters(platform, metric, college_name, graduation_year))
+            .order_by(LeaderboardEntry.value.desc(), LeaderboardEntry.user_id)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+
+    def count_above(
+        self,
+        platform: str,
+        metric: str,
+        value: float,
+        college_name: Optional[str] = None,
+        graduation_year: Optional[int] = None
+    ) -> int:
+        """Number of entries in the cohort with a higher value (index-only count)"""
+        return self.db.query(func.count()).select_from(LeaderboardEntry).filter(
+            *self._cohort_filters(platform, metric, college_name, graduation_year),
+            LeaderboardEntry.value > value
+        ).scalar()
+
+    def rank(
+        self,
+        user_id: int,
+        platform: str,
+        metric: str,
+        college_name: Optional[str] = None,
+        graduation_year: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Rank of a user within a cohort (tied values share a rank)
+
+        Returns:
+            {"rank", "total", "value"} or None if the user has no entry in
+            the cohort
+        """
+        filters = self._cohort_filters(platform, metric, college_name, graduation_year)
+        entry = self.db.query(LeaderboardEntry).filter(
+            *filters, LeaderboardEntry.user_id == user_id
+        ).first()
+
+        if entry is None:
+            return None
+
+        ahead = self.count_above(platform, metric, entry.value, college_name, graduation_year)
+        total = self.db.query(func.count()).select_from(LeaderboardEntry).filter(*filters).scalar()
+
+        return {"rank": ahead + 1, "total": total, "value": entry.value}
+
+    def backfill(self) -> int:
+        """Create entries for stored platform data that has none yet; returns rows processed"""
+        has_entry = self.db.query(LeaderboardEntry.id).filter(
+            LeaderboardEntry.user_id == PlatformData.user_id,
+            LeaderboardEntry.platform == PlatformData.platform_name
+        ).exists()
+        rows = (
+            self.db.query(PlatformData, UserProfile)
+            .outerjoin(UserProfile, UserProfile.user_id == PlatformData.user_id)
+            .filter(
+                PlatformData.platform_name.in_(LEADERBOARD_METRICS.keys()),
+                ~has_entry
+            )
+            .all()
+        )
+
+        for platform_data, profile in rows:
+            if platform_data.data:
+                self.record(platform_data.user_id, platform_data.platform_name, platform_data.data, profile)
+        self.db.commit()
+
+        return len(rows)
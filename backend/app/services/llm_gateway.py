@@ -0,0 +1,248 @@
+"""Async gateway for all LLM provider calls
+
+Every model call goes through `llm_gateway` so that:
+- calls never block the event loop (async SDK methods are awaited directly,
+  synchronous ones run on a dedicated thread pool),
+- each provider has a cap on in-flight requests; callers beyond it queue by
+  priority and take turns per user (see llm_scheduler),
+- calls are refused up front (LLMRejectedError, an HTTP 429 for clients)
+  when the user's daily token quota is used up or the queue is too long to
+  finish them within their deadline,
+- every call has a deadline covering queue wait and generation,
+- queue wait, latency, timeouts and errors are recorded in the metrics registry,
+  each call's outcome in the provider's health (see llm_router), and its
+  tokens, cost and latency per prompt in the call telemetry (see llm_telemetry).
+"""
+import asyncio
+import inspect
+import math
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.llm_quota_service import check_quota, record_usage
+from app.services.llm_router import provider_health
+from app.services.llm_scheduler import PRIORITY_NAMES, FairQueue, LLMOverloadedError, current_request
+from app.services.llm_telemetry import begin_call
+from app.services.prompt_registry import estimate_tokens
+
+
+class LLMTimeoutError(TimeoutError):
+    """An LLM call did not finish within its deadline"""
+
+
+def _token_counts(response: Any, contents: Any) -> Tuple[int, int]:
+    """(prompt, completion) tokens reported by the provider, else estimated from the text"""
+    usage = getattr(response, "usage_metadata", None)  # Gemini
+    if usage is not None and getattr(usage, "total_token_count", None):
+        return usage.prompt_token_count or 0, usage.candidates_token_count or 0
+    usage = getattr(response, "usage", None)  # OpenAI
+    if usage is not None and getattr(usage, "total_tokens", None):
+        return usage.prompt_tokens or 0, usage.completion_tokens or 0
+    try:
+        output = response.text
+    except Exception:
+        output = ""
+    return estimate_tokens(contents if isinstance(contents, str) else ""), estimate_tokens(output or "")
+
+
+def _model(func: Callable[..., Any], kwargs: Dict[str, Any]) -> Optional[str]:
+    """Model a call goes to: the OpenAI `model` argument or the Gemini model's name"""
+    return kwargs.get("model") or getattr(getattr(func, "__self__", None), "model_name", None)
+
+
+def _charge(user_id: int, tokens: int) -> None:
+    try:
+        record_usage(user_id, tokens)
+    except Exception as e:
+        print(f"Recording LLM usage for user {user_id} failed: {e}")
+
+
+class LLMGateway:
+    """Per-provider concurrency limits and deadlines for model calls"""
+
+    def __init__(self, limits: Dict[str, int], timeout: float):
+        self.limits = limits
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(sum(limits.values()), 1),
+            thread_name_prefix="llm"
+        )
+        # Queues belong to the event loop that created them
+        self._queues: Dict[str, Tuple[asyncio.AbstractEventLoop, FairQueue]] = {}
+        self._in_flight: Dict[str, int] = defaultdict(int)
+
+    def _queue(self, provider: str) -> FairQueue:
+        loop = asyncio.get_running_loop()
+        entry = self._queues.get(provider)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, FairQueue(self.limits.get(provider, 4)))
+            self._queues[provider] = entry
+        return entry[1]
+
+    def _set_in_flight(self, provider: str, delta: int) -> None:
+        self._in_flight[provider] += delta
+        metrics.set_gauge(f"llm.{provider}.in_flight", self._in_flight[provider])
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        return time.monotonic() + (timeout if timeout is not None else self.timeout)
+
+    async def admit(self, provider: str, timeout: Optional[float] = None) -> None:
+        """
+        Refuse a call that cannot succeed, before it queues
+
+        Checks the current user's daily quota, and whether the calls queued
+        ahead (same or higher priority) would keep this one waiting past its
+        deadline at the provider's typical latency.
+
+        Raises:
+            LLMQuotaExceededError: the user has no tokens left today
+            LLMOverloadedError: the provider's queue is too long
+        """
+        priority, user_id = current_request()
+        if user_id is not None:
+            await asyncio.to_thread(check_quota, user_id)
+
+        queue = self._queue(provider)
+        ahead = queue.waiting(priority)
+        if queue.in_use < queue.capacity and not ahead:
+            return
+        typical = metrics.timer_percentile(f"llm.{provider}.latency", 0.5)
+        expected_wait = (ahead + 1) / queue.capacity * typical
+        budget = timeout if timeout is not None else self.timeout
+        if ahead >= settings.LLM_MAX_QUEUED_PER_PROVIDER or expected_wait > budget:
+            metrics.increment(f"llm.{provider}.rejected.{PRIORITY_NAMES[priority]}")
+            raise LLMOverloadedError(
+                f"{provider} is busy ({ahead} requests queued)",
+                retry_after=max(math.ceil(expected_wait), 1)
+            )
+
+    def queues(self) -> Dict[str, Dict[str, Any]]:
+        """Slots in use and callers waiting per priority, per provider"""
+        return {
+            provider: {
+                "inUse": queue.in_use,
+                "capacity": queue.capacity,
+                "waiting": {
+                    name: queue.waiting(priority) - (queue.waiting(priority - 1) if priority else 0)
+                    for priority, name in PRIORITY_NAMES.items()
+                },
+            }
+            for provider, (_, queue) in self._queues.items()
+        }
+
+    def charge(self, tokens: int) -> None:
+        """Count tokens against the current user's quota (for streamed calls)"""
+        priority, user_id = current_request()
+        metrics.increment(f"llm.tokens.{PRIORITY_NAMES[priority]}", tokens)
+        if user_id is not None:
+            # Off the request path; the counter only has to be right eventually
+            asyncio.get_running_loop().run_in_executor(None, _charge, user_id, tokens)
+
+    @asynccontextmanager
+    async def slot(self, provider: str, timeout: Optional[float] = None):
+        """
+        Hold one of the provider's in-flight slots
+
+        Yields the absolute deadline (time.monotonic()) for the work done in
+        the slot. Used directly by streaming calls, which keep the slot for
+        the whole stream. Slots go to the current priority class and user
+        (see llm_scheduler.llm_request).
+        """
+        deadline = self._deadline(timeout)
+        await self.admit(provider, timeout)
+        priority, user_id = current_request()
+        queue = self._queue(provider)
+        queued = time.monotonic()
+        waiter = queue.enter(priority, user_id)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter, timeout=max(deadline - queued, 0))
+            except asyncio.TimeoutError:
+                queue.abandon(priority, user_id, waiter)
+                metrics.increment(f"llm.{provider}.timeouts")
+                raise LLMTimeoutError(f"{provider} call timed out waiting for a free slot")
+            except asyncio.CancelledError:
+                queue.abandon(priority, user_id, waiter)
+                raise
+        waited = time.monotonic() - queued
+        metrics.observe(f"llm.{provider}.queue_wait", waited)
+        metrics.observe(f"llm.queue_wait.{PRIORITY_NAMES[priority]}", waited)
+
+        self._set_in_flight(provider, 1)
+        try:
+            yield deadline
+        finally:
+            self._set_in_flight(provider, -1)
+            queue.release()
+
+    async def run(
+        self,
+        provider: str,
+        func: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Call `func(*args, **kwargs)` under the provider's limit and deadline
+
+        Coroutine functions (async SDK methods) are awaited; anything else runs
+        on the gateway's thread pool. A timed-out thread cannot be interrupted,
+        but its slot is released and the caller gets LLMTimeoutError.
+        """
+        async with self.slot(provider, timeout) as deadline:
+            # unwrap: SDKs often wrap async methods in plain decorators
+            if inspect.iscoroutinefunction(inspect.unwrap(func)):
+                call = func(*args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                call = loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+            record = begin_call(provider, _model(func, kwargs))
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(call, timeout=max(deadline - started, 0))
+            except asyncio.TimeoutError as e:
+                metrics.increment(f"llm.{provider}.timeouts")
+                provider_health.record(provider, time.monotonic() - started, ok=False)
+                record.finish("timeout", error=e)
+                raise LLMTimeoutError(f"{provider} call exceeded its deadline")
+            except asyncio.CancelledError:
+                # Not held against the provider's health (e.g. a losing hedge)
+                record.finish("cancelled")
+                raise
+            except Exception as e:
+                metrics.increment(f"llm.{provider}.errors")
+                provider_health.record(provider, time.monotonic() - started, ok=False)
+                record.finish("error", error=e)
+                raise
+            else:
+                provider_health.record(provider, time.monotonic() - started, ok=True)
+                prompt_tokens, completion_tokens = _token_counts(
+                    result, args[0] if args else kwargs.get("messages")
+                )
+                record.finish("ok", prompt_tokens, completion_tokens)
+                self.charge(prompt_tokens + completion_tokens)
+                return result
+            finally:
+                metrics.observe(f"llm.{provider}.latency", time.monotonic() - started)
+
+    async def generate_content(self, model, contents: Any, timeout: Optional[float] = None, **kwargs):
+        """Gemini `GenerativeModel.generate_content` without blocking the loop"""
+        return await self.run("gemini", model.generate_content_async, contents, timeout=timeout, **kwargs)
+
+
+# Create singleton instance
+llm_gateway = LLMGateway(
+    limits={
+        "gemini": settings.LLM_MAX_CONCURRENCY_GEMINI,
+        "openai": settings.LLM_MAX_CONCURRENCY_OPENAI,
+    },
+    timeout=settings.LLM_TIMEOUT_SECONDS
+)
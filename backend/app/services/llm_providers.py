@@ -0,0 +1,68 @@
+"""Process-wide LLM clients
+
+The Gemini SDK keeps its API key in global state, so configuring it from
+several services (possibly with different keys) races. The registry
+configures each provider once per process and hands out shared model and
+client objects, which also keeps their underlying connections alive
+between requests.
+"""
+import threading
+from typing import Dict, Optional
+
+import google.generativeai as genai
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+
+# Models created by warm_up so the first request finds them ready
+WARM_MODELS = ("gemini-flash-latest",)
+
+
+class ProviderRegistry:
+    """Thread-safe, lazily initialized LLM clients"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gemini_configured = False
+        self._gemini_models: Dict[str, genai.GenerativeModel] = {}
+        self._openai_client: Optional[AsyncOpenAI] = None
+        self._openai_initialized = False
+
+    def _configure_gemini(self) -> None:
+        if not self._gemini_configured:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            self._gemini_configured = True
+
+    def gemini_model(self, name: str) -> genai.GenerativeModel:
+        """Shared GenerativeModel for a model name"""
+        model = self._gemini_models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            self._configure_gemini()
+            model = self._gemini_models.get(name)
+            if model is None:
+                model = genai.GenerativeModel(name)
+                self._gemini_models[name] = model
+        return model
+
+    def openai_client(self) -> Optional[AsyncOpenAI]:
+        """Shared AsyncOpenAI client, or None when no API key is configured"""
+        if not self._openai_initialized:
+            with self._lock:
+                if not self._openai_initialized:
+                    if settings.OPENAI_API_KEY:
+                        self._openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+                    self._openai_initialized = True
+        return self._openai_client
+
+    def warm_up(self) -> None:
+        """Configure SDKs and build the common clients ahead of the first request"""
+        for name in WARM_MODELS:
+            self.gemini_model(name)
+        self.openai_client()
+
+
+# Create singleton instance
+providers = ProviderRegistry()
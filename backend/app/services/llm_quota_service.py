@@ -0,0 +1,131 @@
+"""Per-user daily LLM token quotas
+
+Tokens are counted per user and UTC day in the llm_usage table, so the
+quota holds across worker processes. Checks read a short-lived in-process
+copy of the counter rather than the database on every call; a user can
+overshoot their quota by what other workers used in that window.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone, date
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.database import SessionLocal
+from app.models.llm_usage import LLMUsage
+from app.services.llm_scheduler import LLMQuotaExceededError
+
+# Seconds a user's counter is served from memory before it is re-read
+USAGE_CACHE_SECONDS = 10.0
+
+# user id -> (day, tokens, read at)
+_usage_cache: Dict[int, Tuple[date, int, float]] = {}
+_usage_lock = threading.Lock()
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def seconds_until_reset() -> int:
+    """Seconds until quotas reset at the next UTC midnight"""
+    now = datetime.now(timezone.utc)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return max(int((midnight - now).total_seconds()) + 1, 1)
+
+
+class LLMQuotaService:
+    """Daily token counters in the llm_usage table"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def used_today(self, user_id: int) -> int:
+        row = self.db.query(LLMUsage.tokens).filter(
+            LLMUsage.user_id == user_id,
+            LLMUsage.day == _today()
+        ).first()
+        return row[0] if row else 0
+
+    def add(self, user_id: int, tokens: int) -> None:
+        """Count `tokens` and one request against today's usage"""
+        day = _today()
+        values = {LLMUsage.tokens: LLMUsage.tokens + tokens, LLMUsage.requests: LLMUsage.requests + 1}
+        updated = self.db.query(LLMUsage).filter(
+            LLMUsage.user_id == user_id,
+            LLMUsage.day == day
+        ).update(values, synchronize_session=False)
+        if not updated:
+            try:
+                self.db.add(LLMUsage(user_id=user_id, day=day, tokens=tokens, requests=1))
+                self.db.commit()
+                return
+            except IntegrityError:
+                # Another worker created today's row first
+                self.db.rollback()
+                self.db.query(LLMUsage).filter(
+                    LLMUsage.user_id == user_id,
+                    LLMUsage.day == day
+                ).update(values, synchronize_session=False)
+        self.db.commit()
+
+    def top_users(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Today's heaviest users"""
+        rows = self.db.query(LLMUsage).filter(LLMUsage.day == _today()).order_by(
+            LLMUsage.tokens.desc()
+        ).limit(limit).all()
+        return [
+            {"userId": row.user_id, "tokens": row.tokens, "requests": row.requests}
+            for row in rows
+        ]
+
+
+def check_quota(user_id: int) -> None:
+    """
+    Raise if the user has no tokens left today
+
+    Raises:
+        LLMQuotaExceededError: with the seconds until the quota resets
+    """
+    quota = settings.LLM_DAILY_TOKEN_QUOTA
+    if not quota:
+        return
+
+    day = _today()
+    with _usage_lock:
+        cached = _usage_cache.get(user_id)
+    if cached is None or cached[0] != day or time.monotonic() - cached[2] > USAGE_CACHE_SECONDS:
+        db = SessionLocal()
+        try:
+            used = LLMQuotaService(db).used_today(user_id)
+        finally:
+            db.close()
+        with _usage_lock:
+            _usage_cache[user_id] = (day, used, time.monotonic())
+    else:
+        used = cached[1]
+
+    if used >= quota:
+        metrics.increment("llm.quota_rejections")
+        raise LLMQuotaExceededError(
+            f"Daily AI usage limit of {quota} tokens reached",
+            retry_after=seconds_until_reset()
+        )
+
+
+def record_usage(user_id: int, tokens: int) -> None:
+    """Count tokens used by one of the user's calls"""
+    db = SessionLocal()
+    try:
+        LLMQuotaService(db).add(user_id, tokens)
+    finally:
+        db.close()
+    day = _today()
+    with _usage_lock:
+        cached = _usage_cache.get(user_id)
+        if cached is not None and cached[0] == day:
+            _usage_cache[user_id] = (day, cached[1] + tokens, cached[2])
@@ -0,0 +1,233 @@
+"""Provider health tracking, failover and hedging for LLM calls
+
+`llm_gateway` records the outcome and latency of every call in
+`provider_health`. Each provider keeps a rolling window of recent calls;
+when too many of them failed, its circuit opens and the router skips it.
+After a cooldown one call is let through as a probe: success closes the
+circuit, failure keeps it open for another cooldown.
+
+`llm_router.call` tries providers in order of preference, moving on when
+one fails or its circuit is open. With `hedge=True` it does not wait for
+a slow provider either: if the first has not answered within its recent
+p95 latency, the next one is started as well, the first good answer wins
+and the other call is cancelled.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.llm_scheduler import LLMQuotaExceededError
+
+# Calls kept per provider, and how far back they count
+HEALTH_WINDOW = 100
+HEALTH_WINDOW_SECONDS = 60.0
+
+# Successful calls needed before the p95 latency is trusted for hedging
+HEDGE_MIN_SAMPLES = 10
+
+
+class CircuitOpenError(RuntimeError):
+    """Every candidate provider's circuit is open"""
+
+
+class ProviderHealth:
+    """Rolling outcomes of one provider's calls and its circuit state"""
+
+    def __init__(self, name: str):
+        self.name = name
+        # (monotonic time, latency in seconds, succeeded)
+        self._calls: Deque[Tuple[float, float, bool]] = deque(maxlen=HEALTH_WINDOW)
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _recent(self, now: float) -> List[Tuple[float, float, bool]]:
+        return [call for call in self._calls if now - call[0] <= HEALTH_WINDOW_SECONDS]
+
+    def record(self, latency: float, ok: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._calls.append((now, latency, ok))
+            if self._opened_at is not None:
+                # The probe's outcome decides
+                if ok:
+                    self._opened_at = None
+                    self._calls.clear()
+                    metrics.increment(f"llm.{self.name}.circuit_closed")
+                else:
+                    self._opened_at = now
+                return
+
+            recent = self._recent(now)
+            failures = sum(1 for _, _, succeeded in recent if not succeeded)
+            if (
+                len(recent) >= settings.LLM_CIRCUIT_MIN_CALLS
+                and failures / len(recent) >= settings.LLM_CIRCUIT_ERROR_RATE
+            ):
+                self._opened_at = now
+                metrics.increment(f"llm.{self.name}.circuit_opened")
+                print(f"LLM provider {self.name} circuit opened: {failures}/{len(recent)} recent calls failed")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < settings.LLM_CIRCUIT_COOLDOWN_SECONDS:
+                return "open"
+            return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a call may go to this provider now"""
+        now = time.monotonic()
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if now - self._opened_at < settings.LLM_CIRCUIT_COOLDOWN_SECONDS:
+                return False
+            # Claim the probe so concurrent callers wait for its outcome
+            self._opened_at = now
+            return True
+
+    def p95_latency(self) -> Optional[float]:
+        """Recent p95 latency of successful calls, None with too few samples"""
+        with self._lock:
+            latencies = sorted(latency for _, latency, ok in self._recent(time.monotonic()) if ok)
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = self._recent(time.monotonic())
+        failures = sum(1 for _, _, ok in recent if not ok)
+        p95 = self.p95_latency()
+        return {
+            "state": self.state,
+            "recentCalls": len(recent),
+            "errorRate": round(failures / len(recent), 3) if recent else 0.0,
+            "p95Ms": round(p95 * 1000, 2) if p95 is not None else None,
+        }
+
+
+class ProviderHealthRegistry:
+    """Health of every provider called in this process"""
+
+    def __init__(self):
+        self._providers: Dict[str, ProviderHealth] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> ProviderHealth:
+        health = self._providers.get(provider)
+        if health is None:
+            with self._lock:
+                health = self._providers.setdefault(provider, ProviderHealth(provider))
+        return health
+
+    def record(self, provider: str, latency: float, ok: bool) -> None:
+        self.get(provider).record(latency, ok)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = dict(self._providers)
+        return {name: health.snapshot() for name, health in sorted(providers.items())}
+
+
+class LLMRouter:
+    """Failover and hedging across providers"""
+
+    def __init__(self, health: ProviderHealthRegistry):
+        self.health = health
+
+    def hedge_delay(self, provider: str) -> float:
+        """How long to wait for `provider` before starting a hedge call"""
+        p95 = self.health.get(provider).p95_latency()
+        if p95 is None:
+            return settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(p95, settings.LLM_HEDGE_MIN_DELAY_SECONDS)
+
+    def _next(self, providers: List[str]) -> Optional[str]:
+        """Pop the first provider whose circuit lets a call through"""
+        while providers:
+            provider = providers.pop(0)
+            if self.health.get(provider).allow():
+                return provider
+            metrics.increment(f"llm.{provider}.circuit_rejected")
+        return None
+
+    async def call(
+        self,
+        calls: Dict[str, Callable[[], Awaitable[Any]]],
+        hedge: bool = False
+    ) -> Any:
+        """
+        Result of the first provider that answers
+
+        Args:
+            calls: Provider name -> zero-argument coroutine function making
+                the call, in order of preference
+            hedge: Start the next provider when the current one is slower
+                than its recent p95 latency instead of waiting for it
+
+        Raises:
+            CircuitOpenError: if no provider could be tried
+            Exception: the last provider's error if all of them failed
+        """
+        remaining = list(calls)
+        pending: Dict[asyncio.Task, str] = {}
+        error: Optional[BaseException] = None
+        hedged = False
+
+        def start(provider: str) -> None:
+            pending[asyncio.ensure_future(calls[provider]())] = provider
+
+        try:
+            while True:
+                if not pending:
+                    provider = self._next(remaining)
+                    if provider is None:
+                        break
+                    if error is not None:
+                        metrics.increment(f"llm.failovers.{provider}")
+                    start(provider)
+
+                # Wait for an answer, or until a hedge is due
+                timeout = None
+                if hedge and remaining and len(pending) == 1:
+                    timeout = self.hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    provider = self._next(remaining)
+                    if provider is not None:
+                        metrics.increment(f"llm.hedges.{provider}")
+                        hedged = True
+                        start(provider)
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        if hedged:
+                            metrics.increment(f"llm.hedge_wins.{provider}")
+                        return task.result()
+                    error = task.exception()
+                    if isinstance(error, LLMQuotaExceededError):
+                        # The user's quota covers every provider
+                        raise error
+                    print(f"{provider} call failed: {error}")
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if error is not None:
+            raise error
+        raise CircuitOpenError(f"No LLM provider available (circuits open: {', '.join(calls)})")
+
+
+# Create singleton instances
+provider_health = ProviderHealthRegistry()
+llm_router = LLMRouter(provider_health)
@@ -0,0 +1,144 @@
+"""Priority and per-user fair scheduling of LLM provider slots
+
+Each provider has a fixed number of in-flight slots (see llm_gateway).
+Callers waiting for one are served by priority class first (interactive
+chat, then on-demand analysis, then background work), and round-robin
+across users within a class, so one user's batch cannot starve everyone
+else's requests.
+
+The priority and user of the calls made while handling a request are set
+once with `llm_request(...)` and picked up by the gateway from context.
+"""
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional, Tuple
+
+PRIORITY_INTERACTIVE = 0  # chat the user is waiting on
+PRIORITY_ANALYSIS = 1  # analyses requested by the user (default)
+PRIORITY_BACKGROUND = 2  # enrichment, summaries, precompute
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_ANALYSIS: "analysis",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# (priority, user id) of the LLM calls made in this context
+_current: ContextVar[Tuple[int, Optional[int]]] = ContextVar(
+    "llm_request", default=(PRIORITY_ANALYSIS, None)
+)
+
+
+class LLMRejectedError(RuntimeError):
+    """A call was refused before reaching the provider; retry after `retry_after` seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMOverloadedError(LLMRejectedError):
+    """Too many calls are queued for the provider to finish this one in time"""
+
+
+class LLMQuotaExceededError(LLMRejectedError):
+    """The user has used up their daily token quota"""
+
+
+@contextmanager
+def llm_request(priority: int, user_id: Optional[int] = None):
+    """Priority and user for the LLM calls made in the enclosed block"""
+    token = _current.set((priority, user_id))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_request() -> Tuple[int, Optional[int]]:
+    """(priority, user id) of the calls made in this context"""
+    return _current.get()
+
+
+class FairQueue:
+    """
+    A provider's slots, handed out by priority and round-robin across users
+
+    Only used from the event loop that created it, so it needs no lock.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        # priority -> user id -> waiters, users in round-robin order
+        self._waiting: Dict[int, "OrderedDict[Optional[int], Deque[asyncio.Future]]"] = {
+            priority: OrderedDict() for priority in PRIORITY_NAMES
+        }
+
+    def waiting(self, up_to_priority: Optional[int] = None) -> int:
+        """Callers queued at `up_to_priority` or more urgent (all by default)"""
+        return sum(
+            len(waiters)
+            for priority, users in self._waiting.items()
+            if up_to_priority is None or priority <= up_to_priority
+            for waiters in users.values()
+        )
+
+    def enter(self, priority: int, user_id: Optional[int]) -> Optional[asyncio.Future]:
+        """
+        Take a free slot, or join the queue
+
+        Returns None when a slot was taken, else the future that resolves
+        once one is handed over. Joining is synchronous, so the next caller's
+        admission check already counts this one.
+        """
+        if self.in_use < self.capacity and not self.waiting():
+            self.in_use += 1
+            return None
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting[priority].setdefault(user_id, deque()).append(waiter)
+        return waiter
+
+    def abandon(self, priority: int, user_id: Optional[int], waiter: asyncio.Future) -> None:
+        """Leave the queue after giving up on `waiter` (timeout or cancellation)"""
+        if waiter.done() and not waiter.cancelled():
+            # Granted just as we gave up; pass the slot on
+            self.release()
+        else:
+            self._discard(priority, user_id, waiter)
+
+    async def acquire(self, priority: int, user_id: Optional[int]) -> None:
+        waiter = self.enter(priority, user_id)
+        if waiter is None:
+            return
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            self.abandon(priority, user_id, waiter)
+            raise
+
+    def _discard(self, priority: int, user_id: Optional[int], waiter: asyncio.Future) -> None:
+        users = self._waiting[priority]
+        waiters = users.get(user_id)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del users[user_id]
+
+    def release(self) -> None:
+        """Free a slot, or hand it straight to the next waiter"""
+        for users in self._waiting.values():
+            while users:
+                user_id, waiters = next(iter(users.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    # This user goes to the back of the line
+                    users.move_to_end(user_id)
+                else:
+                    del users[user_id]
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self.in_use -= 1
@@ -0,0 +1,415 @@
+"""Per-call LLM telemetry
+
+Every provider call produces an `LLMCallRecord` with the prompt's name and
+version, model, prompt and completion tokens, latency (plus time to first
+token for streams), attempt number, outcome and, for calls whose output is
+parsed as JSON, whether that worked. Records are exported as per-prompt
+metrics straight away and buffered for the llm_calls table, which `flush`
+writes in bulk off the request path (see main.py).
+
+Services name the prompt behind the calls they make:
+
+    with llm_call(ANALYSIS_PLATFORM, attempt) as call:
+        response = await llm_gateway.generate_content(...)
+        call.parsed(ok)
+
+and llm_gateway fills in the rest. Calls made outside such a block are
+recorded as "unnamed".
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.llm_call import LLMCall
+from app.services.llm_scheduler import PRIORITY_NAMES, current_request
+from app.services.prompt_registry import PromptTemplate
+
+# USD per million (prompt, completion) tokens. Approximate list prices,
+# good enough to rank prompts by spend; unknown models cost nothing.
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-flash-latest": (0.30, 2.50),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-pro": (0.50, 1.50),
+    "gemini-pro-vision": (0.50, 1.50),
+    "gpt-4": (30.0, 60.0),
+}
+
+# Records kept in memory between flushes; the oldest are dropped beyond this
+MAX_BUFFERED_CALLS = 10000
+
+# Scope of the HTTP request being handled, set by EndpointTelemetryMiddleware
+_request_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_request_scope", default=None)
+
+# Prompt call the LLM calls made in this context belong to
+_current_call: ContextVar[Optional["PromptCall"]] = ContextVar("llm_prompt_call", default=None)
+
+
+def _endpoint() -> str:
+    """Route template of the current request ("GET /items/{id}"), or "background\""""
+    scope = _request_scope.get()
+    if scope is None:
+        return "background"
+    # FastAPI puts the matched route in the scope
+    route = scope.get("route")
+    path = getattr(route, "path_format", None) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+def model_name(name: Optional[str]) -> Optional[str]:
+    """Model name without the SDK's "models/" prefix"""
+    if name and name.startswith("models/"):
+        return name[len("models/"):]
+    return name
+
+
+def cost_usd(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = MODEL_PRICES.get(model or "", (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class LLMCallRecord:
+    """Telemetry of one provider call, from when it was sent"""
+
+    def __init__(self, provider: str, model: Optional[str], call: Optional["PromptCall"] = None):
+        priority, user_id = current_request()
+        self.call = call
+        self.provider = provider
+        self.model = model_name(model)
+        self.prompt_name = call.name if call else "unnamed"
+        self.prompt_version = call.version if call else None
+        self.attempt = call.attempt if call else 1
+        self.endpoint = _endpoint()
+        self.priority = PRIORITY_NAMES[priority]
+        self.user_id = user_id
+        self.created_at = datetime.now(timezone.utc)
+        self.started = time.monotonic()
+        self.ttft: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.outcome: Optional[str] = None
+        self.parse_outcome: Optional[str] = None
+        self.error: Optional[str] = None
+
+    @property
+    def cost_usd(self) -> float:
+        return cost_usd(self.model, self.prompt_tokens, self.completion_tokens)
+
+    def first_token(self) -> None:
+        """Mark the arrival of the first streamed output"""
+        if self.ttft is None:
+            self.ttft = time.monotonic() - self.started
+
+    def finish(
+        self,
+        outcome: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """
+        Complete the record and export it
+
+        Args:
+            outcome: ok, error, timeout or cancelled
+            prompt_tokens: Reported by the provider or estimated
+            completion_tokens: Reported by the provider or estimated
+            error: The exception the call failed with, if any
+        """
+        self.latency = time.monotonic() - self.started
+        self.outcome = outcome
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"[:300]
+
+        prefix = f"llm.prompts.{self.prompt_name}"
+        metrics.increment(f"{prefix}.calls")
+        if outcome != "ok":
+            metrics.increment(f"{prefix}.{outcome}")
+        if self.attempt > 1:
+            metrics.increment(f"{prefix}.retries")
+        metrics.increment(f"{prefix}.prompt_tokens", prompt_tokens)
+        metrics.increment(f"{prefix}.completion_tokens", completion_tokens)
+        metrics.increment(f"{prefix}.cost_usd", self.cost_usd)
+        metrics.increment("llm.cost_usd", self.cost_usd)
+        metrics.observe(f"{prefix}.latency", self.latency)
+        if self.ttft is not None:
+            metrics.observe(f"{prefix}.ttft", self.ttft)
+
+        # Open prompt calls submit their records once the parse outcome is in
+        if self.call is None or self.call.closed:
+            telemetry_buffer.submit(self)
+
+    def as_row(self) -> Dict[str, Any]:
+        return {
+            "created_at": self.created_at,
+            "endpoint": self.endpoint[:200],
+            "priority": self.priority,
+            "user_id": self.user_id,
+            "provider": self.provider,
+            "model": self.model,
+            "prompt_name": self.prompt_name,
+            "prompt_version": self.prompt_version,
+            "attempt": self.attempt,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": self.cost_usd,
+            "latency_ms": round(self.latency * 1000, 2),
+            "ttft_ms": round(self.ttft * 1000, 2) if self.ttft is not None else None,
+            "outcome": self.outcome,
+            "parse_outcome": self.parse_outcome,
+            "error": self.error,
+        }
+
+
+class PromptCall:
+    """The provider calls made for one rendered prompt (several when failing over or hedging)"""
+
+    def __init__(self, prompt: Optional[PromptTemplate], attempt: int):
+        self.name = prompt.name if prompt else "unnamed"
+        self.version = prompt.version if prompt else None
+        self.attempt = attempt
+        self.records: List[LLMCallRecord] = []
+        self.closed = False
+
+    def parsed(self, ok: bool) -> None:
+        """Record whether the answer could be parsed"""
+        answered = [record for record in self.records if record.outcome == "ok"]
+        if not answered:
+            return
+        answered[-1].parse_outcome = "ok" if ok else "failed"
+        if not ok:
+            metrics.increment(f"llm.prompts.{self.name}.parse_failures")
+
+    def close(self) -> None:
+        self.closed = True
+        for record in self.records:
+            if record.outcome is not None:
+                telemetry_buffer.submit(record)
+
+
+@contextmanager
+def background_telemetry():
+    """
+    Attribute the enclosed LLM calls to "background"
+
+    For work that runs after the response was sent (BackgroundTasks), which
+    still sees the request's context.
+    """
+    token = _request_scope.set(None)
+    try:
+        yield
+    finally:
+        _request_scope.reset(token)
+
+
+@contextmanager
+def llm_call(prompt: Optional[PromptTemplate], attempt: int = 1):
+    """Attribute the LLM calls made in the enclosed block to `prompt`"""
+    call = PromptCall(prompt, attempt)
+    token = _current_call.set(call)
+    try:
+        yield call
+    finally:
+        _current_call.reset(token)
+        call.close()
+
+
+def begin_call(provider: str, model: Optional[str], prompt: Optional[PromptTemplate] = None) -> LLMCallRecord:
+    """
+    Start the record of a call being sent now
+
+    Belongs to the current `llm_call` block unless `prompt` is given (for
+    streams, whose generator should not hold a context open).
+    """
+    call = PromptCall(prompt, 1) if prompt is not None else _current_call.get()
+    record = LLMCallRecord(provider, model, call)
+    if call is not None:
+        call.records.append(record)
+        if prompt is not None:
+            call.closed = True
+    return record
+
+
+class TelemetryBuffer:
+    """Finished records waiting to be written to the llm_calls table"""
+
+    def __init__(self, max_records: int):
+        self._records: Deque[LLMCallRecord] = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def submit(self, record: LLMCallRecord) -> None:
+        with self._lock:
+            if len(self._records) == self._records.maxlen:
+                metrics.increment("llm.telemetry.dropped")
+            self._records.append(record)
+
+    def flush(self, db: Session) -> int:
+        """Write out the buffered records; returns how many"""
+        with self._lock:
+            records = list(self._records)
+            self._records.clear()
+        if not records:
+            return 0
+        try:
+            db.bulk_insert_mappings(LLMCall, [record.as_row() for record in records])
+            db.commit()
+        except Exception:
+            db.rollback()
+            metrics.increment("llm.telemetry.flush_failures")
+            self._requeue(records)
+            raise
+        metrics.increment("llm.telemetry.written", len(records))
+        return len(records)
+
+    def _requeue(self, records: List[LLMCallRecord]) -> None:
+        """Put unwritten records back ahead of newer ones, dropping the oldest beyond the limit"""
+        with self._lock:
+            room = self._records.maxlen - len(self._records)
+            kept = records[max(len(records) - room, 0):] if room > 0 else []
+            self._records.extendleft(reversed(kept))
+        if len(records) > len(kept):
+            metrics.increment("llm.telemetry.dropped", len(records) - len(kept))
+
+
+class EndpointTelemetryMiddleware:
+    """Label the LLM calls made while handling a request with its route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+
+class LLMTelemetryService:
+    """Reports over the llm_calls table"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def purge(self) -> int:
+        """Delete calls older than the retention period"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.LLM_TELEMETRY_RETENTION_DAYS)
+        deleted = self.db.query(LLMCall).filter(LLMCall.created_at < cutoff).delete(synchronize_session=False)
+        self.db.commit()
+        return deleted
+
+    def _p95_latency(self, since: datetime, name: str, version: Optional[str], model: Optional[str]) -> Optional[float]:
+        latencies = [
+            latency for (latency,) in self.db.query(LLMCall.latency_ms).filter(
+                LLMCall.created_at >= since,
+                LLMCall.prompt_name == name,
+                LLMCall.prompt_version.is_(None) if version is None else LLMCall.prompt_version == version,
+                LLMCall.model.is_(None) if model is None else LLMCall.model == model,
+                LLMCall.outcome == "ok"
+            ).order_by(LLMCall.latency_ms)
+        ]
+        if not latencies:
+            return None
+        return latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)]
+
+    def report(self, hours: int = 24, limit: int = 10) -> Dict[str, Any]:
+        """
+        Slowest and most expensive prompts over the last `hours`
+
+        Prompts are grouped by name, version and model, so a new prompt
+        version or model shows up as its own row.
+        """
+        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+        rows = self.db.query(
+            LLMCall.prompt_name,
+            LLMCall.prompt_version,
+            LLMCall.model,
+            func.count(LLMCall.id),
+            func.avg(LLMCall.latency_ms),
+            func.max(LLMCall.latency_ms),
+            func.avg(LLMCall.ttft_ms),
+            func.sum(LLMCall.prompt_tokens),
+            func.sum(LLMCall.completion_tokens),
+            func.sum(LLMCall.cost_usd),
+            func.count(LLMCall.id).filter(LLMCall.outcome != "ok"),
+            func.count(LLMCall.id).filter(LLMCall.parse_outcome == "failed"),
+            func.count(LLMCall.id).filter(LLMCall.attempt > 1),
+        ).filter(LLMCall.created_at >= since).group_by(
+            LLMCall.prompt_name, LLMCall.prompt_version, LLMCall.model
+        ).all()
+
+        prompts = [
+            {
+                "prompt": name,
+                "version": version,
+                "model": model,
+                "calls": calls,
+                "avgLatencyMs": round(avg_latency or 0, 2),
+                "maxLatencyMs": round(max_latency or 0, 2),
+                "avgTtftMs": round(avg_ttft, 2) if avg_ttft is not None else None,
+                "promptTokens": int(prompt_tokens or 0),
+                "completionTokens": int(completion_tokens or 0),
+                "costUsd": round(cost or 0, 6),
+                "errorRate": round(errors / calls, 3),
+                "parseFailures": parse_failures,
+                "retries": retries,
+            }
+            for (
+                name, version, model, calls, avg_latency, max_latency, avg_ttft,
+                prompt_tokens, completion_tokens, cost, errors, parse_failures, retries
+            ) in rows
+        ]
+        slowest = sorted(prompts, key=lambda row: row["avgLatencyMs"], reverse=True)[:limit]
+        most_expensive = sorted(prompts, key=lambda row: row["costUsd"], reverse=True)[:limit]
+        for row in {id(row): row for row in slowest + most_expensive}.values():
+            p95 = self._p95_latency(since, row["prompt"], row["version"], row["model"])
+            row["p95LatencyMs"] = round(p95, 2) if p95 is not None else None
+
+        endpoints = self.db.query(
+            LLMCall.endpoint,
+            func.count(LLMCall.id),
+            func.avg(LLMCall.latency_ms),
+            func.sum(LLMCall.cost_usd),
+            func.count(LLMCall.id).filter(LLMCall.outcome != "ok"),
+        ).filter(LLMCall.created_at >= since).group_by(LLMCall.endpoint).order_by(
+            func.sum(LLMCall.cost_usd).desc()
+        ).limit(limit).all()
+
+        return {
+            "hours": hours,
+            "totalCalls": sum(row["calls"] for row in prompts),
+            "totalCostUsd": round(sum(row["costUsd"] for row in prompts), 6),
+            "slowest": slowest,
+            "mostExpensive": most_expensive,
+            "byEndpoint": [
+                {
+                    "endpoint": endpoint,
+                    "calls": calls,
+                    "avgLatencyMs": round(avg_latency or 0, 2),
+                    "costUsd": round(cost or 0, 6),
+                    "errorRate": round(errors / calls, 3),
+                }
+                for endpoint, calls, avg_latency, cost, errors in endpoints
+            ],
+        }
+
+
+# Create singleton instance
+telemetry_buffer = TelemetryBuffer(MAX_BUFFERED_CALLS)
@@ -0,0 +1,529 @@
+"""Rule-based platform analysis
+
+Scores platform data on a few fixed dimensions per platform and derives the
+strengths, weaknesses, key metrics, recommendations and weekly plan of an
+analysis from those scores, without a model call. Keys are the ones the
+platform fetchers store in PlatformData.data.
+"""
+import math
+from typing import Any, Callable, Dict, List, Optional
+
+# Dimension score at or above which it counts as a strength
+STRENGTH_THRESHOLD = 60
+
+# Key metric status bands (dimension score)
+GOOD_THRESHOLD = 70
+AVERAGE_THRESHOLD = 40
+
+MAX_TOPICS = 5
+
+PLATFORM_NAMES = {
+    "github": "GitHub",
+    "leetcode": "LeetCode",
+    "geeksforgeeks": "GeeksforGeeks",
+    "codechef": "CodeChef",
+    "hackerrank": "HackerRank",
+    "devpost": "Devpost",
+    "devto": "DEV",
+    "linkedin": "LinkedIn",
+}
+
+
+def _number(data: Dict[str, Any], key: str) -> Optional[float]:
+    value = data.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _linear(value: float, target: float) -> float:
+    """0-100, reaching 100 at `target`"""
+    return min(max(value, 0) / target, 1) * 100
+
+
+def _sqrt(value: float, target: float) -> float:
+    """0-100 on a square-root curve, for long-tailed counts like stars"""
+    return min(math.sqrt(max(value, 0) / target), 1) * 100
+
+
+def _rank_bands(rank: float) -> Optional[float]:
+    """Global rank to score; same bands as LeetCodeService._calculate_contest_score"""
+    if rank <= 0:
+        return None  # 0 means the rank was not found
+    for limit, score in ((1000, 100), (5000, 90), (10000, 80), (50000, 60), (100000, 40), (500000, 20)):
+        if rank <= limit:
+            return score
+    return 10
+
+
+def _leetcode_difficulty(data: Dict[str, Any]) -> Optional[float]:
+    """Share of medium and hard problems; same rule as LeetCodeService._calculate_efficiency_score"""
+    total = _number(data, "total_solved")
+    if not total:
+        return None
+    medium = _number(data, "medium_solved") or 0
+    hard = _number(data, "hard_solved") or 0
+    score = (medium + hard) / total * 100
+    if hard > 100:
+        score += 20
+    elif hard > 50:
+        score += 10
+    return min(score, 100)
+
+
+def _codechef_rating(data: Dict[str, Any]) -> Optional[float]:
+    rating = _number(data, "current_rating")
+    if rating is None:
+        return None
+    # 1000 is roughly the starting rating; 2000+ is 5 stars
+    return _linear(rating - 1000, 1000)
+
+
+def _devto_engagement(data: Dict[str, Any]) -> Optional[float]:
+    articles = _number(data, "articles_published")
+    if not articles:
+        return None
+    return _linear((_number(data, "total_reactions") or 0) / articles, 20)
+
+
+def _devpost_reach(data: Dict[str, Any]) -> Optional[float]:
+    followers = _number(data, "followers")
+    likes = _number(data, "likes_received")
+    if followers is None and likes is None:
+        return None
+    return _sqrt((followers or 0) + (likes or 0), 50)
+
+
+def _github_languages(data: Dict[str, Any]) -> Optional[float]:
+    languages = data.get("top_languages")
+    if not isinstance(languages, list):
+        return None
+    return _linear(len(languages), 5)
+
+
+def _linkedin_profile(data: Dict[str, Any]) -> Optional[float]:
+    present = [
+        bool(data.get(key)) and data.get(key) != "Not available"
+        for key in ("headline", "location")
+    ]
+    return sum(present) / len(present) * 100
+
+
+def _dimension(
+    topic: str,
+    key: str,
+    label: str,
+    benchmark: str,
+    recommendation: str,
+    task: str,
+    target: Optional[float] = None,
+    curve: Callable[[float, float], float] = _linear,
+    score: Optional[Callable[[Dict[str, Any]], Optional[float]]] = None,
+) -> Dict[str, Any]:
+    """
+    One scored aspect of a platform profile
+
+    `key` is the data field shown as the dimension's key metric. The score
+    is `curve(value, target)` unless a custom `score(data)` is given; a
+    score of None means the data does not cover this dimension.
+    """
+    if score is None:
+        def score(data: Dict[str, Any]) -> Optional[float]:
+            value = _number(data, key)
+            return None if value is None else curve(value, target)
+    return {
+        "topic": topic,
+        "key": key,
+        "label": label,
+        "benchmark": benchmark,
+        "recommendation": recommendation,
+        "task": task,
+        "score": score,
+    }
+
+
+PLATFORM_RULES: Dict[str, List[Dict[str, Any]]] = {
+    "github": [
+        _dimension(
+            "Contribution Activity", "commits_last_year", "Commits (last year)", "500+",
+            "Commit to a project every day, even small fixes, to build a steady contribution history",
+            "Ship one meaningful commit to an active project", target=500,
+        ),
+        _dimension(
+            "Consistency", "contribution_streak", "Contribution streak (days)", "30+",
+            "Keep a daily contribution streak; schedule a fixed slot for coding",
+            "Contribute something (code, docs, review) to keep the streak going", target=30,
+        ),
+        _dimension(
+            "Community Impact", "stars", "Stars", "100+",
+            "Polish your best repositories with READMEs, demos and topics so others can discover them",
+            "Improve the README and add screenshots to your top repository", target=100, curve=_sqrt,
+        ),
+        _dimension(
+            "Audience", "followers", "Followers", "50+",
+            "Engage with other developers: review PRs, open issues and share your projects",
+            "Review or comment on two pull requests in projects you use", target=50, curve=_sqrt,
+        ),
+        _dimension(
+            "Project Portfolio", "repositories", "Original repositories", "20+",
+            "Build and publish small, complete projects that show different skills",
+            "Start or finish a small project and publish it with a clear README", target=20,
+        ),
+        _dimension(
+            "Language Diversity", "top_languages", "Languages used", "5+",
+            "Pick up a second language or framework and use it in a real project",
+            "Build a small feature in a language you use less often", score=_github_languages,
+        ),
+    ],
+    "leetcode": [
+        _dimension(
+            "Problem Volume", "total_solved", "Problems solved", "500+",
+            "Solve at least two problems a day to build pattern recognition",
+            "Solve three problems from a topic list (arrays, strings, hashing)", target=500,
+        ),
+        _dimension(
+            "Problem Difficulty", "medium_solved", "Medium problems solved", "60%+ medium/hard",
+            "Shift practice towards medium problems; they dominate interviews",
+            "Solve two medium problems without hints, then review optimal solutions", score=_leetcode_difficulty,
+        ),
+        _dimension(
+            "Hard Problems", "hard_solved", "Hard problems solved", "50+",
+            "Attempt one hard problem every few days and study the editorial afterwards",
+            "Attempt one hard problem (graphs or DP) and write up the approach", target=50,
+        ),
+        _dimension(
+            "Accuracy", "acceptance_rate", "Acceptance rate (%)", "60%+",
+            "Dry-run edge cases before submitting to raise your acceptance rate",
+            "Re-solve two previously failed submissions, testing edge cases first", target=60,
+        ),
+        _dimension(
+            "Global Ranking", "ranking", "Global ranking", "Top 50,000",
+            "Join weekly contests to improve your ranking and speed",
+            "Take a virtual contest under timed conditions",
+            score=lambda data: _rank_bands(_number(data, "ranking") or 0),
+        ),
+        _dimension(
+            "Consistency", "streak", "Daily streak (days)", "30+",
+            "Solve the daily challenge to keep a streak going",
+            "Solve the daily challenge", target=30,
+        ),
+    ],
+    "geeksforgeeks": [
+        _dimension(
+            "Coding Score", "coding_score", "Coding score", "1000+",
+            "Work through topic-wise practice tracks to raise your coding score",
+            "Complete five practice problems from one topic track", target=1000,
+        ),
+        _dimension(
+            "Problem Volume", "problems_solved", "Problems solved", "300+",
+            "Solve a fixed number of problems per week across difficulty levels",
+            "Solve three medium problems", target=300,
+        ),
+        _dimension(
+            "Daily Practice", "potds_solved", "Problems of the day solved", "100+",
+            "Solve the Problem of the Day regularly",
+            "Solve the Problem of the Day", target=100,
+        ),
+        _dimension(
+            "Consistency", "longest_streak", "Longest streak (days)", "60+",
+            "Build a longer practice streak with short daily sessions",
+            "Keep your streak with at least one solved problem", target=60,
+        ),
+        _dimension(
+            "Knowledge Sharing", "articles_published", "Articles published", "5+",
+            "Write an article explaining a problem pattern you have mastered",
+            "Draft an article on a pattern you solved this week", target=5,
+        ),
+    ],
+    "codechef": [
+        _dimension(
+            "Rating", "current_rating", "Current rating", "2000+",
+            "Focus on solving one more problem per contest than last time",
+            "Upsolve the problems you missed in your last contest", score=_codechef_rating,
+        ),
+        _dimension(
+            "Contest Participation", "contests_participated", "Contests participated", "30+",
+            "Take part in every Starters contest to gain rated experience",
+            "Take a past contest under timed conditions", target=30,
+        ),
+        _dimension(
+            "Problem Volume", "problems_solved", "Problems solved", "300+",
+            "Practice problems one difficulty level above your current rating",
+            "Solve three practice problems rated just above your rating", target=300,
+        ),
+        _dimension(
+            "Global Standing", "global_rank", "Global rank", "Top 50,000",
+            "Improve your global rank by performing consistently in rated contests",
+            "Review editorial solutions for two contest problems",
+            score=lambda data: _rank_bands(_number(data, "global_rank") or 0),
+        ),
+    ],
+    "hackerrank": [
+        _dimension(
+            "Stars", "total_stars", "Stars", "30+",
+            "Earn more stars by completing domain tracks (Problem Solving, SQL, Python)",
+            "Complete five challenges in your weakest domain", target=30,
+        ),
+        _dimension(
+            "Badges", "badges_earned", "Badges earned", "10+",
+            "Unlock badges in new domains to show breadth",
+            "Start a track in a domain you have no badge in", target=10,
+        ),
+        _dimension(
+            "Verified Skills", "skills_verified", "Skills verified", "5+",
+            "Take skill certification tests for the languages you use",
+            "Prepare for and take one skills certification test", target=5,
+        ),
+        _dimension(
+            "Certifications", "certificates", "Certificates", "3+",
+            "Add role certifications (e.g. Software Engineer, Problem Solving)",
+            "Practice the topics of your next certification test", target=3,
+        ),
+    ],
+    "devpost": [
+        _dimension(
+            "Hackathon Experience", "hackathons_participated", "Hackathons participated", "10+",
+            "Join a hackathon every month or two, including online ones",
+            "Shortlist upcoming hackathons and register for one", target=10,
+        ),
+        _dimension(
+            "Project Output", "projects_submitted", "Projects submitted", "10+",
+            "Finish and submit every hackathon project, even if incomplete",
+            "Polish a past project and add a demo video", target=10,
+        ),
+        _dimension(
+            "Wins", "prizes_won", "Prizes won", "3+",
+            "Target sponsor prizes and tracks that match your strengths",
+            "Study two winning projects and note what made them stand out", target=3,
+        ),
+        _dimension(
+            "Community Reach", "followers", "Followers", "50+",
+            "Write clear project stories and share them to get likes and followers",
+            "Rewrite the description of your best project with images", score=_devpost_reach,
+        ),
+    ],
+    "devto": [
+        _dimension(
+            "Publishing", "articles_published", "Articles published", "20+",
+            "Publish on a fixed schedule, e.g. one article every two weeks",
+            "Outline and draft your next article", target=20,
+        ),
+        _dimension(
+            "Reader Engagement", "total_reactions", "Reactions", "20+ per article",
+            "Use practical titles, code samples and cover images to draw reactions",
+            "Improve the title and intro of your least-read article", score=_devto_engagement,
+        ),
+        _dimension(
+            "Discussion", "total_comments", "Comments", "50+",
+            "End articles with a question and reply to every comment",
+            "Comment thoughtfully on three articles in your tags", target=50, curve=_sqrt,
+        ),
+        _dimension(
+            "Audience", "followers", "Followers", "100+",
+            "Follow and engage with writers in your tags to grow your audience",
+            "Share your latest article on other channels", target=100, curve=_sqrt,
+        ),
+    ],
+    "linkedin": [
+        _dimension(
+            "Network", "connections", "Connections", "500+",
+            "Connect with classmates, colleagues and people you meet at events",
+            "Send ten personalised connection requests", target=500,
+        ),
+        _dimension(
+            "Experience", "experience_count", "Experience entries", "3+",
+            "Describe each role and project with measurable outcomes",
+            "Rewrite one experience entry with concrete results", target=3,
+        ),
+        _dimension(
+            "Skills", "skills_count", "Skills listed", "20+",
+            "List the skills your target roles ask for and request endorsements",
+            "Add missing skills and ask two colleagues for endorsements", target=20,
+        ),
+        _dimension(
+            "Education", "education_count", "Education entries", "1+",
+            "Add your education, courses and certifications",
+            "Add a recent course or certification", target=1,
+        ),
+        _dimension(
+            "Profile Completeness", "headline", "Headline", "Headline and location set",
+            "Write a headline that states your role and focus",
+            "Update your headline and about section", score=_linkedin_profile,
+        ),
+    ],
+}
+
+# Per-difficulty targets for the LeetCode topic breakdown
+LEETCODE_DIFFICULTY_TARGETS = {"easy": 200, "medium": 300, "hard": 50}
+
+
+def _status(score: float) -> str:
+    if score >= GOOD_THRESHOLD:
+        return "good"
+    if score >= AVERAGE_THRESHOLD:
+        return "average"
+    return "needs_improvement"
+
+
+def _display(value: Any) -> str:
+    if isinstance(value, list):
+        return str(len(value))
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return "N/A" if value is None else str(value)
+
+
+def _global_ranking(platform: str, overall: float, percentile_rank: Optional[float]) -> str:
+    name = PLATFORM_NAMES.get(platform, platform)
+    if percentile_rank is not None:
+        return f"Ahead of {percentile_rank:g}% of users on {name} (top {max(100 - percentile_rank, 0.1):.1f}%)"
+    if overall >= 80:
+        level = "Advanced"
+    elif overall >= 60:
+        level = "Proficient"
+    elif overall >= 40:
+        level = "Intermediate"
+    else:
+        level = "Beginner"
+    return f"{level} {name} profile (estimated from your metrics)"
+
+
+def rule_based_analysis(
+    platform: str,
+    data: Dict[str, Any],
+    percentile_rank: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Analysis fields derived from the platform data by fixed rules
+
+    Raises:
+        ValueError: if the platform has no rules
+    """
+    rules = PLATFORM_RULES.get(platform)
+    if rules is None:
+        raise ValueError(f"Unsupported platform: {platform}")
+
+    scored = []
+    for rule in rules:
+        score = rule["score"](data)
+        if score is not None:
+            scored.append((round(score, 1), rule))
+    if not scored:
+        # Nothing usable in the data; rate every dimension at 0
+        scored = [(0.0, rule) for rule in rules]
+
+    overall = round(sum(score for score, _ in scored) / len(scored), 1)
+    by_score = sorted(scored, key=lambda item: item[0], reverse=True)
+
+    strengths = [item for item in by_score if item[0] >= STRENGTH_THRESHOLD] or by_score[:1]
+    weaknesses = [item for item in reversed(by_score) if item[0] < STRENGTH_THRESHOLD] or by_score[-1:]
+
+    def topic(item, strong: bool) -> Dict[str, Any]:
+        score, rule = item
+        value = _display(data.get(rule["key"]))
+        if strong:
+            description = f"{rule['label']}: {value}, in line with the {rule['benchmark']} benchmark"
+        else:
+            description = f"{rule['label']}: {value}, below the {rule['benchmark']} benchmark"
+        return {"topic": rule["topic"], "score": score, "description": description}
+
+    # Weakest areas first, topped up from the rest so there are at least three
+    focus = [rule for _, rule in reversed(by_score)]
+    recommendations = [rule["recommendation"] for _, rule in weaknesses]
+    for rule in focus:
+        if len(recommendations) >= 3:
+            break
+        if rule["recommendation"] not in recommendations:
+            recommendations.append(rule["recommendation"])
+
+    # Weak areas first, then the rest, so the days differ even with a
+    # single weakness
+    weekly_plan = {
+        f"day{day}": focus[(day - 1) % len(focus)]["task"]
+        for day in range(1, 7)
+    }
+    weekly_plan["day7"] = f"Review this week's progress on {PLATFORM_NAMES.get(platform, platform)} and set next week's goals"
+
+    analysis = {
+        # Only a real population percentile; the rules cannot estimate one
+        "percentileRank": percentile_rank,
+        "globalRanking": _global_ranking(platform, overall, percentile_rank),
+        "overallScore": overall,
+        "strengths": [topic(item, True) for item in strengths[:MAX_TOPICS]],
+        "weaknesses": [topic(item, False) for item in weaknesses[:MAX_TOPICS]],
+        "recommendations": recommendations[:MAX_TOPICS],
+        "weeklyPlan": weekly_plan,
+        "keyMetrics": [
+            {
+                "name": rule["label"],
+                "value": _display(data.get(rule["key"])),
+                "benchmark": rule["benchmark"],
+                "status": _status(score),
+            }
+            for score, rule in scored
+        ],
+    }
+
+    if platform == "leetcode":
+        analysis["topicBreakdown"] = [
+            {
+                "topic": difficulty.title(),
+                "solved": int(_number(data, f"{difficulty}_solved") or 0),
+                "proficiency": round(_linear(_number(data, f"{difficulty}_solved") or 0, target), 1),
+            }
+            for difficulty, target in LEETCODE_DIFFICULTY_TARGETS.items()
+        ]
+
+    return analysis
+
+
+def _band(score: float, width: int) -> int:
+    return min(int(score // width), 100 // width - 1)
+
+
+def profile_bucket(platform: str, data: Dict[str, Any], width: int = 20) -> str:
+    """
+    Coarse fingerprint of a profile: each dimension's score in `width`-point bands
+
+    Profiles with the same bucket look alike to the rules, e.g. "4.2.-.0"
+    (a dash marks a dimension the data does not cover).
+
+    Raises:
+        ValueError: if the platform has no rules
+    """
+    rules = PLATFORM_RULES.get(platform)
+    if rules is None:
+        raise ValueError(f"Unsupported platform: {platform}")
+    bands = []
+    for rule in rules:
+        score = rule["score"](data)
+        bands.append("-" if score is None else str(_band(score, width)))
+    return ".".join(bands)
+
+
+def profile_bands(platform: str, data: Dict[str, Any], width: int = 20) -> List[str]:
+    """
+    The profile as the bucket sees it, one line per covered dimension
+
+    E.g. "Problem Volume: 40-59/100". Carries nothing beyond
+    `profile_bucket`, so text generated from it fits every profile in the
+    bucket.
+    """
+    lines = []
+    for rule in PLATFORM_RULES.get(platform, []):
+        score = rule["score"](data)
+        if score is not None:
+            low = _band(score, width) * width
+            high = 100 if low + width >= 100 else low + width - 1
+            lines.append(f"{rule['topic']}: {low}-{high}/100")
+    return lines
+
+
+def profile_numbers(platform: str, data: Dict[str, Any]) -> Dict[str, str]:
+    """Numeric key metrics of the profile by data key, formatted for display"""
+    numbers = {}
+    for rule in PLATFORM_RULES.get(platform, []):
+        value = _number(data, rule["key"])
+        if value is not None:
+            numbers[rule["key"]] = _display(value)
+    return numbers
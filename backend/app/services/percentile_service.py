@@ -0,0 +1,224 @@
+"""Population percentiles for platform metrics, backed by KLL sketches"""
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.quantile_sketch import KLLSketch
+from app.models.metric_sketch import MetricSketch
+from app.models.platform_data import PlatformData
+
+# Tracked metrics per platform (keys in PlatformData.data); the first one is
+# the headline metric used for an analysis' percentileRank
+PERCENTILE_METRICS = {
+    "github": ["stars", "repositories", "followers", "commits_last_year"],
+    "leetcode": ["total_solved", "hard_solved", "medium_solved"],
+    "geeksforgeeks": ["coding_score", "problems_solved"],
+    "codechef": ["current_rating", "problems_solved"],
+    "hackerrank": ["total_stars", "badges_earned"],
+    "devpost": ["projects_submitted", "hackathons_participated", "prizes_won"],
+    "devto": ["total_reactions", "articles_published", "followers"],
+    "linkedin": ["connections", "experience_count"],
+}
+
+SketchKey = Tuple[str, str]
+
+
+def _numeric(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+class PercentileService:
+    """
+    Per-process view of the population sketches
+
+    Each worker answers queries from `_views` (persisted state + its own
+    recent updates) and accumulates new observations in `_pending`. On
+    persist, pending deltas are merged into the stored sketch and the merged
+    result becomes the new view, so workers converge without coordination.
+
+    Only fetches that change a user's tracked values are observed. Sketches
+    cannot delete, so the user's old values go into a second, "removed"
+    sketch per metric that percentiles subtract; each user counts once.
+    `seed` (run periodically, see PERCENTILE_RESEED_INTERVAL_SECONDS)
+    rebuilds the sketches from current platform data, one sample per user,
+    which also drops the removed sketches and their added error.
+    """
+
+    def __init__(self):
+        self._views: Dict[SketchKey, KLLSketch] = {}
+        self._pending: Dict[SketchKey, KLLSketch] = {}
+        # Retracted (old) values, persisted under the "removed" key of a state
+        self._removed_views: Dict[SketchKey, KLLSketch] = {}
+        self._removed_pending: Dict[SketchKey, KLLSketch] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def tracked_values(platform: str, data: Optional[Dict[str, Any]]) -> Dict[str, float]:
+        """The platform's tracked metric values present in `data`"""
+        values = {}
+        for metric in PERCENTILE_METRICS.get(platform, []):
+            value = _numeric((data or {}).get(metric))
+            if value is not None:
+                values[metric] = value
+        return values
+
+    def observe(
+        self,
+        platform: str,
+        data: Dict[str, Any],
+        previous: Optional[Dict[str, float]] = None
+    ) -> None:
+        """
+        Record metric values from a successful platform fetch
+
+        `previous` holds the user's earlier tracked values (see
+        `tracked_values`), which are retracted.
+        """
+        with self._lock:
+            for metric, value in self.tracked_values(platform, data).items():
+                key = (platform, metric)
+                self._views.setdefault(key, KLLSketch()).update(value)
+                self._pending.setdefault(key, KLLSketch()).update(value)
+            for metric, value in (previous or {}).items():
+                key = (platform, metric)
+                self._removed_views.setdefault(key, KLLSketch()).update(value)
+                self._removed_pending.setdefault(key, KLLSketch()).update(value)
+
+    def percentile(self, platform: str, metric: str, value: float) -> Optional[float]:
+        """
+        Percentage of users with a value <= `value` (0-100)
+
+        Returns None until the sketch has PERCENTILE_MIN_SAMPLES observations.
+        """
+        sketch = self._views.get((platform, metric))
+        if sketch is None:
+            return None
+        removed = self._removed_views.get((platform, metric)) or KLLSketch()
+        users = sketch.n - removed.n
+        if users < settings.PERCENTILE_MIN_SAMPLES:
+            return None
+        at_or_below = sketch.rank(value) * sketch.n - removed.rank(value) * removed.n
+        return round(min(max(at_or_below / users, 0.0), 1.0) * 100, 1)
+
+    def platform_percentile(self, platform: str, data: Dict[str, Any]) -> Optional[float]:
+        """Percentile of the platform's headline metric for this data"""
+        metrics = PERCENTILE_METRICS.get(platform)
+        if not metrics:
+            return None
+        value = _numeric(data.get(metrics[0]))
+        if value is None:
+            return None
+        return self.percentile(platform, metrics[0], value)
+
+    def load(self, db: Session) -> None:
+        """Replace the local views with the persisted sketches"""
+        rows = db.query(MetricSketch).all()
+        with self._lock:
+            self._views = {
+                (row.platform, row.metric): KLLSketch.from_dict(row.state)
+                for row in rows
+            }
+            self._removed_views = {
+                (row.platform, row.metric): KLLSketch.from_dict(row.state["removed"])
+                for row in rows
+                if row.state.get("removed")
+            }
+            for key, pending in self._pending.items():
+                self._views.setdefault(key, KLLSketch()).merge(pending)
+            for key, pending in self._removed_pending.items():
+                self._removed_views.setdefault(key, KLLSketch()).merge(pending)
+
+    def persist(self, db: Session) -> int:
+        """Merge pending observations into the stored sketches; returns sketches written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            removed, self._removed_pending = self._removed_pending, {}
+
+        keys = pending.keys() | removed.keys()
+        if not keys:
+            return 0
+
+        try:
+            for platform, metric in keys:
+                row = db.query(MetricSketch).filter(
+                    MetricSketch.platform == platform,
+                    MetricSketch.metric == metric
+                ).with_for_update().first()
+
+                if row is None:
+                    merged, merged_removed = KLLSketch(), KLLSketch()
+                    row = MetricSketch(platform=platform, metric=metric)
+                    db.add(row)
+                else:
+                    merged = KLLSketch.from_dict(row.state)
+                    merged_removed = KLLSketch.from_dict(row.state.get("removed") or {})
+                if (platform, metric) in pending:
+                    merged.merge(pending[(platform, metric)])
+                if (platform, metric) in removed:
+                    merged_removed.merge(removed[(platform, metric)])
+
+                state = merged.to_dict()
+                if merged_removed.n:
+                    state["removed"] = merged_removed.to_dict()
+                row.state = state
+                row.sample_count = merged.n - merged_removed.n
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Keep the observations for the next attempt
+            with self._lock:
+                for key, delta in pending.items():
+                    self._pending.setdefault(key, KLLSketch()).merge(delta)
+                for key, delta in removed.items():
+                    self._removed_pending.setdefault(key, KLLSketch()).merge(delta)
+            raise
+
+        self.load(db)
+        return len(keys)
+
+    def seed(self, db: Session) -> int:
+        """
+        Rebuild the sketches from all stored platform data; returns records observed
+
+        The stored sketches are replaced in one transaction, so concurrent
+        seeds from several workers never add up.
+        """
+        rows = db.query(PlatformData.platform_name, PlatformData.data).filter(
+            PlatformData.platform_name.in_(PERCENTILE_METRICS.keys())
+        ).all()
+
+        sketches: Dict[SketchKey, KLLSketch] = {}
+        for platform, data in rows:
+            for metric, value in self.tracked_values(platform, data).items():
+                sketches.setdefault((platform, metric), KLLSketch()).update(value)
+
+        try:
+            db.query(MetricSketch).delete(synchronize_session=False)
+            for (platform, metric), sketch in sketches.items():
+                db.add(MetricSketch(
+                    platform=platform,
+                    metric=metric,
+                    state=sketch.to_dict(),
+                    sample_count=sketch.n
+                ))
+            db.commit()
+        except IntegrityError:
+            # Another worker seeded at the same time; use its result
+            db.rollback()
+
+        with self._lock:
+            # Pending observations came from data the seed already read
+            self._pending = {}
+            self._removed_pending = {}
+        self.load(db)
+        return len(rows)
+
+
+# Create singleton instance
+percentile_service = PercentileService()
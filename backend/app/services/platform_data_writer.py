@@ -0,0 +1,144 @@
+"""Unit of work for persisting platform fetch outcomes"""
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.platform_data import PlatformData
+from app.models.user_profile import UserProfile
+from app.services.leaderboard_service import LeaderboardService
+from app.services.platform_metrics_service import PlatformMetricsService
+from app.services.percentile_service import percentile_service
+
+
+class PlatformDataWriter:
+    """
+    Collect fetch results for one user and write them in a single transaction
+
+    Platform APIs are called before anything is written, so the database
+    write lock is only held for one short flush instead of once per platform.
+    Each platform is written in its own savepoint, so a write that fails
+    (e.g. a constraint violation) drops only that platform's outcome and is
+    reported in `failed`; the others are still committed.
+    """
+
+    def __init__(self, db: Session, user_id: int, profile: Optional[UserProfile] = None):
+        self.db = db
+        self.user_id = user_id
+        self.profile = profile
+        self._successes: Dict[str, Dict[str, Any]] = {}
+        self._errors: Dict[str, str] = {}
+        # Platforms whose data the last commit actually changed
+        self.changed: Set[str] = set()
+        # Platforms the last commit could not write, with the reason
+        self.failed: Dict[str, str] = {}
+
+    def add_success(self, platform: str, data: Dict[str, Any]) -> None:
+        self._errors.pop(platform, None)
+        self._successes[platform] = data
+
+    def add_error(self, platform: str, message: str) -> None:
+        self._successes.pop(platform, None)
+        self._errors[platform] = message
+
+    def commit(self) -> Dict[str, PlatformData]:
+        """
+        Upsert every collected outcome and commit once
+
+        Errors only update existing rows; a platform that never fetched
+        successfully has no data to keep.
+
+        Returns:
+            Mapping of platform -> persisted PlatformData for successes;
+            successes that could not be written are in `failed` instead
+        """
+        platforms = set(self._successes) | set(self._errors)
+        self.changed = set()
+        self.failed = {}
+        if not platforms:
+            return {}
+
+        existing = {
+            row.platform_name: row
+            for row in self.db.query(PlatformData)
+            .options(selectinload(PlatformData.metrics))
+            .filter(
+                PlatformData.user_id == self.user_id,
+                PlatformData.platform_name.in_(platforms)
+            )
+        }
+        now = datetime.utcnow()
+
+        written = {}
+        # platform -> the user's tracked values before this write
+        observed = {}
+        for platform, data in self._successes.items():
+            previous = existing.get(platform)
+            previous_values = percentile_service.tracked_values(platform, previous.data) if previous else {}
+            try:
+                with self.db.begin_nested():
+                    platform_data, changed = self._write_success(previous, platform, data, now)
+            except SQLAlchemyError as e:
+                self.failed[platform] = f"Could not save {platform} data: {e}"
+                continue
+            written[platform] = platform_data
+            if changed:
+                self.changed.add(platform)
+                if changed == "tracked":
+                    observed[platform] = previous_values
+
+        for platform, message in self._errors.items():
+            platform_data = existing.get(platform)
+            if platform_data is None:
+                continue
+            try:
+                with self.db.begin_nested():
+                    platform_data.update_status = "error"
+                    platform_data.error_message = message[:500]
+                    platform_data.last_updated = now
+            except SQLAlchemyError as e:
+                self.failed[platform] = f"Could not save {platform} status: {e}"
+
+        self.db.commit()
+
+        # Only count observations that made it to the database, and only new
+        # values: a refresh with the same numbers is not another user. The
+        # values they replace are retracted
+        for platform, previous_values in observed.items():
+            percentile_service.observe(platform, self._successes[platform], previous_values)
+
+        self._successes = {}
+        self._errors = {}
+        return written
+
+    def _write_success(
+        self,
+        platform_data: Optional[PlatformData],
+        platform: str,
+        data: Dict[str, Any],
+        now: datetime
+    ) -> Tuple[PlatformData, Optional[str]]:
+        """
+        Upsert one platform's data with its typed metrics and leaderboard rows
+
+        Returns:
+            (row, change) where change is None if the data is unchanged,
+            "tracked" if percentile-tracked values changed, else "data"
+        """
+        if platform_data is None:
+            platform_data = PlatformData(user_id=self.user_id, platform_name=platform)
+            self.db.add(platform_data)
+        change = None
+        if platform_data.data != data:
+            change = "data"
+            if percentile_service.tracked_values(platform, platform_data.data) != \
+                    percentile_service.tracked_values(platform, data):
+                change = "tracked"
+        platform_data.data = data
+        platform_data.last_updated = now
+        platform_data.update_status = "success"
+        platform_data.error_message = None
+        PlatformMetricsService(self.db).sync(platform_data)
+        LeaderboardService(self.db).record(self.user_id, platform, data, self.profile)
+        return platform_data, change
@@ -0,0 +1,130 @@
+"""Typed metric storage and SQL-side analytics for platform data"""
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.platform_data import PlatformData
+from app.models.platform_metric import PlatformMetric
+from app.models.user_profile import UserProfile
+
+
+def extract_metrics(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """
+    Numeric values of a platform payload, keyed by metric name
+
+    Nested dicts are flattened with dotted keys (e.g. "domain_ranks.python");
+    strings, lists and booleans are left to the JSON payload.
+    """
+    metrics = {}
+    for key, value in (data or {}).items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(extract_metrics(value, prefix=f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name[:100]] = float(value)
+    return metrics
+
+
+class PlatformMetricsService:
+    """Keep platform_metrics in sync with PlatformData and query it"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def sync(self, platform_data: PlatformData) -> None:
+        """Mirror the numeric values of `platform_data.data` (caller commits)"""
+        values = extract_metrics(platform_data.data)
+        existing = {metric.metric: metric for metric in platform_data.metrics}
+
+        for name, metric in existing.items():
+            if name not in values:
+                platform_data.metrics.remove(metric)
+
+        for name, value in values.items():
+            metric = existing.get(name)
+            if metric is None:
+                platform_data.metrics.append(PlatformMetric(
+                    user_id=platform_data.user_id,
+                    platform=platform_data.platform_name,
+                    metric=name,
+                    value=value
+                ))
+            elif metric.value != value:
+                metric.value = value
+
+    def _cohort_query(self, query, college_name: Optional[str], graduation_year: Optional[int]):
+        if college_name or graduation_year:
+            query = query.join(UserProfile, UserProfile.user_id == PlatformMetric.user_id)
+            if college_name:
+                query = query.filter(UserProfile.college_name == college_name)
+            if graduation_year:
+                query = query.filter(UserProfile.graduation_year == graduation_year)
+        return query
+
+    def stats(
+        self,
+        platform: str,
+        metric: str,
+        college_name: Optional[str] = None,
+        graduation_year: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Count, mean, min and max of a metric, optionally within a cohort"""
+        query = self.db.query(
+            func.count(PlatformMetric.id),
+            func.avg(PlatformMetric.value),
+            func.min(PlatformMetric.value),
+            func.max(PlatformMetric.value)
+        ).filter(
+            PlatformMetric.platform == platform,
+            PlatformMetric.metric == metric
+        )
+        count, average, minimum, maximum = self._cohort_query(
+            query, college_name, graduation_year
+        ).one()
+
+        return {
+            "count": count,
+            "average": round(average, 2) if average is not None else None,
+            "min": minimum,
+            "max": maximum,
+        }
+
+    def user_ids_in_range(
+        self,
+        platform: str,
+        metric: str,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None,
+        college_name: Optional[str] = None,
+        graduation_year: Optional[int] = None,
+        limit: int = 100
+    ) -> List[int]:
+        """Users whose metric falls in [min_value, max_value], highest first"""
+        query = self.db.query(PlatformMetric.user_id).filter(
+            PlatformMetric.platform == platform,
+            PlatformMetric.metric == metric
+        )
+        if min_value is not None:
+            query = query.filter(PlatformMetric.value >= min_value)
+        if max_value is not None:
+            query = query.filter(PlatformMetric.value <= max_value)
+        query = self._cohort_query(query, college_name, graduation_year)
+
+        return [
+            user_id for (user_id,) in
+            query.order_by(PlatformMetric.value.desc()).limit(limit)
+        ]
+
+    def backfill(self) -> int:
+        """Extract metrics for stored platform data that has none yet; returns rows processed"""
+        has_metrics = self.db.query(PlatformMetric.id).filter(
+            PlatformMetric.platform_data_id == PlatformData.id
+        ).exists()
+        rows = self.db.query(PlatformData).filter(~has_metrics).all()
+
+        for platform_data in rows:
+            self.sync(platform_data)
+        self.db.commit()
+
+        return len(rows)
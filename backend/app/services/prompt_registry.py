@@ -0,0 +1,228 @@
+"""Versioned prompt templates with token budgets
+
+Templates are registered once at import (see prompt_templates) and parsed
+up front, so rendering is a plain `str.format_map`. Each template has a
+version made of its declared number and a hash of its text, so editing a
+prompt changes the version without a manual bump; cache keys built from
+`PromptRegistry.version` follow along.
+
+Variable fields can carry a token budget. Values over budget are shrunk
+before rendering: text keeps its start and end, JSON data is compacted
+and then trimmed, message lists keep their most recent entries. Token
+counts are estimated from the text length (no tokenizer round trip).
+"""
+import hashlib
+import json
+import math
+import threading
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.metrics import metrics
+
+# Rough characters per token for English text and JSON
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = "\n[... truncated ...]\n"
+
+# Share of a truncated text's budget kept from its end
+TAIL_SHARE = 0.25
+
+# Compaction levels tried in order for JSON data: (list items, string chars)
+COMPACTION_LEVELS = ((5, 200), (3, 120), (1, 60))
+
+
+class PromptBudgetError(ValueError):
+    """A template's fixed text and field budgets exceed its token limit"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of `text`"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_text(text: str, max_tokens: float) -> str:
+    """`text` cut to about `max_tokens`, keeping its beginning and end"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max(int(max_tokens * CHARS_PER_TOKEN) - len(TRUNCATION_MARKER), 0)
+    tail = int(keep * TAIL_SHARE)
+    head = keep - tail
+    return text[:head] + TRUNCATION_MARKER + (text[len(text) - tail:] if tail else "")
+
+
+def compact_data(value: Any, list_items: int = 5, string_chars: int = 200) -> Any:
+    """
+    Data trimmed for a prompt
+
+    Drops empty values, keeps the first `list_items` of lists and shortens
+    strings to `string_chars`, so large payloads (repository lists,
+    submissions) do not dominate the prompt.
+    """
+    if isinstance(value, dict):
+        compacted = {key: compact_data(item, list_items, string_chars) for key, item in value.items()}
+        return {key: item for key, item in compacted.items() if item not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [compact_data(item, list_items, string_chars) for item in value[:list_items]]
+    if isinstance(value, str) and len(value) > string_chars:
+        return value[:string_chars] + "..."
+    return value
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def fit_json(value: Any, max_tokens: int) -> str:
+    """Compact JSON for `value`, compacted harder until it fits `max_tokens`"""
+    text = _dumps(compact_data(value))
+    for list_items, string_chars in COMPACTION_LEVELS[1:]:
+        if estimate_tokens(text) <= max_tokens:
+            return text
+        text = _dumps(compact_data(value, list_items, string_chars))
+    return truncate_text(text, max_tokens)
+
+
+def fit_messages(messages: List[Dict[str, Any]], max_tokens: float) -> str:
+    """
+    Most recent chat messages that fit `max_tokens`, oldest first
+
+    A single message longer than half the budget is truncated; older
+    messages that do not fit are replaced by a note saying how many were
+    left out.
+    """
+    if not messages:
+        return "No previous messages"
+
+    kept: List[str] = []
+    used = 0
+    for message in reversed(messages):
+        content = truncate_text(str(message.get("content", "")), max(max_tokens / 2, 1))
+        line = f"{message.get('role', 'user')}: {content}"
+        tokens = estimate_tokens(line) + 1
+        if kept and used + tokens > max_tokens:
+            break
+        kept.append(line)
+        used += tokens
+
+    omitted = len(messages) - len(kept)
+    lines = list(reversed(kept))
+    if omitted:
+        lines.insert(0, f"({omitted} earlier messages omitted)")
+    return "\n".join(lines)
+
+
+def _fit(value: Any, max_tokens: int) -> Tuple[str, bool]:
+    """Rendered field value within `max_tokens`, and whether it had to be cut"""
+    if isinstance(value, str):
+        fitted = truncate_text(value, max_tokens)
+        return fitted, fitted != value
+    if isinstance(value, list) and all(isinstance(item, dict) and "content" in item for item in value):
+        fitted = fit_messages(value, max_tokens)
+        return fitted, fitted != fit_messages(value, math.inf)
+    fitted = fit_json(value, max_tokens)
+    return fitted, estimate_tokens(_dumps(compact_data(value))) > max_tokens
+
+
+class PromptTemplate:
+    """
+    A named `str.format` template
+
+    Args:
+        name: Registry name, e.g. "analysis.platform"
+        version: Bump when the expected output changes without a text change
+        template: Format string; literal braces are doubled
+        budgets: Field name -> max tokens for that field's rendered value
+        max_tokens: Limit for the whole rendered prompt; checked against
+            the fixed text plus all field budgets at registration
+    """
+
+    def __init__(
+        self,
+        name: str,
+        version: int,
+        template: str,
+        budgets: Optional[Dict[str, int]] = None,
+        max_tokens: Optional[int] = None
+    ):
+        self.name = name
+        self.template = template
+        self.budgets = budgets or {}
+        self.max_tokens = max_tokens
+        self.fields = {field for _, field, _, _ in Formatter().parse(template) if field}
+        self.version = f"{version}.{hashlib.sha256(template.encode('utf-8')).hexdigest()[:8]}"
+
+        unknown = set(self.budgets) - self.fields
+        if unknown:
+            raise ValueError(f"Prompt {name} has budgets for unknown fields: {', '.join(sorted(unknown))}")
+
+        fixed = "".join(literal for literal, _, _, _ in Formatter().parse(template))
+        self.fixed_tokens = estimate_tokens(fixed)
+        if max_tokens is not None and self.fixed_tokens + sum(self.budgets.values()) > max_tokens:
+            raise PromptBudgetError(
+                f"Prompt {name} needs up to {self.fixed_tokens + sum(self.budgets.values())} tokens, "
+                f"over its limit of {max_tokens}"
+            )
+
+    def render(self, **values: Any) -> str:
+        """Fill the template, shrinking budgeted fields that are over budget"""
+        missing = self.fields - set(values)
+        if missing:
+            raise KeyError(f"Prompt {self.name} is missing fields: {', '.join(sorted(missing))}")
+
+        for field, budget in self.budgets.items():
+            values[field], truncated = _fit(values[field], budget)
+            if truncated:
+                metrics.increment(f"prompts.{self.name}.truncations")
+
+        prompt = self.template.format_map(values)
+        metrics.increment(f"prompts.{self.name}.renders")
+        metrics.increment(f"prompts.{self.name}.tokens", estimate_tokens(prompt))
+        return prompt
+
+
+class PromptRegistry:
+    """Named prompt templates of this process"""
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        name: str,
+        version: int,
+        template: str,
+        budgets: Optional[Dict[str, int]] = None,
+        max_tokens: Optional[int] = None
+    ) -> PromptTemplate:
+        prompt = PromptTemplate(name, version, template, budgets, max_tokens)
+        with self._lock:
+            if name in self._templates:
+                raise ValueError(f"Prompt {name} is already registered")
+            self._templates[name] = prompt
+        return prompt
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def version(self, names: Iterable[str]) -> str:
+        """Short fingerprint of the given templates' versions, for cache keys"""
+        joined = ",".join(f"{name}@{self._templates[name].version}" for name in sorted(names))
+        return hashlib.sha256(joined.encode("utf-8")).hexdigest()[:12]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {
+                    "version": prompt.version,
+                    "fixed_tokens": prompt.fixed_tokens,
+                    "budgets": prompt.budgets,
+                    "max_tokens": prompt.max_tokens,
+                }
+                for name, prompt in sorted(self._templates.items())
+            }
+
+
+# Create singleton instance
+prompts = PromptRegistry()
@@ -0,0 +1,383 @@
+"""Prompt templates for every model call
+
+Registered in `prompt_registry.prompts` at import. Changing a template's
+text changes its version; bump the declared number as well when the
+expected output changes without a text change (e.g. a new response schema).
+"""
+from app.services.prompt_registry import prompts
+
+# Token budgets for variable inputs
+PLATFORM_DATA_TOKENS = 1500
+SECTION_DATA_TOKENS = 600
+CHAT_HISTORY_TOKENS = 600
+CHAT_QUESTION_TOKENS = 500
+CHAT_SUMMARY_TOKENS = 400
+CHAT_FOLDED_TOKENS = 2000
+RESUME_TOKENS = 3000
+
+ANALYSIS_PLATFORM = prompts.register(
+    "analysis.platform",
+    version=1,
+    budgets={"data": PLATFORM_DATA_TOKENS},
+    max_tokens=2500,
+    template="""
+Analyze this {platform_name} profile data and provide a comprehensive assessment.
+
+Username: {username}
+{percentile_context}Profile data (JSON): {data}
+
+Return JSON with {fields}:
+- globalRanking: a description of where the user stands
+- overallScore: 0-100
+- strengths and weaknesses: 3-5 each of {{"topic", "score" (0-100), "description"}}
+- recommendations: specific, actionable strings
+- weeklyPlan: {{"day1"..."day7"}} with one concrete task each
+- keyMetrics: {{"name", "value", "benchmark" (industry benchmark), "status" (good|average|needs_improvement)}}
+{extra_fields}
+Base the assessment on {focus}.
+""",
+)
+
+ANALYSIS_COMBINED = prompts.register(
+    "analysis.combined",
+    version=1,
+    template="""
+Analyze this developer's profiles on {platform_count} platforms and assess each platform separately.
+
+{sections}
+
+Return one JSON object with a key per platform ({platform_keys}). Each value is that platform's analysis with:
+- percentileRank (0-100, only where no percentile is given above), globalRanking, overallScore (0-100)
+- strengths and weaknesses: 3-5 each of {{"topic", "score" (0-100), "description"}}
+- recommendations: specific, actionable strings
+- weeklyPlan: {{"day1"..."day7"}} with one concrete task each
+- keyMetrics: {{"name", "value", "benchmark", "status" (good|average|needs_improvement)}}
+- topicBreakdown for leetcode only: {{"topic", "solved", "total", "proficiency"}}
+
+Base every section only on that platform's data.
+""",
+)
+
+ANALYSIS_COMBINED_SECTION = prompts.register(
+    "analysis.combined_section",
+    version=1,
+    budgets={"data": SECTION_DATA_TOKENS},
+    template="""## {platform}
+Username: {username}
+{percentile_context}Assess: {focus}
+Data: {data}""",
+)
+
+ANALYSIS_ENRICH = prompts.register(
+    "analysis.enrich",
+    version=1,
+    template="""
+Write a personalized improvement plan for this developer on each platform below.
+
+{sections}
+
+Return one JSON object with a key per platform ({platform_keys}). Each value has:
+- recommendations: 3-5 specific, actionable strings that reference the user's numbers
+- weeklyPlan: {{"day1"..."day7"}} with one concrete task each, focused on the weakest areas
+""",
+)
+
+ANALYSIS_ENRICH_SECTION = prompts.register(
+    "analysis.enrich_section",
+    version=1,
+    budgets={"data": SECTION_DATA_TOKENS},
+    template="""## {platform}
+Overall score: {overall_score}/100, percentile: {percentile_rank}
+Weakest areas: {weaknesses}
+Data: {data}""",
+)
+
+CHAT_PLATFORM = prompts.register(
+    "chat.platform",
+    version=1,
+    budgets={
+        "user_data": PLATFORM_DATA_TOKENS,
+        "conversation_summary": CHAT_SUMMARY_TOKENS,
+        "chat_history": CHAT_HISTORY_TOKENS,
+        "question": CHAT_QUESTION_TOKENS,
+    },
+    max_tokens=4000,
+    template="""
+You are an expert {platform_label} advisor specializing in {platform_context}.
+
+CRITICAL RULES:
+1. You MUST ONLY discuss {platform_label} topics
+2. If the user asks about other platforms or unrelated topics, politely say: "I'm specialized in {platform_label} only. For that topic, please use the relevant platform's AI assistant."
+3. Always reference the user's actual data when giving advice
+4. Provide specific, actionable steps (not generic advice)
+5. Be encouraging and supportive
+6. Use numbers and metrics from their data
+7. Keep responses concise (2-4 paragraphs max)
+
+USER'S {platform_label} DATA:
+{user_data}
+
+ANALYSIS SUMMARY:
+{analysis_summary}
+
+EARLIER CONVERSATION (SUMMARY):
+{conversation_summary}
+
+RECENT CONVERSATION:
+{chat_history}
+
+USER'S QUESTION: {question}
+
+Provide a helpful, specific answer that:
+- Directly addresses their question
+- References their actual {platform_label} data
+- Gives actionable next steps
+- Stays focused on {platform_label} only
+""",
+)
+
+# Opening answers are shared by every profile in the same score bands (see
+# chat_answer_cache), so this prompt sees only the bands; the user's own
+# numbers are filled into the placeholders afterwards
+CHAT_PLATFORM_OPENING = prompts.register(
+    "chat.platform_opening",
+    version=1,
+    budgets={"question": CHAT_QUESTION_TOKENS},
+    max_tokens=1500,
+    template="""
+You are an expert {platform_label} advisor specializing in {platform_context}.
+
+CRITICAL RULES:
+1. You MUST ONLY discuss {platform_label} topics
+2. If the user asks about other platforms or unrelated topics, politely say: "I'm specialized in {platform_label} only. For that topic, please use the relevant platform's AI assistant."
+3. Base your advice on the user's profile below, given as score bands per area
+4. Never write the user's numbers yourself. To mention one, write its placeholder exactly as listed, e.g. "you have solved [[total_solved]] problems"
+5. Do not address the user by name
+6. Provide specific, actionable steps (not generic advice)
+7. Be encouraging and supportive
+8. Keep responses concise (2-4 paragraphs max)
+
+USER'S {platform_label} PROFILE (0-100 per area):
+{profile}
+
+PLACEHOLDERS FOR THE USER'S NUMBERS:
+{placeholders}
+
+USER'S QUESTION: {question}
+
+Provide a helpful, specific answer that directly addresses their question,
+focuses on their weakest areas, gives actionable next steps and stays
+focused on {platform_label} only.
+""",
+)
+
+CHAT_SUMMARY = prompts.register(
+    "chat.summary",
+    version=1,
+    budgets={"summary": CHAT_SUMMARY_TOKENS, "messages": CHAT_FOLDED_TOKENS},
+    max_tokens=2600,
+    template="""
+Update the running summary of a conversation between a developer and their {platform_label} advisor.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW MESSAGES:
+{messages}
+
+Write the updated summary in at most 150 words. Keep the developer's goals,
+constraints, what they have already tried, advice already given and open
+questions. Drop greetings and repetition. Return only the summary text.
+""",
+)
+
+CAREER_RECOMMENDATIONS = prompts.register(
+    "career.recommendations",
+    version=1,
+    budgets={"context": PLATFORM_DATA_TOKENS, "target_role": 50},
+    max_tokens=2500,
+    template="""
+Analyze this developer profile and provide career enhancement recommendations.
+
+Target Role: {target_role}
+
+Profile Analysis (JSON):
+{context}
+
+Please provide:
+1. Market analysis for the target role (trending skills, salary estimate, top companies)
+2. 3-5 specific recommendations with priority levels
+3. A 3-phase learning roadmap with specific tasks and resources
+4. Job match analysis (fit percentage and skill gaps)
+
+Format your response as JSON with this structure:
+{{
+    "market_analysis": {{
+        "demand_score": <number 0-100>,
+        "trending_skills": [<list of 5-8 skills>],
+        "salary_estimate": "<salary range>",
+        "top_companies": [<list of 5-8 companies>]
+    }},
+    "recommendations": [
+        {{
+            "title": "<recommendation title>",
+            "description": "<detailed description>",
+            "priority": "<High|Medium|Low>",
+            "category": "<Skill|Project|Certification|Networking>"
+        }}
+    ],
+    "roadmap": [
+        {{
+            "phase": "<phase name>",
+            "tasks": [<list of specific tasks>],
+            "resources": [
+                {{"name": "<resource name>", "url": "<url or placeholder>"}}
+            ]
+        }}
+    ],
+    "job_match": {{
+        "role": "<the target role>",
+        "fit_percent": <number 0-100>,
+        "gaps": [<list of missing skills/experience>]
+    }}
+}}
+""",
+)
+
+CAREER_PROFILE_RECOMMENDATIONS = prompts.register(
+    "career.profile_recommendations",
+    version=1,
+    budgets={"platform_data": PLATFORM_DATA_TOKENS, "user_profile": 500},
+    max_tokens=2500,
+    template="""
+Analyze this developer's profile and provide comprehensive career recommendations.
+
+Platform Data:
+{platform_data}
+
+User Profile:
+{user_profile}
+
+Provide:
+1. Top 5 specific, actionable recommendations
+2. Skill gaps to address
+3. Learning roadmap (3 phases)
+4. Project ideas to build
+5. Career trajectory prediction
+
+Format as JSON with keys: recommendations, skill_gaps, roadmap, projects, trajectory
+""",
+)
+
+SKILL_ANALYSIS = prompts.register(
+    "skills.analysis",
+    version=1,
+    budgets={"platform_data": PLATFORM_DATA_TOKENS},
+    max_tokens=2000,
+    template="""
+Analyze this developer's skills based on their platform activity.
+
+Data:
+{platform_data}
+
+Provide:
+1. Top 5 strengths
+2. Top 3 areas for improvement
+3. Skill level assessment (beginner/intermediate/advanced)
+4. Industry demand for these skills
+5. Recommended next skills to learn
+""",
+)
+
+RESUME_ANALYSIS = prompts.register(
+    "resume.analysis",
+    version=1,
+    budgets={"resume_text": RESUME_TOKENS},
+    max_tokens=4000,
+    template="""
+Analyze this resume and provide a comprehensive evaluation in JSON format.
+
+Resume Text:
+{resume_text}
+
+Provide analysis with these fields:
+{{
+    "overall_score": <number 0-100>,
+    "content_quality": <number 0-100>,
+    "skills_score": <number 0-100>,
+    "experience_score": <number 0-100>,
+    "skills": [<list of technical skills found>],
+    "experience_years": <estimated years of experience>,
+    "education": [<list of degrees/certifications>],
+    "highlights": [<3-5 key strengths>],
+    "improvements": [<3-5 suggestions for improvement>]
+}}
+
+Scoring criteria:
+- Content Quality: Clarity, structure, grammar, formatting
+- Skills Score: Relevance and breadth of technical skills
+- Experience Score: Years of experience, impact, achievements
+""",
+)
+
+RESUME_ATS = prompts.register(
+    "resume.ats",
+    version=1,
+    budgets={"resume_text": RESUME_TOKENS},
+    max_tokens=4000,
+    template="""
+Analyze this resume for ATS (Applicant Tracking System) compatibility.
+
+Resume:
+{resume_text}
+
+Provide:
+1. ATS Score (0-100)
+2. Keyword optimization score
+3. Format quality score
+4. Missing sections
+5. Improvement suggestions
+
+Be specific and actionable.
+""",
+)
+
+RESUME_IMAGE_TEXT = prompts.register(
+    "resume.image_text",
+    version=1,
+    template="""
+Extract ALL text from this resume image.
+Preserve the structure and formatting as much as possible.
+Include:
+- Name and contact information
+- Work experience with dates
+- Education details
+- Skills and technologies
+- Projects and achievements
+- Certifications
+
+Return the extracted text in a clean, readable format.
+""",
+)
+
+DOCUMENT_IMAGE_TEXT = prompts.register(
+    "document.image_text",
+    version=1,
+    template="""Extract all text from this image.
+This appears to be a resume or professional document.
+Please extract:
+1. All text content
+2. Maintain structure and formatting
+3. Include contact information, work experience, education, skills, etc.
+
+Return only the extracted text, no additional commentary.""",
+)
+
+# Templates behind a stored analysis; their versions are part of the cache key
+ANALYSIS_PROMPTS = (
+    ANALYSIS_PLATFORM.name,
+    ANALYSIS_COMBINED.name,
+    ANALYSIS_COMBINED_SECTION.name,
+    ANALYSIS_ENRICH.name,
+    ANALYSIS_ENRICH_SECTION.name,
+)
@@ -3,13 +3,42 @@ import re
 from typing import Dict, Any, List
 from PyPDF2 import PdfReader
 from PIL import Image
-import google.generativeai as genai
 from io import BytesIO
+import google.generativeai as genai
+from app.core.json_repair import JSONRepairError, parse_json_response
+from app.core.metrics import metrics
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_providers import providers
+from app.services.llm_scheduler import LLMRejectedError
+from app.services.llm_telemetry import llm_call
+from app.services.prompt_templates import RESUME_ANALYSIS, RESUME_IMAGE_TEXT
+
+_SCORE = {"type": "number"}
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+# Response schema for resume analysis (Gemini structured output)
+RESUME_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overall_score": _SCORE,
+        "content_quality": _SCORE,
+        "skills_score": _SCORE,
+        "experience_score": _SCORE,
+        "skills": _STRING_LIST,
+        "experience_years": {"type": "number"},
+        "education": _STRING_LIST,
+        "highlights": _STRING_LIST,
+        "improvements": _STRING_LIST,
+    },
+    "required": [
+        "overall_score", "content_quality", "skills_score", "experience_score",
+        "skills", "experience_years", "education", "highlights", "improvements",
+    ],
+}
 
 class ResumeService:
-    def __init__(self, gemini_api_key: str):
-        genai.configure(api_key=gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+    def __init__(self):
+        self.model = providers.gemini_model('gemini-1.5-flash')
         
         # ATS keywords by category
         self.ats_keywords = {
@@ -72,6 +101,8 @@ class ResumeService:
                     "ats_analysis": ats_score
                 }
             }
+        except LLMRejectedError:
+            raise
         except Exception as e:
             raise Exception(f"Resume analysis failed: {str(e)}")
     
@@ -103,71 +134,46 @@ class ResumeService:
                 image = image.convert('RGB')
             
             # Use Gemini to extract text
-            prompt = """
-            Extract ALL text from this resume image. 
-            Preserve the structure and formatting as much as possible.
-            Include:
-            - Name and contact information
-            - Work experience with dates
-            - Education details
-            - Skills and technologies
-            - Projects and achievements
-            - Certifications
-            
-            Return the extracted text in a clean, readable format.
-            """
+            prompt = RESUME_IMAGE_TEXT.render()
             
-            response = self.model.generate_content([prompt, image])
+            with llm_call(RESUME_IMAGE_TEXT):
+                response = await llm_gateway.generate_content(self.model, [prompt, image])
             return response.text.strip()
             
+        except LLMRejectedError:
+            raise
         except Exception as e:
             raise Exception(f"Image text extraction failed: {str(e)}")
     
     async def _analyze_resume_content(self, text: str) -> Dict[str, Any]:
         """Use Gemini AI to analyze resume content"""
-        prompt = f"""
-        Analyze this resume and provide a comprehensive evaluation in JSON format.
-        
-        Resume Text:
-        {text}
-        
-        Provide analysis with these fields:
-        {{
-            "overall_score": <number 0-100>,
-            "content_quality": <number 0-100>,
-            "skills_score": <number 0-100>,
-            "experience_score": <number 0-100>,
-            "skills": [<list of technical skills found>],
-            "experience_years": <estimated years of experience>,
-            "education": [<list of degrees/certifications>],
-            "highlights": [<3-5 key strengths>],
-            "improvements": [<3-5 suggestions for improvement>]
-        }}
-        
-        Scoring criteria:
-        - Content Quality: Clarity, structure, grammar, formatting
-        - Skills Score: Relevance and breadth of technical skills
-        - Experience Score: Years of experience, impact, achievements
-        """
+        prompt = RESUME_ANALYSIS.render(resume_text=text)
         
         try:
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
-            
-            # Remove markdown code blocks if present
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.startswith("```"):
-                response_text = response_text[3:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
-            
-            import json
-            analysis = json.loads(response_text)
+            with llm_call(RESUME_ANALYSIS) as call:
+                response = await llm_gateway.generate_content(
+                    self.model,
+                    prompt,
+                    generation_config=genai.GenerationConfig(
+                        response_mime_type="application/json",
+                        response_schema=RESUME_ANALYSIS_SCHEMA
+                    )
+                )
+                
+                # Tolerates fences, surrounding prose and truncation
+                try:
+                    analysis = parse_json_response(response.text)
+                except JSONRepairError:
+                    call.parsed(False)
+                    raise
+                call.parsed(True)
             return analysis
             
+        except JSONRepairError:
+            metrics.increment("resume_analysis.parse_failures")
+            return self._fallback_analysis(text)
+        except LLMRejectedError:
+            raise
         except Exception as e:
             # Fallback analysis
             return self._fallback_analysis(text)
@@ -0,0 +1,169 @@
+"""Skill parsing, normalization and skill-based user queries"""
+import json
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.skill import Skill, UserSkill
+from app.models.user import User
+from app.models.user_profile import UserProfile
+
+MAX_SKILL_LENGTH = 100
+
+
+def normalize_skill(name: str) -> str:
+    """Normalized lookup key for a skill: trimmed, lowercased, single-spaced"""
+    return " ".join(name.lower().split())[:MAX_SKILL_LENGTH]
+
+
+def parse_skills(raw: Optional[str]) -> Dict[str, str]:
+    """
+    Parse the free-text `UserProfile.skills` value
+
+    Accepts a comma-separated string or a JSON list of strings.
+
+    Returns:
+        Mapping of normalized key -> display name (first spelling wins)
+    """
+    if not raw:
+        return {}
+
+    items: List[str]
+    try:
+        parsed = json.loads(raw)
+        items = [str(item) for item in parsed] if isinstance(parsed, list) else raw.split(",")
+    except (ValueError, TypeError):
+        items = raw.split(",")
+
+    skills = {}
+    for item in items:
+        display = " ".join(item.split())[:MAX_SKILL_LENGTH]
+        key = normalize_skill(display)
+        if key and key not in skills:
+            skills[key] = display
+    return skills
+
+
+class SkillService:
+    """Maintain the user_skills index and run skill filters in SQL"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _get_or_create_skills(self, skills: Dict[str, str]) -> Dict[str, int]:
+        """Resolve normalized names to skill ids, creating missing dictionary rows"""
+        if not skills:
+            return {}
+
+        existing = {
+            name: skill_id
+            for skill_id, name in self.db.query(Skill.id, Skill.name).filter(
+                Skill.name.in_(skills.keys())
+            )
+        }
+
+        raced = []
+        for key in skills.keys() - existing.keys():
+            skill = Skill(name=key, display_name=skills[key])
+            try:
+                # A savepoint per row, so a conflict leaves the caller's
+                # transaction and the other new skills intact
+                with self.db.begin_nested():
+                    self.db.add(skill)
+                existing[key] = skill.id
+            except IntegrityError:
+                # A concurrent profile save created it after our select
+                raced.append(key)
+
+        if raced:
+            existing.update({
+                name: skill_id
+                for skill_id, name in self.db.query(Skill.id, Skill.name).filter(Skill.name.in_(raced))
+            })
+
+        return existing
+
+    def sync_user_skills(self, user_id: int, raw_skills: Optional[str]) -> None:
+        """
+        Bring a user's skill rows in line with their profile text
+
+        Only the difference is written: removed skills are deleted and new
+        ones inserted. The caller owns the transaction.
+        """
+        desired = self._get_or_create_skills(parse_skills(raw_skills))
+        desired_ids = set(desired.values())
+
+        current_ids = {
+            skill_id for (skill_id,) in self.db.query(UserSkill.skill_id).filter(
+                UserSkill.user_id == user_id
+            )
+        }
+
+        removed = current_ids - desired_ids
+        if removed:
+            self.db.query(UserSkill).filter(
+                UserSkill.user_id == user_id,
+                UserSkill.skill_id.in_(removed)
+            ).delete(synchronize_session=False)
+
+        added = desired_ids - current_ids
+        if added:
+            self.db.add_all(UserSkill(user_id=user_id, skill_id=skill_id) for skill_id in added)
+
+    def backfill(self) -> int:
+        """Index skills for profiles that have none indexed yet; returns profiles processed"""
+        indexed = self.db.query(UserSkill.user_id).distinct()
+        profiles = self.db.query(UserProfile.user_id, UserProfile.skills).filter(
+            UserProfile.skills.isnot(None),
+            UserProfile.skills != "",
+            UserProfile.user_id.notin_(indexed)
+        ).all()
+
+        for user_id, raw_skills in profiles:
+            self.sync_user_skills(user_id, raw_skills)
+        self.db.commit()
+
+        return len(profiles)
+
+    def find_users(
+        self,
+        skills: List[str],
+        match_all: bool = True,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Tuple[User, Optional[UserProfile], int]]:
+        """
+        Find users having all (AND) or any (OR) of the given skills
+
+        Returns:
+            (User, UserProfile, matched_skill_count) rows; OR queries are
+            ordered by how many of the requested skills each user has
+        """
+        keys = {normalize_skill(skill) for skill in skills} - {""}
+        if not keys:
+            return []
+
+        matches = (
+            self.db.query(
+                UserSkill.user_id.label("user_id"),
+                func.count(UserSkill.skill_id).label("matched")
+            )
+            .join(Skill, Skill.id == UserSkill.skill_id)
+            .filter(Skill.name.in_(keys))
+            .group_by(UserSkill.user_id)
+        )
+        if match_all:
+            matches = matches.having(func.count(UserSkill.skill_id) == len(keys))
+        matches = matches.subquery()
+
+        return (
+            self.db.query(User, UserProfile, matches.c.matched)
+            .join(matches, matches.c.user_id == User.id)
+            .outerjoin(UserProfile, UserProfile.user_id == User.id)
+            .order_by(matches.c.matched.desc(), User.id)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
@@ -0,0 +1,78 @@
+"""Purge of used and expired email tokens"""
+from datetime import datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.email_token import EmailToken
+
+
+class TokenCleanupService:
+    """Delete stale email tokens in bounded batches"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _purgeable(self, now: datetime):
+        cutoff = now - timedelta(hours=settings.EMAIL_TOKEN_RETENTION_HOURS)
+        return or_(
+            EmailToken.expires_at < cutoff,
+            and_(EmailToken.used == True, EmailToken.created_at < cutoff)
+        )
+
+    def purge(self, batch_size: int = None) -> int:
+        """
+        Delete tokens that expired (or were used) before the retention window
+
+        Each batch is its own short transaction so the table is never locked
+        for long, even after a large backlog.
+
+        Returns:
+            Number of tokens deleted
+        """
+        batch_size = batch_size or settings.EMAIL_TOKEN_PURGE_BATCH_SIZE
+        condition = self._purgeable(datetime.utcnow())
+        deleted = 0
+
+        while True:
+            ids = [
+                token_id for (token_id,) in
+                self.db.query(EmailToken.id).filter(condition).limit(batch_size)
+            ]
+            if not ids:
+                break
+
+            self.db.query(EmailToken).filter(
+                EmailToken.id.in_(ids)
+            ).delete(synchronize_session=False)
+            self.db.commit()
+            deleted += len(ids)
+
+            if len(ids) < batch_size:
+                break
+
+        metrics.increment("email_tokens.purged", deleted)
+        self.stats()
+        return deleted
+
+    def stats(self) -> Dict[str, int]:
+        """Current table size broken down by token state (also updates gauges)"""
+        now = datetime.utcnow()
+        total, used, expired = self.db.query(
+            func.count(EmailToken.id),
+            func.count(EmailToken.id).filter(EmailToken.used == True),
+            func.count(EmailToken.id).filter(EmailToken.used == False, EmailToken.expires_at < now)
+        ).one()
+
+        result = {
+            "total": total,
+            "used": used,
+            "expired": expired,
+            "active": total - used - expired,
+        }
+        for state, value in result.items():
+            metrics.set_gauge(f"email_tokens.{state}", value)
+        return result
@@ -3,85 +3,104 @@ Unified AI Service - Intelligently routes requests to OpenAI or Gemini
 Strategy:
 - OpenAI (GPT-4): Complex analysis, recommendations, code review, career advice
 - Gemini: Image processing, quick summaries, high-volume tasks
+Either one takes over when the other fails or its circuit is open
 """
-import google.generativeai as genai
-from openai import OpenAI
+from functools import partial
 from typing import Dict, Any, Optional, List
 from app.core.config import settings
-
-# Configure APIs
-genai.configure(api_key=settings.GEMINI_API_KEY)
-openai_client = OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_providers import providers
+from app.services.llm_router import llm_router
+from app.services.llm_scheduler import LLMRejectedError
+from app.services.llm_telemetry import llm_call
+from app.services.prompt_templates import (
+    CAREER_PROFILE_RECOMMENDATIONS,
+    DOCUMENT_IMAGE_TEXT,
+    RESUME_ATS,
+    SKILL_ANALYSIS,
+)
 
 class UnifiedAIService:
     """Unified AI service that routes to best AI provider"""
     
     def __init__(self):
-        self.gemini_model = genai.GenerativeModel('gemini-pro')
-        self.gemini_vision_model = genai.GenerativeModel('gemini-pro-vision')
-        self.openai_client = openai_client
+        self.gemini_model = providers.gemini_model('gemini-pro')
+        self.gemini_vision_model = providers.gemini_model('gemini-pro-vision')
+        self.openai_client = providers.openai_client()
+        self._calls = {"openai": self._analyze_with_openai, "gemini": self._analyze_with_gemini}
+        
+    def _providers(self, preferred: str) -> List[str]:
+        """Available providers, `preferred` first"""
+        order = [preferred] + [provider for provider in ("openai", "gemini") if provider != preferred]
+        return [provider for provider in order if provider != "openai" or self.openai_client]
+    
+    async def _route(self, preferred: str, prompt: str, context: Dict[str, Any] = None, hedge: bool = False) -> str:
+        """
+        Ask the preferred provider, failing over to the other one
         
-    def analyze_with_primary(self, prompt: str, context: Dict[str, Any] = None) -> str:
+        Providers with an open circuit are skipped. `hedge` is for calls a
+        user is waiting on: the other provider is started as well when the
+        first is slower than usual.
+        """
+        calls = {
+            provider: partial(self._calls[provider], prompt, context)
+            for provider in self._providers(preferred)
+        }
+        try:
+            return await llm_router.call(calls, hedge=hedge)
+        except LLMRejectedError:
+            raise
+        except Exception as e:
+            raise ValueError(f"AI analysis failed: {str(e)}")
+    
+    async def analyze_with_primary(self, prompt: str, context: Dict[str, Any] = None, hedge: bool = False) -> str:
         """
         Use primary AI (OpenAI GPT-4) for complex analysis
-        Falls back to Gemini if OpenAI unavailable
+        Falls back to the other provider if it fails or is unhealthy
         """
-        if settings.PRIMARY_AI_SERVICE == "openai" and self.openai_client:
-            return self._analyze_with_openai(prompt, context)
-        else:
-            return self._analyze_with_gemini(prompt, context)
+        return await self._route(settings.PRIMARY_AI_SERVICE, prompt, context, hedge)
     
-    def analyze_with_secondary(self, prompt: str, context: Dict[str, Any] = None) -> str:
+    async def analyze_with_secondary(self, prompt: str, context: Dict[str, Any] = None, hedge: bool = False) -> str:
         """
         Use secondary AI (Gemini) for quick/simple tasks
         """
-        if settings.SECONDARY_AI_SERVICE == "gemini":
-            return self._analyze_with_gemini(prompt, context)
-        elif self.openai_client:
-            return self._analyze_with_openai(prompt, context)
-        else:
-            return self._analyze_with_gemini(prompt, context)
+        return await self._route(settings.SECONDARY_AI_SERVICE, prompt, context, hedge)
     
-    def _analyze_with_openai(self, prompt: str, context: Dict[str, Any] = None) -> str:
+    async def _analyze_with_openai(self, prompt: str, context: Dict[str, Any] = None) -> str:
         """Analyze using OpenAI GPT-4"""
-        try:
-            messages = [
-                {"role": "system", "content": "You are an expert career advisor and technical recruiter specializing in software engineering careers."}
-            ]
-            
-            if context:
-                context_str = "\n".join([f"{k}: {v}" for k, v in context.items()])
-                messages.append({"role": "user", "content": f"Context:\n{context_str}\n\n{prompt}"})
-            else:
-                messages.append({"role": "user", "content": prompt})
-            
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"OpenAI error: {e}, falling back to Gemini")
-            return self._analyze_with_gemini(prompt, context)
+        messages = [
+            {"role": "system", "content": "You are an expert career advisor and technical recruiter specializing in software engineering careers."}
+        ]
+        
+        if context:
+            context_str = "\n".join([f"{k}: {v}" for k, v in context.items()])
+            messages.append({"role": "user", "content": f"Context:\n{context_str}\n\n{prompt}"})
+        else:
+            messages.append({"role": "user", "content": prompt})
+        
+        response = await llm_gateway.run(
+            "openai",
+            self.openai_client.chat.completions.create,
+            model="gpt-4",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=2000
+        )
+        
+        return response.choices[0].message.content
     
-    def _analyze_with_gemini(self, prompt: str, context: Dict[str, Any] = None) -> str:
+    async def _analyze_with_gemini(self, prompt: str, context: Dict[str, Any] = None) -> str:
         """Analyze using Gemini"""
-        try:
-            if context:
-                context_str = "\n".join([f"{k}: {v}" for k, v in context.items()])
-                full_prompt = f"Context:\n{context_str}\n\n{prompt}"
-            else:
-                full_prompt = prompt
-            
-            response = self.gemini_model.generate_content(full_prompt)
-            return response.text
-        except Exception as e:
-            raise ValueError(f"AI analysis failed: {str(e)}")
+        if context:
+            context_str = "\n".join([f"{k}: {v}" for k, v in context.items()])
+            full_prompt = f"Context:\n{context_str}\n\n{prompt}"
+        else:
+            full_prompt = prompt
+        
+        response = await llm_gateway.generate_content(self.gemini_model, full_prompt)
+        return response.text
     
-    def extract_text_from_image(self, image_data: bytes, mime_type: str) -> str:
+    async def extract_text_from_image(self, image_data: bytes, mime_type: str) -> str:
         """Extract text from image using Gemini Vision (best for this task)"""
         try:
             image_parts = [
@@ -91,21 +110,15 @@ class UnifiedAIService:
                 }
             ]
             
-            prompt = """Extract all text from this image. 
-            This appears to be a resume or professional document.
-            Please extract:
-            1. All text content
-            2. Maintain structure and formatting
-            3. Include contact information, work experience, education, skills, etc.
-            
-            Return only the extracted text, no additional commentary."""
+            prompt = DOCUMENT_IMAGE_TEXT.render()
             
-            response = self.gemini_vision_model.generate_content([prompt, image_parts[0]])
+            with llm_call(DOCUMENT_IMAGE_TEXT):
+                response = await llm_gateway.generate_content(self.gemini_vision_model, [prompt, image_parts[0]])
             return response.text
         except Exception as e:
             raise ValueError(f"Image text extraction failed: {str(e)}")
     
-    def generate_career_recommendations(
+    async def generate_career_recommendations(
         self,
         platform_data: Dict[str, Any],
         user_profile: Dict[str, Any]
@@ -114,26 +127,10 @@ class UnifiedAIService:
         Generate comprehensive career recommendations
         Uses OpenAI GPT-4 for best quality analysis
         """
-        prompt = f"""
-        Analyze this developer's profile and provide comprehensive career recommendations.
-        
-        Platform Data:
-        {platform_data}
-        
-        User Profile:
-        {user_profile}
+        prompt = CAREER_PROFILE_RECOMMENDATIONS.render(platform_data=platform_data, user_profile=user_profile)
         
-        Provide:
-        1. Top 5 specific, actionable recommendations
-        2. Skill gaps to address
-        3. Learning roadmap (3 phases)
-        4. Project ideas to build
-        5. Career trajectory prediction
-        
-        Format as JSON with keys: recommendations, skill_gaps, roadmap, projects, trajectory
-        """
-        
-        response = self.analyze_with_primary(prompt)
+        with llm_call(CAREER_PROFILE_RECOMMENDATIONS):
+            response = await self.analyze_with_primary(prompt)
         
         # Parse response (simplified - in production, use structured output)
         return {
@@ -144,28 +141,16 @@ class UnifiedAIService:
             "trajectory": self._extract_trajectory(response)
         }
     
-    def analyze_resume_ats(self, resume_text: str) -> Dict[str, Any]:
+    async def analyze_resume_ats(self, resume_text: str) -> Dict[str, Any]:
         """
         Analyze resume for ATS compatibility
         Uses secondary AI (Gemini) for cost-effectiveness
         """
-        prompt = f"""
-        Analyze this resume for ATS (Applicant Tracking System) compatibility.
-        
-        Resume:
-        {resume_text}
-        
-        Provide:
-        1. ATS Score (0-100)
-        2. Keyword optimization score
-        3. Format quality score
-        4. Missing sections
-        5. Improvement suggestions
-        
-        Be specific and actionable.
-        """
+        prompt = RESUME_ATS.render(resume_text=resume_text)
         
-        response = self.analyze_with_secondary(prompt)
+        # The user waits on the upload response
+        with llm_call(RESUME_ATS):
+            response = await self.analyze_with_secondary(prompt, hedge=True)
         
         return {
             "ats_score": self._extract_score(response, "ATS"),
@@ -174,26 +159,15 @@ class UnifiedAIService:
             "suggestions": self._extract_suggestions(response)
         }
     
-    def generate_skill_analysis(self, platform_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def generate_skill_analysis(self, platform_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Analyze skills across platforms
         Uses OpenAI for deep analysis
         """
-        prompt = f"""
-        Analyze this developer's skills based on their platform activity.
-        
-        Data:
-        {platform_data}
-        
-        Provide:
-        1. Top 5 strengths
-        2. Top 3 areas for improvement
-        3. Skill level assessment (beginner/intermediate/advanced)
-        4. Industry demand for these skills
-        5. Recommended next skills to learn
-        """
+        prompt = SKILL_ANALYSIS.render(platform_data=platform_data)
         
-        response = self.analyze_with_primary(prompt)
+        with llm_call(SKILL_ANALYSIS):
+            response = await self.analyze_with_primary(prompt)
         
         return {
             "strengths": self._extract_list(response, "strengths"),
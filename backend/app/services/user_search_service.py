@@ -0,0 +1,188 @@
+"""Ranked, keyset-paginated user search backed by the full-text index
+
+Pages are keyed on (score, user id), so a row's score must not change
+between page requests unless that row itself changed. Scores are therefore
+computed from the row and the query alone. On SQLite that rules out bm25,
+whose IDF moves every score whenever any user is added or edited. Rows are
+scored by which columns contain a word starting with each query token,
+weighted per column. PostgreSQL's ts_rank (without IDF) and trigram
+similarity already only depend on the row.
+"""
+import base64
+import json
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, case, column, func, literal, literal_column, or_, table, text
+from sqlalchemy.orm import Session
+
+from app.db.search_index import SEARCH_COLUMNS, search_index_dialect
+from app.models.user import User
+from app.models.user_profile import UserProfile
+
+# Per-column match weights for (username, name, full_name, college_name, skills)
+SQLITE_COLUMN_WEIGHTS = (10, 5, 5, 2, 1)
+
+MAX_LIMIT = 50
+
+SearchRow = Tuple[User, Optional[UserProfile]]
+
+
+def _tokenize(query: str) -> List[str]:
+    """Split a raw query into lowercased word tokens"""
+    return re.findall(r"\w+", query.lower())
+
+
+def encode_cursor(score: float, user_id: int) -> str:
+    """Encode the last row's sort key as an opaque cursor"""
+    payload = json.dumps({"s": score, "id": user_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(payload["s"]), int(payload["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _sqlite_score(user_search, tokens: List[str]):
+    """
+    Sum of column weights over (token, column) pairs where the column has a
+    word starting with the token
+
+    Approximates the FTS5 tokenizer (words split on spaces and commas), which
+    is enough for ordering; matching itself is done by the index.
+    """
+    score = literal(0)
+    for name, weight in zip(SEARCH_COLUMNS, SQLITE_COLUMN_WEIGHTS):
+        words = literal(" ").concat(
+            func.replace(func.lower(func.coalesce(user_search.c[name], "")), ",", " ")
+        )
+        for token in tokens:
+            score = score + case((func.instr(words, " " + token) > 0, weight), else_=0)
+    return score
+
+
+class UserSearchService:
+    """Search users by username, name, full name, college and skills"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def search(
+        self,
+        q: str,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[SearchRow], Optional[str]]:
+        """
+        Search users, best matches first
+
+        Args:
+            q: Raw query text
+            limit: Page size (capped at MAX_LIMIT)
+            cursor: Cursor returned by the previous page
+
+        Returns:
+            (rows, next_cursor) where rows are (User, UserProfile) pairs fetched
+            in a single query and next_cursor is None on the last page
+        """
+        tokens = _tokenize(q)
+        if not tokens:
+            return [], None
+
+        limit = max(1, min(limit, MAX_LIMIT))
+        after = decode_cursor(cursor) if cursor else None
+
+        dialect = search_index_dialect()
+        if dialect == "sqlite":
+            results = self._search_sqlite(tokens, limit + 1, after)
+        elif dialect == "postgresql":
+            results = self._search_postgres(q, tokens, limit + 1, after)
+        else:
+            results = self._search_like(q, limit + 1, after)
+
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            user, _, score = results[-1]
+            next_cursor = encode_cursor(score, user.id)
+
+        return [(user, profile) for user, profile, _ in results], next_cursor
+
+    def _search_sqlite(self, tokens: List[str], limit: int, after):
+        """FTS5 prefix match ranked by weighted column matches (higher is better)"""
+        user_search = table("user_search", column("rowid"), *(column(name) for name in SEARCH_COLUMNS))
+        score = _sqlite_score(user_search, tokens)
+        match = " ".join(f'"{token}"*' for token in tokens)
+
+        query = (
+            self.db.query(User, UserProfile, score.label("score"))
+            .select_from(user_search)
+            .join(User, User.id == user_search.c.rowid)
+            .outerjoin(UserProfile, UserProfile.user_id == User.id)
+            .filter(text("user_search MATCH :match"))
+            .params(match=match)
+        )
+
+        if after:
+            last_score, last_id = after
+            query = query.filter(or_(
+                score < last_score,
+                and_(score == last_score, User.id > last_id)
+            ))
+
+        return query.order_by(score.desc(), User.id).limit(limit).all()
+
+    def _search_postgres(self, q: str, tokens: List[str], limit: int, after):
+        """
+        tsvector prefix match plus trigram similarity (higher is better)
+
+        ts_rank without a normalization flag and similarity() only look at
+        the row, so scores hold still between page requests.
+        """
+        user_search = table("user_search", column("user_id"))
+        tsquery = " & ".join(f"{token}:*" for token in tokens)
+        score = func.ts_rank(
+            literal_column("user_search.tsv"), func.to_tsquery("simple", tsquery)
+        ) + func.similarity(literal_column("user_search.document"), q.lower())
+
+        query = (
+            self.db.query(User, UserProfile, score.label("score"))
+            .select_from(user_search)
+            .join(User, User.id == user_search.c.user_id)
+            .outerjoin(UserProfile, UserProfile.user_id == User.id)
+            .filter(text(
+                "(user_search.tsv @@ to_tsquery('simple', :tsquery) "
+                "OR user_search.document % :raw)"
+            ))
+            .params(tsquery=tsquery, raw=q.lower())
+        )
+
+        if after:
+            last_score, last_id = after
+            query = query.filter(or_(
+                score < last_score,
+                and_(score == last_score, User.id > last_id)
+            ))
+
+        return query.order_by(score.desc(), User.id).limit(limit).all()
+
+    def _search_like(self, q: str, limit: int, after):
+        """Unindexed fallback for databases without a search index"""
+        search_term = f"%{q.lower()}%"
+        score = literal_column("0")
+
+        query = (
+            self.db.query(User, UserProfile, score.label("score"))
+            .outerjoin(UserProfile, UserProfile.user_id == User.id)
+            .filter(or_(User.username.like(search_term), User.name.like(search_term)))
+        )
+
+        if after:
+            query = query.filter(User.id > after[1])
+
+        return query.order_by(User.id).limit(limit).all()
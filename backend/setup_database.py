@@ -6,7 +6,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parent))
 
 from app.db.database import engine, Base
-from app.models import User, UserProfile, EmailToken, PlatformData
+import app.models  # noqa: F401 - registers every model on Base.metadata
 
 def init_db():
     """Initialize database tables"""
@@ -14,10 +14,8 @@ def init_db():
     Base.metadata.create_all(bind=engine)
     print("✅ Database tables created successfully!")
     print("\nTables created:")
-    print("  - users")
-    print("  - user_profiles")
-    print("  - email_tokens")
-    print("  - platform_data")
+    for table in Base.metadata.sorted_tables:
+        print(f"  - {table.name}")
 
 if __name__ == "__main__":
     init_db()
@@ -174,12 +174,12 @@ const PlatformDetail: React.FC = () => {
               <div className="bg-blue-50 rounded-lg p-4 mb-4">
                 <div className="flex items-center justify-between mb-2">
                   <span className="text-sm font-medium text-gray-700">Percentile Rank</span>
-                  <span className="text-2xl font-bold text-blue-600">{analysis.percentileRank}%</span>
+                  <span className="text-2xl font-bold text-blue-600">{analysis.percentileRank != null ? `${analysis.percentileRank}%` : 'N/A'}</span>
                 </div>
                 <div className="w-full bg-gray-200 rounded-full h-2">
                   <div
                     className="bg-blue-600 h-2 rounded-full transition-all duration-500"
-                    style={{ width: `${analysis.percentileRank}%` }}
+                    style={{ width: `${analysis.percentileRank ?? 0}%` }}
                   ></div>
                 </div>
                 <p className="text-sm text-gray-600 mt-2">{analysis.globalRanking}</p>
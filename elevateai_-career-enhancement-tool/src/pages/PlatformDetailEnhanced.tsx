@@ -2,7 +2,7 @@ import React, { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { motion, AnimatePresence } from 'framer-motion';
 import { PieChart, Pie, Cell, LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, RadarChart, PolarGrid, PolarAngleAxis, PolarRadiusAxis, Radar } from 'recharts';
-import { getAnalysis, chatWithPlatform, AnalysisResponse, ChatMessage } from '../services/aiAnalysisService';
+import { getAnalysis, chatWithPlatform, clearChatHistory, AnalysisResponse, ChatMessage } from '../services/aiAnalysisService';
 import platformDataService from '../services/platformDataService';
 import ModernLoader from '../components/ModernLoader';
 
@@ -87,6 +87,21 @@ const PlatformDetailEnhanced: React.FC = () => {
     }
   };
 
+  const handleClearChat = async () => {
+    if (!platform) return;
+    
+    setChatLoading(true);
+    
+    try {
+      await clearChatHistory(platform);
+      setChatMessages([]);
+    } catch (err: any) {
+      setError(err.message || 'Failed to clear chat');
+    } finally {
+      setChatLoading(false);
+    }
+  };
+
   const getStatusColor = (status: string) => {
     switch (status) {
       case 'good': return 'text-green-600 bg-green-50';
@@ -277,13 +292,13 @@ const PlatformDetailEnhanced: React.FC = () => {
                         transition={{ delay: 0.3, type: 'spring' }}
                         className="text-3xl font-bold text-blue-600"
                       >
-                        {analysis.percentileRank}%
+                        {analysis.percentileRank != null ? `${analysis.percentileRank}%` : 'N/A'}
                       </motion.span>
                     </div>
                     <div className="relative w-full bg-gray-200 rounded-full h-3 overflow-hidden">
                       <motion.div
                         initial={{ width: 0 }}
-                        animate={{ width: `${analysis.percentileRank}%` }}
+                        animate={{ width: `${analysis.percentileRank ?? 0}%` }}
                         transition={{ delay: 0.4, duration: 1, ease: 'easeOut' }}
                         className="absolute top-0 left-0 h-full bg-gradient-to-r from-blue-500 to-indigo-600 rounded-full"
                       />
@@ -552,12 +567,21 @@ const PlatformDetailEnhanced: React.FC = () => {
                       <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M8 10h.01M12 10h.01M16 10h.01M9 16H5a2 2 0 01-2-2V6a2 2 0 012-2h14a2 2 0 012 2v8a2 2 0 01-2 2h-5l-5 5v-5z" />
                     </svg>
                   </div>
-                  <div>
+                  <div className="flex-1">
                     <h2 className="text-lg font-bold">AI Assistant</h2>
                     <p className="text-sm text-blue-100">
                       Ask about your {getPlatformName()} performance
                     </p>
                   </div>
+                  {chatMessages.length > 0 && (
+                    <button
+                      onClick={handleClearChat}
+                      disabled={chatLoading}
+                      className="px-3 py-1 text-xs font-medium rounded-lg bg-white/20 hover:bg-white/30 disabled:opacity-50 disabled:cursor-not-allowed transition-all"
+                    >
+                      Clear chat
+                    </button>
+                  )}
                 </div>
               </div>
               
@@ -13,7 +13,7 @@ interface ChatMessage {
 interface AnalysisResponse {
   platform: string;
   username: string;
-  percentileRank: number;
+  percentileRank: number | null;
   globalRanking: string;
   overallScore: number;
   strengths: Array<{
@@ -116,4 +116,27 @@ export const chatWithPlatform = async (
   return response.json();
 };
 
+/**
+ * Clear the stored conversation with a platform's AI assistant
+ */
+export const clearChatHistory = async (platform: string): Promise<void> => {
+  const token = localStorage.getItem('auth_token');
+  
+  if (!token) {
+    throw new Error('Not authenticated');
+  }
+
+  const response = await fetch(`${API_BASE_URL}/ai/chat/${platform}/history`, {
+    method: 'DELETE',
+    headers: {
+      'Authorization': `Bearer ${token}`,
+    },
+  });
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.detail || 'Failed to clear chat');
+  }
+};
+
 export type { AnalysisResponse, ChatMessage, ChatResponse };